@@ -1,33 +1,50 @@
 # api_server.py
 import logging
 import asyncio
+import json
 import os
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
-from typing import Dict, Any, List
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
 import uvicorn
 
-from src.agentic_order_routing.main import main
-from src.agentic_order_routing.mock_data import INVENTORY_DB, MOCK_CRM_DB, SHIPPING_OPTIONS_DB, ZIP_TO_ZONE_DB, PRODUCT_WEIGHT_DB
+# Import through the installed package (pip install -e .) so the server shares the same
+# module instances - and therefore the same inventory service - as the agent tools.
+from agentic_order_routing.main import main, route_order_events
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.decision_cache import get_decision_cache
+from agentic_order_routing.batch_routing import route_orders, BATCH_MAX_CONCURRENCY, BATCH_ORDER_TIMEOUT_SECONDS
+from agentic_order_routing.wave_allocation import get_wave_allocator
+from agentic_order_routing.stock_updates import get_stock_ingestor
+from agentic_order_routing.explanations import get_explanation_queue, EXPLANATION_PENDING, EXPLANATION_TIMEOUT_SECONDS
+from agentic_order_routing.resilience import get_agent_run_guard
+from agentic_order_routing.admission import get_admission_scheduler, needs_admission, request_class, AdmissionRejected
+from agentic_order_routing.profiling import load_profile_summary
+from agentic_order_routing.data_store import get_data_store
+from agentic_order_routing.log_capture import RequestLogRouter
+from agentic_order_routing.metrics import get_routing_metrics, PROMETHEUS_CONTENT_TYPE
+from agentic_order_routing.contextual_data import (
+    get_contextual_data_service, StaticFileCache, FULL_SECTIONS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 
 
 # --- Logging Setup ---
-# Create a custom list handler to capture logs for each request
-class ListHandler(logging.Handler):
-    def __init__(self, log_list: List[str]):
-        super().__init__()
-        self.log_list = log_list
-
-    def emit(self, record: logging.LogRecord):
-        self.log_list.append(self.format(record))
-
 # Configure the root logger or a specific logger for the agent workflow
-# We will add/remove the ListHandler per request to keep logs request-specific
 workflow_logger = logging.getLogger("agent_workflow") # Same name as used in other modules
 workflow_logger.setLevel(logging.INFO) # Set the level for this specific logger
 
+# One shared handler captures logs per request: each record is routed to the bounded
+# buffer of the request whose context emitted it (see log_capture.py)
+request_log_router = RequestLogRouter()
+request_log_router.setFormatter(logging.Formatter('%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')) # Simple format for UI
+workflow_logger.addHandler(request_log_router)
+
+# Latency histograms, error counters and in-flight gauges, scraped from /metrics
+routing_metrics = get_routing_metrics()
+
 # Basic console handler for server logs (uvicorn will also log)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter(
@@ -52,11 +69,57 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 # --- Pydantic Models for Request/Response ---
-class OrderOptimizationRequest(BaseModel):
+class OrderLine(BaseModel):
     product_id: str
     quantity: int
+
+class OrderOptimizationRequest(BaseModel):
+    # Single-line orders set product_id and quantity; multi-line orders set lines instead
+    product_id: Optional[str] = None
+    quantity: Optional[int] = None
+    lines: Optional[List[OrderLine]] = None
     customer_id: str
     business_priority: str
+    mode: str = "agent"  # "agent" or "deterministic" (see ROUTING_MODES in main.py)
+    intake: str = "deterministic"  # "deterministic" or "agent" (see INTAKE_MODES in main.py)
+    explanations: str = "inline"  # "inline" or "deferred" (see EXPLANATION_MODES in main.py)
+    deadline_seconds: Optional[float] = Field(None, gt=0)  # Bound on the agent run; defaults to AGENT_RUN_DEADLINE_SECONDS
+    hedge: bool = False  # Allow a hedged second agent attempt for a slow run (see resilience.py)
+    profile: Optional[str] = None  # Debug: "deterministic" or "sampling" profiles the request (see profiling.py)
+
+def build_raw_order(request_data: OrderOptimizationRequest) -> Dict[str, Any]:
+    """The raw order handed to the pipeline: a cart when lines are given, otherwise a single line."""
+    if request_data.lines is not None:
+        return {
+            "lines": [line.model_dump() for line in request_data.lines],
+            "customer_id": request_data.customer_id
+        }
+    return {
+        "product_id": request_data.product_id,
+        "quantity": request_data.quantity,
+        "customer_id": request_data.customer_id
+    }
+
+# Largest batch accepted by /optimize-route/batch
+MAX_BATCH_ORDERS = 10000
+
+class BatchOptimizationRequest(BaseModel):
+    orders: List[OrderOptimizationRequest]
+    max_concurrency: Optional[int] = None  # Defaults to BATCH_MAX_CONCURRENCY
+    order_timeout_seconds: Optional[float] = None  # Defaults to BATCH_ORDER_TIMEOUT_SECONDS
+
+# Largest wave accepted by /optimize-route/wave
+MAX_WAVE_ORDERS = 200000
+
+class WaveAllocationRequest(BaseModel):
+    orders: List[OrderOptimizationRequest]
+    reserve: bool = True  # Hold stock for every allocated order
+
+# Largest number of stock events accepted by one /inventory/updates request
+MAX_STOCK_EVENTS = 100000
+
+# Longest a GET /explanations/{id}?wait= long poll may hold the request
+MAX_EXPLANATION_WAIT_SECONDS = 30.0
 
 class OptimizationResponse(BaseModel):
     result: Dict[str, Any]
@@ -72,49 +135,111 @@ class ContextualDataResponse(BaseModel):
     products: List[str]    # List of product IDs
     customers: List[Dict[str, Any]]  # List of customer details
     zones: List[str]       # List of zone IDs
-    # Add full mock databases
-    full_customers: Dict[str, Any]
-    full_inventory: Dict[str, Any]
-    full_shipping_options: Dict[str, Any]
-    full_zip_to_zone: Dict[str, Any]
-    full_product_weights: Dict[str, Any]
+    data_version: List[int]  # (availability version, shipping data version)
+    # First page of each full database selected with ?include= (none by default), with
+    # each selected database's total entry count; page through the rest with /contextual-data/{section}
+    section_totals: Optional[Dict[str, int]] = None
+    full_customers: Optional[Dict[str, Any]] = None
+    full_inventory: Optional[Dict[str, Any]] = None
+    full_shipping_options: Optional[Dict[str, Any]] = None
+    full_zip_to_zone: Optional[Dict[str, Any]] = None
+    full_product_weights: Optional[Dict[str, Any]] = None
+
+class ContextualDataPage(BaseModel):
+    section: str
+    total: int
+    offset: int
+    limit: int
+    items: Dict[str, Any]
+    data_version: List[int]  # versions of the data the section is built from (none for static tables)
+
+# --- Cached responses ---
+# Bodies are built and compressed once per data version (see contextual_data.py); clients
+# revalidate with If-None-Match and get 304 while the data is unchanged.
+contextual_data_service = get_contextual_data_service()
+dashboard_file = StaticFileCache(os.path.join("static", "dashboard.html"))
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def encoded_response(request: Request, encoded, media_type: str) -> Response:
+    """Serves a cached EncodedBody: 304 on a matching ETag, precompressed bytes when accepted."""
+    headers = {"ETag": encoded.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoded.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoded.gzip_body is not None and accepts_gzip(request):
+        return Response(content=encoded.gzip_body, media_type=media_type, headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=encoded.body, media_type=media_type, headers=headers)
+
+# --- Admission control ---
+# Requests that start an agent run on the order's critical path queue for one of a bounded
+# number of slots, weighted by customer tier and business priority (see admission.py);
+# the rest only use the engine and are served straight away.
+admission_scheduler = get_admission_scheduler()
+
+def request_needs_admission(request_data: OrderOptimizationRequest) -> bool:
+    return needs_admission(request_data.mode, request_data.intake, request_data.explanations)
+
+def raise_queue_full(e: AdmissionRejected):
+    workflow_logger.warning(f"API_REJECTED: {e}")
+    raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def admit(request_data: OrderOptimizationRequest):
+    """Waits for an admission slot; returns None when the request needs none, raises 429 when the queue is full."""
+    if not request_needs_admission(request_data):
+        return None
+    customer = await get_data_store().call_async("get_customer", request_data.customer_id)
+    order_class = request_class(customer.get("tier") if customer else None, request_data.business_priority)
+    try:
+        return await admission_scheduler.acquire(order_class)
+    except AdmissionRejected as e:
+        raise_queue_full(e)
+
+def queue_wait_ms(admission) -> float:
+    return round(admission.queue_wait * 1000, 3) if admission is not None else 0.0
 
 # --- API Endpoints ---
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
 async def get_dashboard(request: Request):
-    # Serve the dashboard.html
+    # Serve the dashboard.html from memory; it is re-read only when the file changes
     # Ensure dashboard.html is in the 'static' directory
-    dashboard_path = os.path.join("static", "dashboard.html")
-    if not os.path.exists(dashboard_path):
+    encoded = dashboard_file.get()
+    if encoded is None:
         return HTMLResponse("<html><body><h1>Dashboard not found.</h1><p>Place dashboard.html in the 'static' directory.</p></body></html>", status_code=404)
-    
-    with open(dashboard_path, "r") as f:
-        html_content = f.read()
-    return HTMLResponse(content=html_content)
+    return encoded_response(request, encoded, "text/html; charset=utf-8")
 
 @app.post("/optimize-route")
 async def optimize_route_endpoint(request_data: OrderOptimizationRequest):
+    # Capture this request's logs; concurrent requests write to their own buffers
+    with routing_metrics.track_request("/optimize-route"), request_log_router.capture() as request_log_buffer:
+        admission = await admit(request_data)
+        try:
+            response = await _optimize_route(request_data, request_log_buffer)
+        finally:
+            if admission is not None:
+                admission_scheduler.release(admission)
+        response["queue_wait_ms"] = queue_wait_ms(admission)
+        return response
+
+async def _optimize_route(request_data: OrderOptimizationRequest, request_log_buffer):
     workflow_logger.info(f"API_CALL: /optimize-route received request: {request_data.model_dump()}")
-    
-    request_logs = []
-    list_handler = ListHandler(request_logs)
-    formatter = logging.Formatter('%(asctime)s - [%(levelname)s] - %(name)s - %(message)s') # Simple format for UI
-    list_handler.setFormatter(formatter)
-    
-    # Add per-request handler to capture logs for this specific call
-    workflow_logger.addHandler(list_handler)
-    
     try:
-        raw_order_details = {
-            "product_id": request_data.product_id,
-            "quantity": request_data.quantity,
-            "customer_id": request_data.customer_id
-        }
+        raw_order_details = build_raw_order(request_data)
         
         # Run the asynchronous agent workflow
         optimization_result = await main(
             raw_order_details,
-            request_data.business_priority
+            request_data.business_priority,
+            mode=request_data.mode,
+            intake=request_data.intake,
+            explanations=request_data.explanations,
+            deadline_seconds=request_data.deadline_seconds,
+            hedge=request_data.hedge,
+            profile=request_data.profile
         )
         
         # If optimization_result is None, return a default error response
@@ -122,7 +247,7 @@ async def optimize_route_endpoint(request_data: OrderOptimizationRequest):
             workflow_logger.error("API_RESPONSE_ERROR: Workflow returned None.")
             return {
                 "error": "Failed to process the request.",
-                "logs": request_logs
+                "logs": request_log_buffer.lines()
             }
         
         # If error in result, return error key
@@ -130,82 +255,291 @@ async def optimize_route_endpoint(request_data: OrderOptimizationRequest):
             workflow_logger.error(f"API_RESPONSE_ERROR: Workflow returned an error: {optimization_result['error']}")
             return {
                 "error": optimization_result["error"],
-                "logs": request_logs
+                "profile": optimization_result.get("profile"),
+                "logs": request_log_buffer.lines()
             }
 
         # Otherwise, format the response for the UI
+        workflow_logger.info("API_RESPONSE_SUCCESS: Workflow completed successfully.")
         response = {
             "recommendation": optimization_result.get("recommendation"),
             "reasoning": optimization_result.get("reasoning"),
             "alternatives_considered": optimization_result.get("alternatives_considered", []),
-            "logs": request_logs
+            "reservation_id": optimization_result.get("reservation_id"),
+            "plan": optimization_result.get("plan"),
+            "reservation_ids": optimization_result.get("reservation_ids"),
+            "cache_hit": optimization_result.get("cache_hit", False),
+            "decision_id": optimization_result.get("decision_id"),
+            "explanation_status": optimization_result.get("explanation_status"),
+            "fallback": optimization_result.get("fallback", False),
+            "fallback_reason": optimization_result.get("fallback_reason"),
+            "profile": optimization_result.get("profile"),
+            "logs": request_log_buffer.lines()
         }
-        workflow_logger.info("API_RESPONSE_SUCCESS: Workflow completed successfully.")
         return response
 
     except Exception as e:
         workflow_logger.error(f"API_EXCEPTION: Unhandled exception in /optimize-route: {e}", exc_info=True)
+        routing_metrics.errors.inc("internal")
         # Include logs captured so far, even if an unexpected exception occurred
         return {
             "error": f"Internal server error: {str(e)}",
-            "logs": request_logs
+            "logs": request_log_buffer.lines()
         }
-    finally:
-        # Crucial: Remove the handler so logs don't accumulate across requests
-        workflow_logger.removeHandler(list_handler)
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Formats a pipeline event as a Server-Sent Events message."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+@app.post("/optimize-route/stream")
+async def optimize_route_stream_endpoint(request_data: OrderOptimizationRequest):
+    workflow_logger.info(f"API_CALL: /optimize-route/stream received request: {request_data.model_dump()}")
+    if request_data.profile is not None:
+        # Profiled requests run one at a time under the profile lock, which a stream would
+        # hold for as long as its client reads; profile through /optimize-route instead
+        raise HTTPException(status_code=422, detail="profile is not supported on /optimize-route/stream; use /optimize-route.")
+    raw_order_details = build_raw_order(request_data)
+    # Admitted (or rejected with 429) before the stream starts; the slot is held until it ends
+    admission = await admit(request_data)
+
+    def release_admission():
+        if admission is not None:
+            admission_scheduler.release(admission)
+
+    async def event_stream():
+        # Each event is forwarded as soon as the pipeline produces it; nothing is buffered per request
+        decision = None
+        with routing_metrics.track_request("/optimize-route/stream"):
+            try:
+                if admission is not None:
+                    yield format_sse({"event": "admission", "data": {"request_class": admission.request_class, "queue_wait_ms": queue_wait_ms(admission)}})
+                async for event in route_order_events(
+                    raw_order_details,
+                    request_data.business_priority,
+                    mode=request_data.mode,
+                    intake=request_data.intake,
+                    explanations=request_data.explanations,
+                    deadline_seconds=request_data.deadline_seconds,
+                    hedge=request_data.hedge,
+                    stream_agent=True
+                ):
+                    yield format_sse(event)
+                    if event["event"] == "decision":
+                        decision = event["data"]
+            except Exception as e:
+                workflow_logger.error(f"API_EXCEPTION: Unhandled exception in /optimize-route/stream: {e}", exc_info=True)
+                routing_metrics.errors.inc("internal")
+                yield format_sse({"event": "decision", "data": {"error": f"Internal server error: {str(e)}"}})
+            finally:
+                release_admission()
+        # With deferred explanations the decision is out already (and timed as such); the
+        # explanation is pushed on the same stream once it is written
+        if isinstance(decision, dict) and decision.get("explanation_status") == EXPLANATION_PENDING:
+            explanation = await get_explanation_queue().wait(decision["decision_id"], EXPLANATION_TIMEOUT_SECONDS)
+            if explanation is not None:
+                yield format_sse({"event": "explanation", "data": explanation})
+
+    # The background task also releases the slot if the stream never starts; releasing twice is a no-op
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release_admission)
+    )
+
+@app.post("/optimize-route/batch")
+async def optimize_route_batch_endpoint(request_data: BatchOptimizationRequest):
+    workflow_logger.info(f"API_CALL: /optimize-route/batch received {len(request_data.orders)} orders")
+    if len(request_data.orders) > MAX_BATCH_ORDERS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {MAX_BATCH_ORDERS} orders per request.")
+    if request_data.max_concurrency is not None and request_data.max_concurrency < 1:
+        raise HTTPException(status_code=422, detail="max_concurrency must be at least 1.")
+    # Agent-path orders each wait for an admission slot; a batch arriving while the queue
+    # is full is turned away whole, like a single request. Orders turned away later, once
+    # the batch is running, come back with status "rejected" and a retry_after.
+    if admission_scheduler.queue_full() and any(request_needs_admission(order) for order in request_data.orders):
+        raise_queue_full(AdmissionRejected("batch", admission_scheduler.retry_after()))
+
+    orders = [
+        {
+            "raw_order": build_raw_order(order),
+            "business_priority": order.business_priority,
+            "mode": order.mode,
+            "intake": order.intake,
+            "explanations": order.explanations,
+            "deadline_seconds": order.deadline_seconds,
+            "hedge": order.hedge
+        }
+        for order in request_data.orders
+    ]
+    with routing_metrics.track_request("/optimize-route/batch"):
+        batch = await route_orders(
+            orders,
+            max_concurrency=request_data.max_concurrency or BATCH_MAX_CONCURRENCY,
+            order_timeout=request_data.order_timeout_seconds or BATCH_ORDER_TIMEOUT_SECONDS,
+            scheduler=admission_scheduler
+        )
+    workflow_logger.info(f"API_RESPONSE_SUCCESS: Batch completed: {batch['stats']}")
+    return batch
+
+@app.post("/optimize-route/wave")
+async def optimize_route_wave_endpoint(request_data: WaveAllocationRequest):
+    workflow_logger.info(f"API_CALL: /optimize-route/wave received {len(request_data.orders)} orders")
+    if len(request_data.orders) > MAX_WAVE_ORDERS:
+        raise HTTPException(status_code=413, detail=f"Wave too large: at most {MAX_WAVE_ORDERS} orders per request.")
+
+    orders = [
+        {"raw_order": build_raw_order(order), "business_priority": order.business_priority}
+        for order in request_data.orders
+    ]
+    with routing_metrics.track_request("/optimize-route/wave"):
+        # The solve is CPU-bound; keep the event loop free for other requests
+        wave = await asyncio.to_thread(get_wave_allocator().allocate, orders, request_data.reserve)
+    workflow_logger.info(f"API_RESPONSE_SUCCESS: Wave completed: {wave['totals']}")
+    return wave
 
 @app.get("/contextual-data", response_model=ContextualDataResponse)
-async def get_contextual_data_endpoint():
+async def get_contextual_data_endpoint(request: Request, include: Optional[str] = None):
+    # include: comma-separated full_* sections whose first page is embedded; none by default
     workflow_logger.info("API_CALL: /contextual-data received request")
+    sections = tuple(name.strip() for name in (include or "").split(",") if name.strip())
+    unknown = [name for name in sections if name not in FULL_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown section(s) {unknown}. Expected any of {list(FULL_SECTIONS)}.")
     try:
-        inventory_summary = {}
-        all_products = set()
-        for wh, products in INVENTORY_DB.items():
-            for prod_id, stock in products.items():
-                all_products.add(prod_id)
-                if prod_id not in inventory_summary:
-                    inventory_summary[prod_id] = {}
-                inventory_summary[prod_id][wh] = stock
-        
-        # For a simpler summary for the UI, let's just send the raw INVENTORY_DB
-        # or a slightly processed version. The above is a bit complex for a quick viz.
-        # Let's send total stock per product and stock per warehouse.
-        
-        processed_inventory_summary = {}
-        for warehouse, stock_data in INVENTORY_DB.items():
-            for product, quantity in stock_data.items():
-                if product not in processed_inventory_summary:
-                    processed_inventory_summary[product] = {}
-                processed_inventory_summary[product][warehouse] = quantity
-
-        # Get unique zones from ZIP_TO_ZONE_DB
-        unique_zones = set(ZIP_TO_ZONE_DB.values())
-
-        return ContextualDataResponse(
-            inventory_summary=processed_inventory_summary,  # Sending detailed breakdown
-            warehouse_count=len(INVENTORY_DB),
-            product_count=len(all_products),
-            customer_count=len(MOCK_CRM_DB),
-            zone_count=len(unique_zones),
-            warehouses=list(INVENTORY_DB.keys()),
-            products=list(all_products),
-            customers=[{"id": cust_id, **details} for cust_id, details in MOCK_CRM_DB.items()],
-            zones=list(unique_zones),
-            # Add full mock databases
-            full_customers=MOCK_CRM_DB,
-            full_inventory=INVENTORY_DB,
-            full_shipping_options=SHIPPING_OPTIONS_DB,
-            full_zip_to_zone=ZIP_TO_ZONE_DB,
-            full_product_weights=PRODUCT_WEIGHT_DB
-        )
+        encoded = contextual_data_service.summary(sections)
     except Exception as e:
         workflow_logger.error(f"API_EXCEPTION: Error in /contextual-data: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error fetching contextual data: {str(e)}")
+    return encoded_response(request, encoded, "application/json")
+
+@app.get("/contextual-data/{section}", response_model=ContextualDataPage)
+async def get_contextual_data_section_endpoint(
+    request: Request,
+    section: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    prefix: Optional[str] = None,
+):
+    # One page of a full database, sorted by key and optionally filtered by key prefix
+    if section not in FULL_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'. Expected one of {list(FULL_SECTIONS)}.")
+    encoded = contextual_data_service.section(section, offset, limit, prefix or None)
+    return encoded_response(request, encoded, "application/json")
+
+@app.get("/explanations/{decision_id}")
+async def get_explanation_endpoint(decision_id: str, wait: float = Query(0.0, ge=0.0, le=MAX_EXPLANATION_WAIT_SECONDS)):
+    # Status and reasoning of a deferred explanation; with ?wait= the request is held
+    # (up to that many seconds) until a pending explanation is written
+    explanation_queue = get_explanation_queue()
+    explanation = await explanation_queue.wait(decision_id, wait) if wait else explanation_queue.get(decision_id)
+    if explanation is None:
+        raise HTTPException(status_code=404, detail=f"Explanation for decision '{decision_id}' not found or expired.")
+    return explanation
+
+@app.get("/profiles/{profile_id}")
+async def get_profile_endpoint(profile_id: str):
+    # Phase breakdown of a profiled request; the flamegraph files sit next to it in profile_dir
+    summary = await asyncio.to_thread(load_profile_summary, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found.")
+    return summary
+
+def raise_reservation_gone(inventory, reservation_id: str):
+    # 409 when a stock update cancelled the reservation (the order must be re-routed), 404 otherwise
+    reason = inventory.cancellation_reason(reservation_id)
+    if reason is not None:
+        raise HTTPException(status_code=409, detail=f"Reservation '{reservation_id}': {reason}")
+    raise HTTPException(status_code=404, detail=f"Reservation '{reservation_id}' not found or expired.")
+
+@app.post("/reservations/{reservation_id}/commit")
+async def commit_reservation_endpoint(reservation_id: str):
+    workflow_logger.info(f"API_CALL: /reservations/{reservation_id}/commit received request")
+    inventory = get_inventory_service()
+    if not inventory.commit(reservation_id):
+        raise_reservation_gone(inventory, reservation_id)
+    return {"reservation_id": reservation_id, "status": "committed"}
+
+@app.post("/reservations/{reservation_id}/release")
+async def release_reservation_endpoint(reservation_id: str):
+    workflow_logger.info(f"API_CALL: /reservations/{reservation_id}/release received request")
+    inventory = get_inventory_service()
+    if not inventory.release(reservation_id):
+        raise_reservation_gone(inventory, reservation_id)
+    return {"reservation_id": reservation_id, "status": "released"}
+
+@app.post("/inventory/updates")
+async def stock_updates_endpoint(request: Request, wait: bool = True):
+    # Stock deltas from the WMS as {"events": [...]}, a JSON array, or NDJSON (one event per
+    # line). The body is parsed directly rather than through a model: these arrive in bulk.
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            events = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = json.loads(body)
+            events = payload.get("events") if isinstance(payload, dict) else payload
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(events, list):
+        raise HTTPException(status_code=422, detail='Expected {"events": [...]}, a JSON array or NDJSON of stock events.')
+    if len(events) > MAX_STOCK_EVENTS:
+        raise HTTPException(status_code=413, detail=f"Too many events: at most {MAX_STOCK_EVENTS} per request.")
+    workflow_logger.debug(f"API_CALL: /inventory/updates received {len(events)} events")
+    with routing_metrics.track_request("/inventory/updates"):
+        if not wait:
+            # Fire and forget: the events are validated and queued, then applied in the background
+            get_stock_ingestor().submit(events)
+            return JSONResponse(status_code=202, content={"received": len(events), "status": "queued"})
+        return await get_stock_ingestor().submit_async(events)
+
+@app.get("/inventory/version")
+async def inventory_version_endpoint():
+    # data_version increases with every applied batch of stock changes and every commit
+    inventory = get_inventory_service()
+    return {"data_version": inventory.version, "availability_version": inventory.availability_version,
+            "stock_updates": get_stock_ingestor().stats()}
+
+@app.get("/agent/status")
+async def agent_status_endpoint():
+    # Deadlines, the current hedge delay and the model circuit breaker state
+    return get_agent_run_guard().stats()
+
+@app.get("/admission/stats")
+async def admission_stats_endpoint():
+    return admission_scheduler.stats()
+
+@app.get("/cache/stats")
+async def decision_cache_stats_endpoint():
+    return get_decision_cache().stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(content=routing_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     # This allows running the server directly with `python api_server.py`
     # For production, use a process manager like Gunicorn: `uvicorn api_server:app --reload`
-    logger = logging.getLogger(__name__)
-    logger.info("Starting FastAPI server with Uvicorn...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # `--workers N` serves from N processes that share one memory-mapped snapshot of the
+    # stock, reservations and shipping lanes (see shared_snapshot.py).
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve the AI Order Routing API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; more than one serves from a shared snapshot.")
+    parser.add_argument("--snapshot", help="Where to write the shared snapshot (default: a file in /dev/shm).")
+    args = parser.parse_args()
 
+    logger = logging.getLogger(__name__)
+    if args.workers > 1:
+        from agentic_order_routing.shared_snapshot import publish_snapshot, remove_snapshot
+        snapshot_path = publish_snapshot(args.snapshot)
+        logger.info(f"Starting FastAPI server with {args.workers} Uvicorn workers over {snapshot_path}...")
+        try:
+            uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+        finally:
+            remove_snapshot(snapshot_path)
+    else:
+        logger.info("Starting FastAPI server with Uvicorn...")
+        uvicorn.run(app, host=args.host, port=args.port)
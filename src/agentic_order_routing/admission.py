@@ -0,0 +1,314 @@
+# Admission control for the Agentic AI Order Routing POC.
+# Requests that may start an agent run pass through the AdmissionScheduler before main()
+# is called. At most ADMISSION_MAX_CONCURRENCY of them run at once; the rest wait in one
+# queue per request class, and a freed slot goes to the next waiter by smooth weighted
+# round robin over the classes (ADMISSION_CLASS_WEIGHTS). Gold-tier expedited orders are
+# therefore served several times as often as economy orders during a burst, but no class
+# starves. Once ADMISSION_MAX_QUEUE_DEPTH requests wait, a new request is rejected at once
+# with a Retry-After estimate - unless it outranks the lowest class waiting, whose newest
+# waiter is then shed instead. Each admission reports how long the request queued.
+#
+# The scheduler lives on the server's event loop and is per process: with --workers N
+# every worker admits its own share. Batch and order-stream orders on the agent path
+# (admit_order) queue for the same slots, one order at a time, in their own order's class.
+#
+#   python -m agentic_order_routing.admission --requests 400
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from agentic_order_routing.data_store import get_data_store
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+ADMISSION_MAX_CONCURRENCY = 16
+ADMISSION_MAX_QUEUE_DEPTH = 256
+
+# --- Request classes ---
+# Highest first. Expedited: gold-tier customers ordering under a speed priority.
+ADMISSION_CLASS_WEIGHTS = {
+    "expedited": 8,
+    "gold": 4,
+    "standard": 2,
+    "economy": 1,
+}
+EXPEDITED_PRIORITIES = ("PRIORITIZE_GOLD_TIER_SPEED", "MINIMIZE_DELIVERY_TIME")
+
+
+def request_class(customer_tier, business_priority):
+    """Returns the admission class of an order from its customer tier and business priority."""
+    tier = (customer_tier or "").lower()
+    if tier == "gold":
+        return "expedited" if business_priority in EXPEDITED_PRIORITIES else "gold"
+    if tier == "silver":
+        return "standard"
+    return "economy"
+
+
+def needs_admission(mode="agent", intake="deterministic", explanations="inline"):
+    """
+    True if an order may start an agent run on its critical path: agent mode with inline
+    explanations, or agent intake. The defaults are main()'s.
+    """
+    return (mode == "agent" and explanations != "deferred") or intake == "agent"
+
+
+class AdmissionRejected(Exception):
+    """The queue is full; `retry_after` is the suggested wait in whole seconds."""
+
+    def __init__(self, request_class, retry_after):
+        super().__init__(f"Too many requests queued; retry {request_class} orders in {retry_after} s.")
+        self.request_class = request_class
+        self.retry_after = retry_after
+
+
+class Admission:
+    """A granted slot: release it through AdmissionScheduler.release() when the request is done."""
+
+    def __init__(self, request_class, queue_wait):
+        self.request_class = request_class
+        self.queue_wait = queue_wait
+        self.started = time.perf_counter()
+        self.released = False
+
+
+class AdmissionScheduler:
+    """
+    Bounded concurrency pool with weighted per-class queues.
+
+    Args:
+        max_concurrency: Requests admitted at the same time.
+        max_queue_depth: Requests that may wait; beyond that new ones are rejected (or shed
+            a lower-class waiter).
+        class_weights: {class: weight}; a class with twice the weight is admitted twice as
+            often while both have requests waiting.
+    """
+
+    def __init__(self, max_concurrency=ADMISSION_MAX_CONCURRENCY, max_queue_depth=ADMISSION_MAX_QUEUE_DEPTH,
+                 class_weights=ADMISSION_CLASS_WEIGHTS):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.class_weights = dict(class_weights)
+        self.metrics = get_routing_metrics()
+        self.in_flight = 0
+        self._queues = {name: deque() for name in self.class_weights}  # class -> deque of Futures
+        self._current = {name: 0 for name in self.class_weights}  # smooth weighted round robin state
+        self._queued = 0
+        # Mean seconds a request holds its slot, for Retry-After
+        self._service_seconds = 1.0
+        self.admitted = {name: 0 for name in self.class_weights}
+        self.rejected = {name: 0 for name in self.class_weights}
+
+    # --- Admitting ---
+    async def acquire(self, request_class):
+        """
+        Waits for a slot.
+
+        Returns:
+            The Admission, with queue_wait in seconds.
+
+        Raises:
+            AdmissionRejected: The queue is full and nothing of a lower class can be shed.
+        """
+        if request_class not in self._queues:
+            request_class = min(self.class_weights, key=self.class_weights.get)
+        start = time.perf_counter()
+        if self.in_flight < self.max_concurrency and self._queued == 0:
+            return self._admit(request_class, start)
+        if self._queued >= self.max_queue_depth and not self._shed_below(request_class):
+            self._reject(request_class)
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[request_class].append(waiter)
+        self._queued += 1
+        self.metrics.admission_queue_depth.set(request_class, value=len(self._queues[request_class]))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Client went away: leave the queue, or pass on a slot granted meanwhile. A
+            # waiter shed meanwhile (result None) never held a slot and is out of the queue
+            if waiter.done() and not waiter.cancelled() and waiter.result() is True:
+                self.in_flight -= 1
+                self._grant_next()
+            elif waiter in self._queues[request_class]:
+                self._queues[request_class].remove(waiter)
+                self._queued -= 1
+                self.metrics.admission_queue_depth.set(request_class, value=len(self._queues[request_class]))
+            raise
+        # The waiter was either granted a slot or shed by a higher-class arrival
+        if waiter.result() is None:
+            self._reject(request_class)
+        return self._admit(request_class, start, counted=True)
+
+    def _admit(self, request_class, start, counted=False):
+        if not counted:
+            self.in_flight += 1
+        queue_wait = time.perf_counter() - start
+        self.admitted[request_class] += 1
+        self.metrics.admission_wait.observe(request_class, value=queue_wait)
+        self.metrics.admissions.inc(request_class, "admitted")
+        return Admission(request_class, queue_wait)
+
+    def _reject(self, request_class):
+        self.rejected[request_class] += 1
+        self.metrics.admissions.inc(request_class, "rejected")
+        raise AdmissionRejected(request_class, self.retry_after())
+
+    def _shed_below(self, request_class):
+        # Frees a queue place by rejecting the newest waiter of the lowest class below request_class
+        weight = self.class_weights[request_class]
+        for name in sorted(self.class_weights, key=self.class_weights.get):
+            if self.class_weights[name] >= weight:
+                return False
+            while self._queues[name]:
+                waiter = self._queues[name].pop()
+                self._queued -= 1
+                self.metrics.admission_queue_depth.set(name, value=len(self._queues[name]))
+                if waiter.done():
+                    continue
+                logger.info(f"ADMISSION: queue full, shedding a {name} request for a {request_class} one")
+                waiter.set_result(None)
+                return True
+        return False
+
+    def release(self, admission):
+        """Returns the admission's slot and hands it to the next waiter, if any."""
+        if admission.released:
+            return
+        admission.released = True
+        held = time.perf_counter() - admission.started
+        self._service_seconds += 0.1 * (held - self._service_seconds)
+        self.in_flight -= 1
+        self._grant_next()
+
+    def _grant_next(self):
+        while self._queued and self.in_flight < self.max_concurrency:
+            request_class = self._pick_class()
+            waiter = self._queues[request_class].popleft()
+            self._queued -= 1
+            self.metrics.admission_queue_depth.set(request_class, value=len(self._queues[request_class]))
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(True)
+
+    def _pick_class(self):
+        # Smooth weighted round robin (as in nginx) over the classes with waiters
+        waiting = [name for name, waiters in self._queues.items() if waiters]
+        total = 0
+        for name in waiting:
+            self._current[name] += self.class_weights[name]
+            total += self.class_weights[name]
+        chosen = max(waiting, key=lambda name: (self._current[name], self.class_weights[name]))
+        self._current[chosen] -= total
+        return chosen
+
+    def queue_full(self):
+        """True while a new request would be rejected unless it can shed a lower class."""
+        return self._queued >= self.max_queue_depth
+
+    def retry_after(self):
+        """Seconds until a request queued now would likely be admitted, rounded up, at least 1."""
+        return max(1, math.ceil((self._queued + 1) / self.max_concurrency * self._service_seconds))
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "queued": {name: len(waiters) for name, waiters in self._queues.items()},
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "mean_service_seconds": round(self._service_seconds, 6),
+        }
+
+
+async def admit_order(order, scheduler=None):
+    """
+    Waits for a slot for a batch or order-stream order.
+
+    Args:
+        order: A dict with "raw_order", "business_priority" and the optional "mode",
+            "intake" and "explanations" (see batch_routing.route_orders).
+        scheduler: The AdmissionScheduler; defaults to the process-wide one.
+
+    Returns:
+        The Admission (release it through the scheduler), or None when the order needs none.
+
+    Raises:
+        AdmissionRejected: The queue is full.
+    """
+    modes = {name: order[name] for name in ("mode", "intake", "explanations") if order.get(name)}
+    if not needs_admission(**modes):
+        return None
+    customer_id = (order.get("raw_order") or {}).get("customer_id")
+    customer = await get_data_store().call_async("get_customer", customer_id) if customer_id else None
+    order_class = request_class(customer.get("tier") if customer else None, order.get("business_priority"))
+    return await (scheduler or get_admission_scheduler()).acquire(order_class)
+
+
+_scheduler = None
+
+def get_admission_scheduler():
+    """Returns the process-wide admission scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AdmissionScheduler()
+    return _scheduler
+
+
+if __name__ == '__main__':
+    import argparse
+    import random
+
+    from agentic_order_routing.benchmark import summarize
+    from agentic_order_routing.main import main
+    from agentic_order_routing.scripted_model import scripted_run_config
+
+    parser = argparse.ArgumentParser(description="Send a burst of agent-mode orders through the admission scheduler.")
+    parser.add_argument("--requests", type=int, default=400, help="Orders in the burst.")
+    parser.add_argument("--concurrency", type=int, default=ADMISSION_MAX_CONCURRENCY, help="Orders routed at once.")
+    parser.add_argument("--queue-depth", type=int, default=128, help="Orders that may wait.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model turn.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+
+    # Mock customers of each tier; gold customers under a speed priority are expedited
+    customers = [("cust123", "PRIORITIZE_GOLD_TIER_SPEED"), ("cust101", "MINIMIZE_COST"), ("cust456", "MINIMIZE_COST"), ("cust789", "MINIMIZE_COST")]
+    tiers = {"cust123": "gold", "cust101": "gold", "cust456": "silver", "cust789": "bronze"}
+    mix = [0.1, 0.2, 0.3, 0.4]
+
+    async def burst():
+        scheduler = AdmissionScheduler(args.concurrency, args.queue_depth)
+        run_config = scripted_run_config(latency_seconds=args.latency)
+        rng = random.Random(7)
+        waits = {name: [] for name in ADMISSION_CLASS_WEIGHTS}
+        latencies = {name: [] for name in ADMISSION_CLASS_WEIGHTS}
+
+        async def order():
+            customer_id, priority = rng.choices(customers, weights=mix)[0]
+            name = request_class(tiers[customer_id], priority)
+            start = time.perf_counter()
+            try:
+                admission = await scheduler.acquire(name)
+            except AdmissionRejected:
+                return
+            try:
+                await main({"product_id": "product_A", "quantity": 1, "customer_id": customer_id}, priority,
+                           reserve=False, use_cache=False, run_config=run_config)
+            finally:
+                scheduler.release(admission)
+            waits[name].append(admission.queue_wait * 1000)
+            latencies[name].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(order() for _ in range(args.requests)))
+        print(f"{args.requests} orders in {time.perf_counter() - start:.2f} s, {args.concurrency} at once, queue depth {args.queue_depth}")
+        for name in ADMISSION_CLASS_WEIGHTS:
+            print(f"  {name:9s} admitted {scheduler.admitted[name]:4d}, rejected {scheduler.rejected[name]:4d}; "
+                  f"queue wait {summarize(waits[name])}; end to end {summarize(latencies[name])}")
+
+    asyncio.run(burst())
@@ -0,0 +1,158 @@
+# Batch routing for the Agentic AI Order Routing POC.
+# Fans a backlog of orders out to main() concurrently under a semaphore, deduplicates
+# identical orders, and isolates slow or failing orders behind a per-order timeout so
+# they cannot hold back the rest of the batch. Given an admission scheduler, orders that
+# may start an agent run wait for an admission slot each, like single API requests.
+
+import asyncio
+import json
+import logging
+import time
+
+from agentic_order_routing.admission import AdmissionRejected, admit_order
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+BATCH_MAX_CONCURRENCY = 32
+BATCH_ORDER_TIMEOUT_SECONDS = 60.0
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[rank]
+
+
+async def route_single_order(order, route_fn, order_timeout=BATCH_ORDER_TIMEOUT_SECONDS, log_prefix="BATCH", scheduler=None):
+    """
+    Routes one order behind a timeout, turning timeouts and unhandled exceptions into an
+    error result so they cannot fail the surrounding batch or stream.
+
+    Args:
+        order: A dict with "raw_order", "business_priority" and the optional modes listed
+            in route_orders.
+        route_fn: The coroutine used to route the order (main.main).
+        order_timeout: Seconds the order may take once admitted.
+        log_prefix: Prefix for the error log line.
+        scheduler: AdmissionScheduler an agent-path order waits on for a slot (see
+            admission.admit_order); None routes it straight away.
+
+    Returns:
+        (result, status, latency_ms), where status is "ok", "error", "timeout" or
+        "rejected" (the admission queue was full; the result carries "retry_after").
+    """
+    start = time.perf_counter()
+    admission = None
+    if scheduler is not None:
+        try:
+            admission = await admit_order(order, scheduler)
+        except AdmissionRejected as e:
+            logger.warning(f"{log_prefix}: {e}")
+            return {"error": str(e), "retry_after": e.retry_after}, "rejected", (time.perf_counter() - start) * 1000
+    kwargs = {name: order[name] for name in ("mode", "intake", "explanations", "deadline_seconds", "hedge") if order.get(name)}
+    try:
+        result = await asyncio.wait_for(
+            route_fn(order.get("raw_order"), order.get("business_priority"), **kwargs),
+            timeout=order_timeout,
+        )
+        status = "error" if not result or "error" in result else "ok"
+    except asyncio.TimeoutError:
+        # The cancelled pipeline never reached its decision, so count the error here
+        get_routing_metrics().errors.inc("timeout")
+        result = {"error": f"Order routing timed out after {order_timeout}s."}
+        status = "timeout"
+    except Exception as e:
+        logger.error(f"{log_prefix}: order failed with unhandled exception: {e}", exc_info=True)
+        get_routing_metrics().errors.inc("internal")
+        result = {"error": f"Internal error: {e}"}
+        status = "error"
+    finally:
+        if admission is not None:
+            scheduler.release(admission)
+    if result is None:
+        result = {"error": "Failed to process the request."}
+    return result, status, (time.perf_counter() - start) * 1000
+
+
+async def route_orders(orders, max_concurrency=BATCH_MAX_CONCURRENCY, order_timeout=BATCH_ORDER_TIMEOUT_SECONDS, route_fn=None, scheduler=None):
+    """
+    Routes many orders concurrently.
+
+    Identical orders (same raw order, priority and modes) are treated as one order, e.g. a
+    client retry within the same batch, and share a single result and reservation.
+
+    Args:
+        orders: A list of dicts with "raw_order", "business_priority" and optional "mode",
+            "intake", "explanations", "deadline_seconds" and "hedge" (see main.main).
+        max_concurrency: Maximum number of orders routed at the same time.
+        order_timeout: Seconds a single order may take once it has started.
+        route_fn: The coroutine used to route one order; defaults to main.main.
+        scheduler: AdmissionScheduler that agent-path orders wait on, one slot per order;
+            None (e.g. for benchmarks) routes them without admission.
+
+    Returns:
+        A dict with "results" (one entry per input order, in input order) and "stats".
+    """
+    if route_fn is None:
+        from agentic_order_routing.main import main as route_fn
+
+    batch_start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    # Deduplicate: each unique order is routed once, duplicates point at its slot
+    unique_orders = []
+    first_index = []  # input index of the first occurrence of each unique order
+    slot_for_key = {}
+    slots = []
+    for order in orders:
+        key = json.dumps(
+            [order.get("raw_order"), order.get("business_priority"), order.get("mode"), order.get("intake"), order.get("explanations"), order.get("deadline_seconds"), order.get("hedge")],
+            sort_keys=True, default=str,
+        )
+        if key not in slot_for_key:
+            slot_for_key[key] = len(unique_orders)
+            unique_orders.append(order)
+            first_index.append(len(slots))
+        slots.append(slot_for_key[key])
+
+    async def route_one(order):
+        async with semaphore:
+            return await route_single_order(order, route_fn, order_timeout, log_prefix="BATCH", scheduler=scheduler)
+
+    outcomes = await asyncio.gather(*(route_one(order) for order in unique_orders))
+
+    results = []
+    for index, slot in enumerate(slots):
+        result, status, latency_ms = outcomes[slot]
+        results.append({
+            "index": index,
+            "status": status,
+            "latency_ms": round(latency_ms, 3),
+            "duplicate_of": None if index == first_index[slot] else first_index[slot],
+            "result": result,
+        })
+
+    wall_ms = (time.perf_counter() - batch_start) * 1000
+    latencies = sorted(latency for _, _, latency in outcomes)
+    statuses = [status for _, status, _ in outcomes]
+    stats = {
+        "orders": len(orders),
+        "unique_orders": len(unique_orders),
+        "duplicates": len(orders) - len(unique_orders),
+        "succeeded": statuses.count("ok"),
+        "failed": statuses.count("error"),
+        "timed_out": statuses.count("timeout"),
+        "rejected": statuses.count("rejected"),
+        "max_concurrency": max_concurrency,
+        "wall_time_ms": round(wall_ms, 3),
+        "orders_per_second": round(len(unique_orders) / (wall_ms / 1000), 2) if wall_ms > 0 else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+    logger.info(f"BATCH: routed {stats['unique_orders']} unique of {stats['orders']} orders in {stats['wall_time_ms']} ms")
+    return {"results": results, "stats": stats}
@@ -0,0 +1,537 @@
+# Offline benchmark suite for the Agentic AI Order Routing POC.
+# Replays SC01-SC09 and a seeded synthetic order load through the real pipeline (intake,
+# cache, Runner, tools, handoff, reservation) with the agents running on the scripted
+# model from scripted_model.py, so no API key or network is needed. Reports per-stage
+# latency percentiles, orders/second per concurrency level, tool-call and model-turn
+# counts, event-loop lag and memory, and can save the report as a baseline or fail on
+# regressions against one (for CI). --tool-latency-ms puts a simulated delay on every
+# data-store lookup, as if the tools called a remote database or rate service.
+#
+#   python -m agentic_order_routing.benchmark --save-baseline benchmarks/baseline.json
+#   python -m agentic_order_routing.benchmark --compare benchmarks/baseline.json
+#   python -m agentic_order_routing.benchmark --compare benchmarks/baseline.json --advisory-timings
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+from agents import RunHooks
+
+from agentic_order_routing.batch_routing import route_orders
+from agentic_order_routing.data_store import SimulatedLatencyDataStore, get_data_store, set_data_store
+from agentic_order_routing.decision_cache import get_decision_cache
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.main import (
+    INTAKE_MODE_AGENT,
+    INTAKE_MODES,
+    ROUTING_MODE_AGENT,
+    ROUTING_MODE_DETERMINISTIC,
+    ROUTING_MODES,
+    TEST_SCENARIOS,
+    route_order_events,
+)
+from agentic_order_routing.mock_data import INVENTORY_DB, MOCK_CRM_DB
+from agentic_order_routing.routing_engine import BUSINESS_PRIORITIES
+from agentic_order_routing.scripted_model import scripted_run_config
+
+logger = logging.getLogger("agent_workflow")
+
+DEFAULT_CONCURRENCY_LEVELS = (1, 8, 32)
+DEFAULT_SYNTHETIC_ORDERS = 300
+DEFAULT_SCENARIO_REPEATS = 20
+DEFAULT_TOLERANCE = 0.30
+# Latency regressions smaller than this are treated as timer noise.
+LATENCY_NOISE_FLOOR_MS = 0.5
+# (cached quantity, requested quantity) pairs whose decisions must not be shared
+CACHE_CHECK_QUANTITIES = ((4, 3), (2, 1), (1, 2))
+
+
+# --- Measurement ---
+class StageTimer(RunHooks):
+    """Run hooks that time model turns, tool calls and handoffs for one order."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)  # stage -> [ms]
+        self.tool_calls = Counter()
+        self.model_turns = 0
+        self.handoffs = 0
+        self._llm_started = None
+        self._tool_started = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._llm_started = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response):
+        self.model_turns += 1
+        if self._llm_started is not None:
+            self.timings[f"model_turn:{agent.name}"].append((time.perf_counter() - self._llm_started) * 1000)
+            self._llm_started = None
+
+    async def on_tool_start(self, context, agent, tool):
+        # Parallel tool calls in one turn each get their own tool context
+        self._tool_started[id(context)] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result):
+        self.tool_calls[tool.name] += 1
+        started = self._tool_started.pop(id(context), None)
+        if started is not None:
+            self.timings[f"tool:{tool.name}"].append((time.perf_counter() - started) * 1000)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        self.handoffs += 1
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness while a phase runs: a task sleeps `interval`
+    seconds over and over and records how late it wakes up each time.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _sample(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, (time.perf_counter() - start - self.interval) * 1000))
+
+    def start(self):
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        """Stops sampling and returns the lag summary (ms)."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return summarize(self.lags)
+
+
+class Recorder:
+    """Collects per-order stage timings and counts across a benchmark phase."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.tool_calls = Counter()
+        self.model_turns = 0
+        self.handoffs = 0
+        self.orders = 0
+        self.outcomes = Counter()
+
+    def add(self, timer, outcome):
+        for stage, values in timer.timings.items():
+            self.timings[stage].extend(values)
+        self.tool_calls.update(timer.tool_calls)
+        self.model_turns += timer.model_turns
+        self.handoffs += timer.handoffs
+        self.orders += 1
+        self.outcomes[outcome] += 1
+
+    def summary(self):
+        orders = max(self.orders, 1)
+        return {
+            "orders": self.orders,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "stages_ms": {stage: summarize(values) for stage, values in sorted(self.timings.items())},
+            "tool_calls": dict(sorted(self.tool_calls.items())),
+            "tool_calls_per_order": round(sum(self.tool_calls.values()) / orders, 3),
+            "model_turns_per_order": round(self.model_turns / orders, 3),
+            "handoffs_per_order": round(self.handoffs / orders, 3),
+        }
+
+
+def summarize(values):
+    """Returns count, mean and nearest-rank p50/p95/p99/max of a list of milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _outcome(decision):
+    if not isinstance(decision, dict):
+        return "no_decision"
+    if "error" in decision:
+        return "error"
+    return "cache_hit" if decision.get("cache_hit") else "routed"
+
+
+# --- Workload ---
+def synthetic_orders(count, seed=7):
+    """
+    Generates a reproducible mix of valid orders over the mock CRM, catalogue and
+    priorities, plus a small share of invalid ones. Every order carries a unique
+    order_ref so batch de-duplication does not collapse them.
+    """
+    rng = random.Random(seed)
+    customers = sorted(MOCK_CRM_DB)
+    products = sorted({product for stock in INVENTORY_DB.values() for product in stock})
+    orders = []
+    for i in range(count):
+        raw_order = {
+            "order_ref": f"SYN-{i:06d}",
+            "product_id": rng.choice(products),
+            "quantity": rng.choice((1, 1, 1, 2, 3, 5)),
+            "customer_id": rng.choice(customers),
+        }
+        roll = rng.random()
+        if roll < 0.03:
+            raw_order["customer_id"] = "cust_UNKNOWN"
+        elif roll < 0.05:
+            raw_order["quantity"] = 0
+        orders.append({"raw_order": raw_order, "business_priority": rng.choice(BUSINESS_PRIORITIES)})
+    return orders
+
+
+class BenchmarkRunner:
+    """Routes orders through route_order_events on the scripted model and records each stage."""
+
+    def __init__(self, mode=ROUTING_MODE_AGENT, intake=INTAKE_MODE_AGENT, use_cache=False, stream_agent=False, model_latency_ms=0.0):
+        self.mode = mode
+        self.intake = intake
+        self.use_cache = use_cache
+        self.stream_agent = stream_agent
+        self.run_config = scripted_run_config(model_latency_ms / 1000)
+
+    async def route(self, raw_order, business_priority, recorder):
+        """Routes one order and returns its decision; the reservation is released at once so stock stays constant."""
+        timer = StageTimer()
+        start = time.perf_counter()
+        intake_done = None
+        decision = None
+        async for event in route_order_events(
+            raw_order, business_priority, mode=self.mode, reserve=True, use_cache=self.use_cache,
+            stream_agent=self.stream_agent, intake=self.intake, run_config=self.run_config, hooks=timer,
+        ):
+            if event["event"] == "intake":
+                intake_done = time.perf_counter()
+            elif event["event"] == "decision":
+                decision = event["data"]
+        end = time.perf_counter()
+        timer.timings["end_to_end"].append((end - start) * 1000)
+        if intake_done is not None:
+            timer.timings["intake"].append((intake_done - start) * 1000)
+            timer.timings["routing"].append((end - intake_done) * 1000)
+        if isinstance(decision, dict) and decision.get("reservation_id"):
+            get_inventory_service().release(decision["reservation_id"])
+        recorder.add(timer, _outcome(decision))
+        return decision
+
+    async def run_scenarios(self, repeats=DEFAULT_SCENARIO_REPEATS):
+        """Runs SC01-SC09 sequentially, `repeats` times each."""
+        get_decision_cache().clear()
+        overall = Recorder()
+        per_scenario = {}
+        for scenario in TEST_SCENARIOS:
+            recorder = Recorder()
+            for _ in range(repeats):
+                await self.route(scenario["raw_order"], scenario["priority"], recorder)
+            summary = recorder.summary()
+            per_scenario[scenario["name"].split(":")[0]] = {
+                "name": scenario["name"],
+                "outcomes": summary["outcomes"],
+                "end_to_end_ms": summary["stages_ms"]["end_to_end"],
+                "tool_calls_per_order": summary["tool_calls_per_order"],
+                "model_turns_per_order": summary["model_turns_per_order"],
+            }
+            for stage, values in recorder.timings.items():
+                overall.timings[stage].extend(values)
+            overall.tool_calls.update(recorder.tool_calls)
+            overall.model_turns += recorder.model_turns
+            overall.handoffs += recorder.handoffs
+            overall.orders += recorder.orders
+            overall.outcomes.update(recorder.outcomes)
+        return {"repeats": repeats, "per_scenario": per_scenario, **overall.summary()}
+
+    async def run_load(self, orders, concurrency):
+        """Routes the synthetic orders through route_orders with `concurrency` orders in flight."""
+        get_decision_cache().clear()
+        recorder = Recorder()
+
+        async def route_fn(raw_order, business_priority, **kwargs):
+            return await self.route(raw_order, business_priority, recorder)
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        batch = await route_orders(orders, max_concurrency=concurrency, route_fn=route_fn)
+        loop_lag = await monitor.stop()
+        return {
+            "concurrency": concurrency,
+            "orders_per_second": batch["stats"]["orders_per_second"],
+            "wall_time_ms": batch["stats"]["wall_time_ms"],
+            "event_loop_lag_ms": loop_lag,
+            **recorder.summary(),
+        }
+
+    async def measure_memory(self, orders, concurrency):
+        """Peak traced allocation while routing the load once (run separately: tracing slows everything down)."""
+        tracemalloc.start()
+        try:
+            await self.run_load(orders, concurrency)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "concurrency": concurrency,
+            "traced_peak_kib": round(peak / 1024, 1),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+
+async def run_benchmark(concurrency_levels=DEFAULT_CONCURRENCY_LEVELS, synthetic_count=DEFAULT_SYNTHETIC_ORDERS, repeats=DEFAULT_SCENARIO_REPEATS, seed=7, tool_latency_ms=0.0, **runner_options):
+    """
+    Runs the full suite and returns the report dict.
+
+    Args:
+        concurrency_levels: In-flight order limits to measure the synthetic load at.
+        synthetic_count: Number of synthetic orders per concurrency level.
+        repeats: Sequential runs of each of SC01-SC09.
+        seed: Seed of the synthetic order generator.
+        tool_latency_ms: Simulated delay of every data-store lookup (see SimulatedLatencyDataStore).
+            Must be set before the services are first used, so only on a fresh process.
+        **runner_options: Passed to BenchmarkRunner (mode, intake, use_cache, stream_agent, model_latency_ms).
+
+    Returns:
+        A dict with "config", "environment", "scenarios", "load", "memory" and
+        "cache_checks" (see check_decision_cache).
+    """
+    if tool_latency_ms:
+        set_data_store(SimulatedLatencyDataStore(get_data_store(), tool_latency_ms))
+    runner = BenchmarkRunner(**runner_options)
+    orders = synthetic_orders(synthetic_count, seed)
+    # Warm-up: first-use costs (index builds, pydantic schemas) are not part of the measurement
+    await runner.run_load(orders[:20], 4)
+
+    report = {
+        "config": {
+            "mode": runner.mode,
+            "intake": runner.intake,
+            "use_cache": runner.use_cache,
+            "stream_agent": runner.stream_agent,
+            "model_latency_ms": runner.run_config.model_provider.get_model(None).latency_seconds * 1000,
+            "scenario_repeats": repeats,
+            "synthetic_orders": synthetic_count,
+            "seed": seed,
+            "concurrency_levels": list(concurrency_levels),
+            # Only recorded when set, so baselines without it still compare
+            **({"tool_latency_ms": tool_latency_ms} if tool_latency_ms else {}),
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()},
+        "scenarios": await runner.run_scenarios(repeats),
+        "load": [await runner.run_load(orders, level) for level in concurrency_levels],
+    }
+    report["memory"] = await runner.measure_memory(orders, max(concurrency_levels))
+    report["cache_checks"] = await check_decision_cache()
+    return report
+
+
+async def _decide(raw_order, business_priority, use_cache):
+    async for event in route_order_events(raw_order, business_priority, mode=ROUTING_MODE_DETERMINISTIC, reserve=False, use_cache=use_cache):
+        if event["event"] == "decision":
+            return event["data"]
+
+
+async def check_decision_cache():
+    """
+    Checks that a cached decision is only served for the order it was made for: for each
+    product, priority and CACHE_CHECK_QUANTITIES pair, routing the first quantity and then
+    the second must give the second the same decision as routing it with the cache off.
+
+    Returns:
+        A list of mismatch messages; empty if the cache never changed a decision.
+    """
+    cache = get_decision_cache()
+    products = sorted({product for stock in INVENTORY_DB.values() for product in stock})
+    mismatches = []
+    for product_id in products:
+        for business_priority in BUSINESS_PRIORITIES:
+            for cached_quantity, quantity in CACHE_CHECK_QUANTITIES:
+                order = {"product_id": product_id, "customer_id": "cust123"}
+                expected = await _decide({**order, "quantity": quantity}, business_priority, use_cache=False)
+                cache.clear()
+                await _decide({**order, "quantity": cached_quantity}, business_priority, use_cache=True)
+                served = await _decide({**order, "quantity": quantity}, business_priority, use_cache=True)
+                served = {key: value for key, value in served.items() if key != "cache_hit"}
+                if served != expected:
+                    mismatches.append(f"decision cache: {product_id} x{quantity} {business_priority} after x{cached_quantity} "
+                                      f"served {served.get('recommendation')} instead of {expected.get('recommendation')}")
+    cache.clear()
+    return mismatches
+
+
+# --- Baseline comparison ---
+def compare_reports(current, baseline, tolerance=DEFAULT_TOLERANCE, timings=True):
+    """
+    Compares a report against a saved baseline.
+
+    Latencies (p95 end-to-end and per stage) and traced memory may grow by at most
+    `tolerance` (a fraction), throughput may drop by at most `tolerance`, and tool-call
+    and model-turn counts, which are deterministic, may not grow at all. Scenario
+    outcomes must match and the decision cache checks must pass.
+
+    Args:
+        timings: Also compare latency, throughput and memory. These depend on the machine
+            and interpreter, so they only mean something against a baseline recorded
+            in the same environment.
+
+    Returns:
+        A list of human-readable regression messages; empty if there are none.
+    """
+    regressions = []
+
+    def check_latency(label, now, then):
+        if not timings or now is None or then is None:
+            return
+        if now > then * (1 + tolerance) and now - then > LATENCY_NOISE_FLOOR_MS:
+            regressions.append(f"{label}: p95 {now} ms vs baseline {then} ms")
+
+    def check_count(label, now, then):
+        if now is not None and then is not None and now > then:
+            regressions.append(f"{label}: {now} vs baseline {then}")
+
+    if current["config"] != baseline["config"]:
+        regressions.append("benchmark config differs from the baseline; re-record the baseline")
+        return regressions
+
+    now_scenarios, then_scenarios = current["scenarios"], baseline["scenarios"]
+    for stage, stats in then_scenarios["stages_ms"].items():
+        check_latency(f"scenarios {stage}", now_scenarios["stages_ms"].get(stage, {}).get("p95"), stats.get("p95"))
+    for key in ("tool_calls_per_order", "model_turns_per_order"):
+        check_count(f"scenarios {key}", now_scenarios[key], then_scenarios[key])
+    for scenario_id, stats in then_scenarios["per_scenario"].items():
+        now = now_scenarios["per_scenario"].get(scenario_id, {})
+        check_count(f"{scenario_id} tool_calls_per_order", now.get("tool_calls_per_order"), stats["tool_calls_per_order"])
+        if now.get("outcomes") != stats["outcomes"]:
+            regressions.append(f"{scenario_id}: outcomes {now.get('outcomes')} vs baseline {stats['outcomes']}")
+
+    load_now = {level["concurrency"]: level for level in current["load"]}
+    for then in baseline["load"]:
+        now = load_now.get(then["concurrency"])
+        if now is None:
+            continue
+        label = f"load@{then['concurrency']}"
+        if timings and now["orders_per_second"] < then["orders_per_second"] * (1 - tolerance):
+            regressions.append(f"{label}: {now['orders_per_second']} orders/s vs baseline {then['orders_per_second']}")
+        check_latency(f"{label} end_to_end", now["stages_ms"]["end_to_end"]["p95"], then["stages_ms"]["end_to_end"]["p95"])
+        check_count(f"{label} tool_calls_per_order", now["tool_calls_per_order"], then["tool_calls_per_order"])
+
+    if timings and current["memory"]["traced_peak_kib"] > baseline["memory"]["traced_peak_kib"] * (1 + tolerance):
+        regressions.append(f"memory: traced peak {current['memory']['traced_peak_kib']} KiB vs baseline {baseline['memory']['traced_peak_kib']} KiB")
+    # Correctness checks need no baseline
+    regressions.extend(current.get("cache_checks", []))
+    return regressions
+
+
+def print_report(report):
+    scenarios = report["scenarios"]
+    print(f"\n=== Scenarios SC01-SC09 (x{scenarios['repeats']}, sequential) ===")
+    for scenario_id, stats in scenarios["per_scenario"].items():
+        e2e = stats["end_to_end_ms"]
+        print(f"{scenario_id}  p50 {e2e['p50']:>8} ms  p95 {e2e['p95']:>8} ms  tools/order {stats['tool_calls_per_order']:<5} "
+              f"turns/order {stats['model_turns_per_order']:<5} {stats['outcomes']}")
+    print("\nStage                                          count      p50      p95      p99 (ms)")
+    for stage, stats in scenarios["stages_ms"].items():
+        print(f"{stage:<44} {stats['count']:>7} {stats['p50']:>8} {stats['p95']:>8} {stats['p99']:>8}")
+    print(f"Tool calls: {scenarios['tool_calls']}")
+
+    print(f"\n=== Synthetic load ({report['config']['synthetic_orders']} orders) ===")
+    for level in report["load"]:
+        e2e = level["stages_ms"]["end_to_end"]
+        print(f"concurrency {level['concurrency']:>4}: {level['orders_per_second']:>9} orders/s  "
+              f"p50 {e2e['p50']:>8} ms  p95 {e2e['p95']:>8} ms  p99 {e2e['p99']:>8} ms  "
+              f"tools/order {level['tool_calls_per_order']}  loop lag p99 {level['event_loop_lag_ms'].get('p99')} ms  {level['outcomes']}")
+    memory = report["memory"]
+    print(f"\nMemory: traced peak {memory['traced_peak_kib']} KiB at concurrency {memory['concurrency']}, max RSS {memory['max_rss_kib']} KiB")
+    print(f"Decision cache checks: {len(report['cache_checks'])} mismatch(es)")
+    for message in report["cache_checks"]:
+        print(f"  - {message}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmark of the order routing pipeline on a scripted model.")
+    parser.add_argument("--mode", choices=ROUTING_MODES, default=ROUTING_MODE_AGENT, help="Routing mode.")
+    parser.add_argument("--intake", choices=INTAKE_MODES, default=INTAKE_MODE_AGENT, help="Intake mode (default: the full two-agent flow).")
+    parser.add_argument("--use-cache", action="store_true", help="Serve repeat orders from the decision cache.")
+    parser.add_argument("--stream", action="store_true", help="Drive the agents with Runner.run_streamed.")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated latency of every model turn.")
+    parser.add_argument("--tool-latency-ms", type=float, default=0.0, help="Simulated latency of every data-store lookup the tools make.")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY_LEVELS)), help="Comma-separated concurrency levels.")
+    parser.add_argument("--orders", type=int, default=DEFAULT_SYNTHETIC_ORDERS, help="Synthetic orders per concurrency level.")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_SCENARIO_REPEATS, help="Runs of each SC01-SC09 scenario.")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for the synthetic orders.")
+    parser.add_argument("--json", help="Write the full report to this file.")
+    parser.add_argument("--save-baseline", help="Write the report to this baseline file.")
+    parser.add_argument("--compare", help="Compare against this baseline file and exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative latency/throughput/memory regression.")
+    parser.add_argument("--advisory-timings", action="store_true",
+                        help="With --compare, report latency/throughput/memory regressions but only fail on the deterministic checks.")
+    args = parser.parse_args()
+
+    # Per-order logging would dominate the measurement (and invalid orders are part of the load)
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    report = asyncio.run(run_benchmark(
+        concurrency_levels=tuple(int(level) for level in args.concurrency.split(",")),
+        synthetic_count=args.orders,
+        repeats=args.repeats,
+        seed=args.seed,
+        mode=args.mode,
+        intake=args.intake,
+        use_cache=args.use_cache,
+        stream_agent=args.stream,
+        model_latency_ms=args.model_latency_ms,
+        tool_latency_ms=args.tool_latency_ms,
+    ))
+    print_report(report)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance, timings=not args.advisory_timings)
+        if args.advisory_timings:
+            timing_regressions = [message for message in compare_reports(report, baseline, args.tolerance) if message not in regressions]
+            environment = report["environment"]
+            if environment != baseline.get("environment"):
+                print(f"\nEnvironment {environment} differs from the baseline's {baseline.get('environment')}.")
+            print(f"\n{len(timing_regressions)} timing difference(s) against {args.compare} (advisory):")
+            for message in timing_regressions:
+                print(f"  - {message}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for message in regressions:
+                print(f"  - {message}")
+            sys.exit(1)
+        if args.advisory_timings:
+            print(f"\nNo regressions in the deterministic checks against {args.compare}.")
+        else:
+            print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%}).")
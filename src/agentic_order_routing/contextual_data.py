@@ -0,0 +1,268 @@
+# Cached, versioned views of the reference data for the Agentic AI Order Routing POC.
+# The /contextual-data response used to be rebuilt and re-serialized on every request.
+# Here each response body is built once per data version (available stock plus shipping
+# data), serialized to JSON, gzip-compressed ahead of time when it is large, and tagged
+# with a strong ETag, so the API can answer unchanged data with 304 Not Modified and
+# serve compressed bytes without per-request work. The full reference databases grow with
+# the catalog, so the summary embeds at most their first page, and only when asked to;
+# clients read them page by page from section endpoints, which are served from the data
+# store with indexed range queries.
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from agentic_order_routing.data_store import PAGE_MAX_ENTRIES, get_data_store
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.shipping_index import get_shipping_index
+
+logger = logging.getLogger("agent_workflow")
+
+# Full-database sections that can be included in the summary or paged separately.
+FULL_SECTIONS = ("full_customers", "full_inventory", "full_shipping_options", "full_zip_to_zone", "full_product_weights")
+
+# Bodies smaller than this are not worth compressing.
+COMPRESSION_MIN_BYTES = 1024
+# Distinct (version, view) bodies kept; older versions are evicted first.
+MAX_CACHED_BODIES = 64
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = PAGE_MAX_ENTRIES
+# Sections keyed by location hold a whole location per entry (every product it stocks,
+# or every lane it ships), so their pages are capped lower.
+SECTION_MAX_PAGE_SIZE = {"full_inventory": 100, "full_shipping_options": 10}
+# Products and customers listed in the summary; the counts always cover the whole store.
+SUMMARY_LIST_LIMIT = 1000
+# Entries of each full section embedded in the summary with ?include= (at most a full page)
+SUMMARY_SECTION_LIMIT = MAX_PAGE_SIZE
+
+
+def max_page_size(name):
+    """Returns the largest page served for a full section."""
+    return SECTION_MAX_PAGE_SIZE.get(name, MAX_PAGE_SIZE)
+
+
+class EncodedBody:
+    """A serialized response body with its precompressed form and strong ETag."""
+
+    __slots__ = ("body", "gzip_body", "etag")
+
+    def __init__(self, body):
+        self.body = body
+        # mtime=0 keeps the compressed bytes identical across rebuilds of the same data
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= COMPRESSION_MIN_BYTES else None
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    @classmethod
+    def from_data(cls, data):
+        """Serializes a JSON-compatible value compactly."""
+        return cls(json.dumps(data, separators=(",", ":"), default=str).encode("utf-8"))
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header value names this body's ETag."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class ContextualDataService:
+    """
+    Builds the /contextual-data views and caches them per data version.
+
+    Each view is cached against the data it reads. The summary's availability part (the
+    inventory summary, the first page of full_inventory) follows the inventory's
+    `availability_version`, which every reservation advances, and is rebuilt from
+    per-product lookups; the rest of the summary (lists, counts, the first pages of the
+    other sections) follows the on-hand `version` and the shipping index version only,
+    and is serialized once and spliced in. The CRM, ZIP and weight tables are static for
+    the lifetime of the process.
+    """
+
+    def __init__(self, inventory_service, shipping_index, store):
+        self.inventory = inventory_service
+        self.shipping_index = shipping_index
+        self.store = store
+        self._lock = threading.Lock()
+        self._bodies = OrderedDict()  # (version, view) -> EncodedBody
+        self._summary_parts = OrderedDict()  # (on-hand version, shipping version, include) -> SummaryPart
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        return (self.inventory.availability_version, self.shipping_index.version)
+
+    def _section_version(self, name):
+        # The versions a section page is built from
+        if name == "full_inventory":
+            return (self.inventory.availability_version,)
+        if name == "full_shipping_options":
+            return (self.shipping_index.version,)
+        return ()
+
+    def _cached(self, version, view, build):
+        key = (version, view)
+        with self._lock:
+            encoded = self._bodies.get(key)
+            if encoded is not None:
+                self._bodies.move_to_end(key)
+                self.hits += 1
+                return encoded
+            self.misses += 1
+        # Built outside the lock; two concurrent misses just build the same body twice
+        encoded = build(version)
+        with self._lock:
+            self._bodies[key] = encoded
+            while len(self._bodies) > MAX_CACHED_BODIES:
+                self._bodies.popitem(last=False)
+        return encoded
+
+    # --- Views ---
+    def summary(self, include=()):
+        """
+        Returns the encoded /contextual-data body.
+
+        Args:
+            include: The FULL_SECTIONS whose first page (up to SUMMARY_SECTION_LIMIT
+                entries) is embedded, with each section's total entry count under "section_totals";
+                read the rest (and the sections left out) with section().
+        """
+        include = tuple(name for name in FULL_SECTIONS if name in include)
+        return self._cached(self.version(), ("summary", include), lambda version: self._build_summary(include, version))
+
+    def section(self, name, offset=0, limit=DEFAULT_PAGE_SIZE, prefix=None):
+        """
+        Returns one page of a full-database section as an encoded body.
+
+        Entries are sorted by key; `prefix` keeps only keys starting with it (e.g. a
+        location ID, a ZIP prefix or a customer ID prefix). `limit` is capped at the
+        section's maximum page size (see max_page_size()).
+        """
+        if name not in FULL_SECTIONS:
+            raise KeyError(name)
+        limit = min(limit, max_page_size(name))
+        return self._cached(self._section_version(name), ("section", name, offset, limit, prefix),
+                            lambda version: EncodedBody.from_data(self._build_page(name, offset, limit, prefix, version)))
+
+    def _summary_part(self, include):
+        # The part of the summary that only changes with on-hand stock or shipping data
+        key = (self.inventory.version, self.shipping_index.version, include)
+        with self._lock:
+            part = self._summary_parts.get(key)
+            if part is not None:
+                self._summary_parts.move_to_end(key)
+                return part
+        products = self.store.stocked_products(SUMMARY_LIST_LIMIT)
+        warehouses = self.inventory.locations()
+        zones = self.store.zones()
+        customer_count, customers = self.store.page("customers", 0, SUMMARY_LIST_LIMIT)
+        data = {
+            "warehouse_count": len(warehouses),
+            "product_count": self.store.count_stocked_products(),
+            "customer_count": customer_count,
+            "zone_count": len(zones),
+            "warehouses": warehouses,
+            "products": products,
+            "customers": [{"id": customer_id, **details} for customer_id, details in customers.items()],
+            "zones": zones,
+        }
+        totals = {}
+        inventory_rows = None
+        for name in include:
+            totals[name], items = self.store.page(name.removeprefix("full_"), 0, min(SUMMARY_SECTION_LIMIT, max_page_size(name)))
+            if name == "full_inventory":
+                # On-hand rows; availability is applied per availability version
+                inventory_rows = items
+            else:
+                data[name] = items
+        if include:
+            data["section_totals"] = totals
+        part = (products, inventory_rows, json.dumps(data, separators=(",", ":"), default=str).encode("utf-8"))
+        with self._lock:
+            self._summary_parts[key] = part
+            while len(self._summary_parts) > MAX_CACHED_BODIES:
+                self._summary_parts.popitem(last=False)
+        return part
+
+    def _build_summary(self, include, version):
+        products, inventory_rows, static_body = self._summary_part(include)
+        # Available stock (on hand minus live reservations) of the first listed products
+        data = {"inventory_summary": {product_id: self.inventory.available_by_location(product_id) for product_id in products}}
+        if inventory_rows is not None:
+            data["full_inventory"] = {location_id: self.inventory.available_at(location_id, on_hand)
+                                      for location_id, on_hand in inventory_rows.items()}
+        data["data_version"] = list(version)
+        dynamic_body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        # Both parts are JSON objects; join their members into one
+        return EncodedBody(static_body[:-1] + b"," + dynamic_body[1:])
+
+    def _build_page(self, name, offset, limit, prefix, version):
+        total, items = self.store.page(name.removeprefix("full_"), offset, limit, prefix)
+        if name == "full_inventory":
+            items = {location_id: self.inventory.available_at(location_id, on_hand) for location_id, on_hand in items.items()}
+        return {
+            "section": name,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": items,
+            "data_version": list(version),
+        }
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._bodies), "summary_parts": len(self._summary_parts), "hits": self.hits, "misses": self.misses}
+
+
+class StaticFileCache:
+    """
+    Serves a static file from memory; it is re-read only when its mtime or size changes,
+    which costs one stat() per request instead of a full read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._body = None
+
+    def get(self):
+        """Returns the cached body, or None if the file does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._stamp:
+                with open(self.path, "rb") as f:
+                    self._body = EncodedBody(f.read())
+                self._stamp = stamp
+                logger.info(f"STATIC: loaded {self.path} ({stat.st_size} bytes)")
+            return self._body
+
+
+_service = None
+
+def get_contextual_data_service():
+    """Returns the shared contextual data service over the inventory service and data store."""
+    global _service
+    if _service is None:
+        _service = ContextualDataService(get_inventory_service(), get_shipping_index(), get_data_store())
+    return _service
+
+
+if __name__ == '__main__':
+    import time
+
+    service = get_contextual_data_service()
+    for attempt in ("cold", "warm"):
+        start = time.perf_counter()
+        encoded = service.summary(include=FULL_SECTIONS)
+        print(f"{attempt}: {len(encoded.body)} bytes, gzip {len(encoded.gzip_body or b'')} bytes, "
+              f"etag {encoded.etag}, {(time.perf_counter() - start) * 1e6:.0f} us")
+    print(json.loads(service.section("full_zip_to_zone", limit=3, prefix="9").body))
+    print(service.stats())
@@ -0,0 +1,203 @@
+# Data-scaling benchmark for the Agentic AI Order Routing POC.
+# Generates (or reuses) synthetic catalogs at several scales with synthetic_data.py and,
+# for each data-store backend, measures how long the service takes to start, the latency
+# of every per-order lookup (the same functions the tools and the deterministic path
+# call), the /contextual-data views, and resident memory. Each (scale, backend) pair runs
+# in a fresh subprocess, so startup time and RSS are not polluted by earlier runs.
+#
+#   python -m agentic_order_routing.data_benchmark --scales small,medium --json benchmarks/data_scaling.json
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from agentic_order_routing.benchmark import summarize
+from agentic_order_routing.synthetic_data import SCALES, customer_id, generate_dataset, sku_id
+
+logger = logging.getLogger("agent_workflow")
+
+BACKENDS = ("sqlite", "memory")
+DEFAULT_SCALES = ("small", "medium")
+DEFAULT_LOOKUPS = 2_000
+
+
+def current_rss_kib():
+    """Resident set size of this process in KiB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# --- Worker (one scale and backend per process) ---
+def _time_calls(calls):
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def measure(path, backend, lookups=DEFAULT_LOOKUPS, seed=7):
+    """
+    Starts the routing services over one catalog and measures them.
+
+    Args:
+        path: An SQLite catalog written by synthetic_data.py.
+        backend: "sqlite" to query the catalog, or "memory" to load it into an InMemoryDataStore.
+        lookups: Calls timed per lookup.
+
+    Returns:
+        A dict with startup_ms per phase, lookups_ms per lookup (latency summaries) and rss_kib.
+    """
+    rss = {"baseline": current_rss_kib()}
+    startup = {}
+    start = time.perf_counter()
+    from agentic_order_routing import data_store
+    store = data_store.SQLiteDataStore(path)
+    if backend == "memory":
+        store = data_store.load_in_memory(store)
+    data_store.set_data_store(store)
+    startup["open_store"] = (time.perf_counter() - start) * 1000
+
+    from agentic_order_routing.contextual_data import get_contextual_data_service
+    from agentic_order_routing.inventory_service import get_inventory_service
+    from agentic_order_routing.routing_engine import get_routing_engine
+    from agentic_order_routing.shipping_index import get_shipping_index
+    from agentic_order_routing.tools.intake_agent_tools import lookup_customer_details
+    from agentic_order_routing.tools.routing_tools import find_stocked_locations, lookup_customer_zone, lookup_customer_zones
+    from agentic_order_routing.zip_index import get_zip_index
+
+    for phase, build in (("inventory_service", get_inventory_service), ("shipping_index", get_shipping_index), ("routing_engine", get_routing_engine), ("zip_index", get_zip_index)):
+        start = time.perf_counter()
+        build()
+        startup[phase] = (time.perf_counter() - start) * 1000
+    startup["total"] = sum(startup.values())
+    rss["after_startup"] = current_rss_kib()
+
+    spec = {key: int(value) for key, value in data_store.SQLiteDataStore(path).info().items() if value.isdigit()}
+    rng = random.Random(seed)
+    customers = [customer_id(rng.randrange(spec["customers"])) for _ in range(lookups)]
+    products = [sku_id(rng.randrange(spec["skus"])) for _ in range(lookups)]
+    zips = [lookup_customer_details(cid).get("zip_code") for cid in customers[:lookups]]
+    zones = [lookup_customer_zone(zip_code) for zip_code in zips]
+    locations = get_inventory_service().locations()
+    index, engine, service = get_shipping_index(), get_routing_engine(), get_contextual_data_service()
+
+    lookup_ms = {
+        "lookup_customer_details": _time_calls(lambda cid=cid: lookup_customer_details(cid) for cid in customers),
+        "lookup_customer_zone": _time_calls(lambda z=z: lookup_customer_zone(z) for z in zips),
+        # One call per batch of 1000 ZIPs
+        "lookup_customer_zones_x1000": _time_calls(
+            lambda i=i: lookup_customer_zones(zips[i:i + 1000]) for i in range(0, len(zips), 1000)),
+        "find_stocked_locations": _time_calls(lambda p=p: find_stocked_locations(p, 1) for p in products),
+        "shipping_lane": _time_calls(
+            lambda p=p, z=z: index.get(rng.choice(locations), z, p) for p, z in zip(products, zones)),
+        "engine_recommend": _time_calls(
+            lambda p=p, z=z: engine.recommend(p, 1, z, "gold", "MINIMIZE_COST") for p, z in zip(products, zones)),
+        # Repeat lookups of a hot product, as after the caches have warmed up
+        "engine_recommend_warm": _time_calls(
+            lambda: engine.recommend(products[0], 1, zones[0], "gold", "MINIMIZE_COST") for _ in range(lookups)),
+    }
+    start = time.perf_counter()
+    summary = service.summary(include=())
+    contextual = {"summary_cold_ms": round((time.perf_counter() - start) * 1000, 3), "summary_bytes": len(summary.body)}
+    lookup_ms["contextual_summary_warm"] = _time_calls(lambda: service.summary(include=()) for _ in range(100))
+    lookup_ms["contextual_page"] = _time_calls(
+        lambda offset=offset: service.section("full_customers", offset, 100) for offset in range(0, 100 * 50, 100))
+    rss["final"] = current_rss_kib()
+    rss["peak"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "backend": backend,
+        "dataset": spec,
+        "startup_ms": {phase: round(ms, 3) for phase, ms in startup.items()},
+        "lookups_ms": lookup_ms,
+        "contextual": contextual,
+        "rss_kib": rss,
+    }
+
+
+# --- Driver ---
+def dataset_path(directory, scale, seed):
+    return os.path.join(directory, f"routing-{scale}-seed{seed}.db")
+
+
+def ensure_dataset(directory, scale, seed):
+    """Returns the catalog for a scale, generating it unless a matching one exists."""
+    path = dataset_path(directory, scale, seed)
+    if os.path.exists(path):
+        logger.info(f"DATA_BENCHMARK: reusing {path}")
+        return path, None
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    generate_dataset(path, scale, seed)
+    return path, round(time.perf_counter() - start, 2)
+
+
+def run_data_benchmark(scales=DEFAULT_SCALES, backends=BACKENDS, directory="benchmarks/data", lookups=DEFAULT_LOOKUPS, seed=7):
+    """Measures every (scale, backend) pair in a subprocess and returns the combined report."""
+    results = []
+    for scale in scales:
+        path, generate_s = ensure_dataset(directory, scale, seed)
+        for backend in backends:
+            logger.info(f"DATA_BENCHMARK: measuring {scale} on {backend}")
+            completed = subprocess.run(
+                [sys.executable, "-m", "agentic_order_routing.data_benchmark", "--worker", path, "--backends", backend,
+                 "--lookups", str(lookups), "--seed", str(seed)],
+                capture_output=True, text=True, check=False,
+            )
+            if completed.returncode != 0:
+                results.append({"scale": scale, "backend": backend, "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append({"scale": scale, "file_mib": round(os.path.getsize(path) / 2**20, 1), "generate_s": generate_s, **result})
+    return {"config": {"scales": list(scales), "backends": list(backends), "lookups": lookups, "seed": seed}, "results": results}
+
+
+def print_data_report(report):
+    print(f"\n{'scale':<8} {'backend':<8} {'file MiB':>9} {'startup ms':>11} {'RSS MiB':>8}  lookup p50 / p95 (ms)")
+    for result in report["results"]:
+        if "error" in result:
+            print(f"{result['scale']:<8} {result['backend']:<8} failed: {result['error']}")
+            continue
+        rss_mib = result["rss_kib"]["final"] / 1024
+        print(f"{result['scale']:<8} {result['backend']:<8} {result['file_mib']:>9} {result['startup_ms']['total']:>11.1f} {rss_mib:>8.1f}")
+        for name, stats in result["lookups_ms"].items():
+            print(f"{'':<49}{name:<26} {stats['p50']:>8} / {stats['p95']:>8}")
+        print(f"{'':<49}{'contextual summary (cold)':<26} {result['contextual']['summary_cold_ms']:>8} ms, "
+              f"{result['contextual']['summary_bytes']} bytes")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark lookups, startup and memory against synthetic catalogs of growing size.")
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES), help=f"Comma-separated scales from {list(SCALES)}.")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated data-store backends.")
+    parser.add_argument("--dir", default="benchmarks/data", help="Where generated catalogs are written and reused.")
+    parser.add_argument("--lookups", type=int, default=DEFAULT_LOOKUPS, help="Timed calls per lookup.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write the full report to this file.")
+    parser.add_argument("--worker", metavar="CATALOG", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR if args.worker else logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.backends, args.lookups, args.seed)))
+        sys.exit(0)
+
+    report = run_data_benchmark(args.scales.split(","), args.backends.split(","), args.dir, args.lookups, args.seed)
+    print_data_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
@@ -0,0 +1,870 @@
+# Pluggable data-store layer for the Agentic AI Order Routing POC.
+# Every lookup of customers, ZIP zones, stock, shipping options and product weights goes
+# through a DataStore, so the mock dictionaries can be swapped for a real store.
+# InMemoryDataStore serves the mock_data.py dicts; SQLiteDataStore serves an indexed
+# SQLite catalog through a small connection pool, so the service can run against
+# catalogs with millions of rows while only keeping recently used entries in memory
+# (see the caches in inventory_service.py, shipping_index.py and routing_engine.py).
+#
+# The backend is chosen with ORDER_ROUTING_DATA_STORE: "memory" (the default) or
+# "sqlite:///path/to/catalog.db". Build a catalog with synthetic_data.py. Setting
+# ORDER_ROUTING_SIMULATED_LATENCY_MS wraps the chosen store in a SimulatedLatencyDataStore,
+# which delays every per-order lookup as a remote database or rate service would.
+# ORDER_ROUTING_SHARED_SNAPSHOT names a shared-memory snapshot (see shared_snapshot.py)
+# that serves stock and shipping lanes for every worker process of a multi-worker server.
+
+import asyncio
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from agentic_order_routing.mock_data import (
+    INVENTORY_DB,
+    MOCK_CRM_DB,
+    PRODUCT_WEIGHT_DB,
+    SHIPPING_OPTIONS_DB,
+    ZIP_TO_ZONE_DB,
+    ZIP_ZONE_RANGES,
+)
+
+logger = logging.getLogger("agent_workflow")
+
+DATA_STORE_ENV = "ORDER_ROUTING_DATA_STORE"
+SIMULATED_LATENCY_ENV = "ORDER_ROUTING_SIMULATED_LATENCY_MS"
+SHARED_SNAPSHOT_ENV = "ORDER_ROUTING_SHARED_SNAPSHOT"
+
+# Browsable tables, as served page by page by /contextual-data/{section}
+SECTIONS = ("customers", "inventory", "shipping_options", "zip_to_zone", "product_weights")
+# Most keys one page() call returns; whole tables are read with iter_section()
+PAGE_MAX_ENTRIES = 1000
+
+
+def page_limit(limit):
+    """Caps a page() limit at PAGE_MAX_ENTRIES (None asks for the largest page)."""
+    return PAGE_MAX_ENTRIES if limit is None else min(limit, PAGE_MAX_ENTRIES)
+
+
+class DataStore:
+    """
+    Repository interface over the routing reference data and stock.
+
+    Shipping options are (carrier, cost, days, co2_kg) tuples. Implementations must be
+    safe to call from several threads (call_async runs lookups in worker threads).
+    """
+
+    # True when every table is held in process memory, so callers may index it up front
+    in_memory = False
+
+    # --- CRM and ZIP zones ---
+    def get_customer(self, customer_id):
+        """Returns {"name", "zip_code", "tier"} for a customer, or None if unknown."""
+        raise NotImplementedError
+
+    def zone_for_zip(self, zip_code):
+        """Returns the zone of an exactly mapped ZIP code, or None (ranges are not consulted)."""
+        raise NotImplementedError
+
+    def zip_zone_ranges(self):
+        """Returns the sorted (first ZIP, last ZIP, zone) ranges as integers, both ends inclusive."""
+        raise NotImplementedError
+
+    # --- Stock ---
+    def stock_for_product(self, product_id):
+        """Returns {location_id: on-hand units} for the locations stocking a product."""
+        raise NotImplementedError
+
+    def set_stock(self, product_id, location_id, units):
+        """Writes a location's on-hand units for a product."""
+        raise NotImplementedError
+
+    def set_stock_many(self, rows):
+        """Writes many (product_id, location_id, units) rows; stores override this to write them in one batch."""
+        for product_id, location_id, units in rows:
+            self.set_stock(product_id, location_id, units)
+
+    def iter_stock(self):
+        """Yields (location_id, product_id, on-hand units) for every stocked pair."""
+        raise NotImplementedError
+
+    def stocked_products(self, limit=None):
+        """Returns the sorted IDs of products with stock somewhere, at most `limit` of them."""
+        raise NotImplementedError
+
+    def count_stocked_products(self):
+        raise NotImplementedError
+
+    # --- Shipping ---
+    def shipping_options(self, location_id, zone, product_id):
+        """Returns the shipping options on one (location, zone, product) lane."""
+        raise NotImplementedError
+
+    def shipping_options_for_product(self, product_id):
+        """Returns [(location_id, zone, carrier, cost, days, co2_kg), ...] for a product."""
+        raise NotImplementedError
+
+    def product_lane_arrays(self, product_id):
+        """
+        Optional zero-copy view of a product's shipping options as {zone index:
+        (location indexes, carrier indexes, 3 x n array of cost, days, co2_kg)}, with
+        indexes into locations(), zones() and carriers() and lanes sorted by location then
+        carrier. Returns None when the store has no such view (the routing engine then
+        builds the arrays from shipping_options_for_product).
+        """
+        return None
+
+    def iter_shipping_options(self):
+        """Yields (location_id, zone, product_id, carrier, cost, days, co2_kg) for every option."""
+        raise NotImplementedError
+
+    def locations(self):
+        """Returns the sorted IDs of every location holding stock or shipping lanes."""
+        raise NotImplementedError
+
+    def zones(self):
+        """Returns the sorted shipping zones served by at least one lane."""
+        raise NotImplementedError
+
+    def carriers(self):
+        """Returns the sorted carrier names."""
+        raise NotImplementedError
+
+    def product_weight(self, product_id):
+        """Returns a product's weight in kg, or None if unknown."""
+        raise NotImplementedError
+
+    # --- Browsing ---
+    def count(self, section):
+        """Returns the number of keys in one of SECTIONS."""
+        raise NotImplementedError
+
+    def page(self, section, offset=0, limit=PAGE_MAX_ENTRIES, prefix=None):
+        """
+        Returns one page of a section as (total, {key: value}), sorted by key.
+
+        Keys are customer IDs, location IDs (inventory as {product_id: units}, shipping
+        options as {zone: [(product_id, carrier, cost, days, co2_kg), ...]}), ZIP codes
+        or product IDs; `prefix` keeps only keys starting with it and `total` counts the
+        keys that match. At most PAGE_MAX_ENTRIES keys are returned, whatever `limit` is.
+        """
+        raise NotImplementedError
+
+    def iter_section(self, section):
+        """
+        Yields (key, value) for every key of a section in key order, reading it page by
+        page. For bulk copies (load_in_memory, the ZIP index), not for request paths.
+        """
+        offset = 0
+        while True:
+            _, items = self.page(section, offset, PAGE_MAX_ENTRIES)
+            yield from items.items()
+            if len(items) < PAGE_MAX_ENTRIES:
+                return
+            offset += len(items)
+
+    async def call_async(self, method, *args):
+        """Runs a store method in a worker thread, for use from async code and tools."""
+        return await asyncio.to_thread(getattr(self, method), *args)
+
+    def close(self):
+        pass
+
+
+class InMemoryDataStore(DataStore):
+    """
+    Serves the mock_data.py dictionaries. Read-only tables are used as given; stock is
+    copied, since InventoryService writes committed changes back to the store.
+    """
+
+    in_memory = True
+
+    def __init__(self, crm_db=None, inventory_db=None, shipping_options_db=None, zip_to_zone_db=None, product_weight_db=None, zip_zone_ranges=None):
+        self.crm_db = crm_db if crm_db is not None else {}
+        self.zip_to_zone_db = zip_to_zone_db if zip_to_zone_db is not None else {}
+        self.zip_zone_ranges_db = sorted(zip_zone_ranges or ())
+        self.product_weight_db = product_weight_db if product_weight_db is not None else {}
+        self.shipping_options_db = shipping_options_db if shipping_options_db is not None else {}
+        self._lock = threading.Lock()
+        self._stock = {}  # product_id -> {location_id: units}
+        self._location_ids = set(self.shipping_options_db)
+        for location_id, stock in (inventory_db or {}).items():
+            self._location_ids.add(location_id)
+            for product_id, units in stock.items():
+                if units > 0:
+                    self._stock.setdefault(product_id, {})[location_id] = units
+        self._lanes = {}       # (location_id, zone, product_id) -> [(carrier, cost, days, co2_kg)]
+        self._by_product = {}  # product_id -> [(location_id, zone, carrier, cost, days, co2_kg)]
+        for location_id, zone, product_id, carrier, cost, days, co2_kg in self.iter_shipping_options():
+            self._lanes.setdefault((location_id, zone, product_id), []).append((carrier, cost, days, co2_kg))
+            self._by_product.setdefault(product_id, []).append((location_id, zone, carrier, cost, days, co2_kg))
+
+    def get_customer(self, customer_id):
+        return self.crm_db.get(customer_id)
+
+    def zone_for_zip(self, zip_code):
+        return self.zip_to_zone_db.get(zip_code)
+
+    def zip_zone_ranges(self):
+        return list(self.zip_zone_ranges_db)
+
+    def stock_for_product(self, product_id):
+        with self._lock:
+            return dict(self._stock.get(product_id, {}))
+
+    def set_stock(self, product_id, location_id, units):
+        self.set_stock_many(((product_id, location_id, units),))
+
+    def set_stock_many(self, rows):
+        with self._lock:
+            for product_id, location_id, units in rows:
+                stock = self._stock.setdefault(product_id, {})
+                if units > 0:
+                    stock[location_id] = units
+                else:
+                    stock.pop(location_id, None)
+
+    def iter_stock(self):
+        with self._lock:
+            rows = [(location_id, product_id, units) for product_id, stock in self._stock.items() for location_id, units in stock.items()]
+        return iter(rows)
+
+    def stocked_products(self, limit=None):
+        with self._lock:
+            products = sorted(product_id for product_id, stock in self._stock.items() if stock)
+        return products if limit is None else products[:limit]
+
+    def count_stocked_products(self):
+        with self._lock:
+            return sum(1 for stock in self._stock.values() if stock)
+
+    def shipping_options(self, location_id, zone, product_id):
+        return list(self._lanes.get((location_id, zone, product_id), ()))
+
+    def shipping_options_for_product(self, product_id):
+        return list(self._by_product.get(product_id, ()))
+
+    def iter_shipping_options(self):
+        for location_id, zones in self.shipping_options_db.items():
+            for zone, options in zones.items():
+                for product_id, carrier, cost, days, co2_kg in options:
+                    yield location_id, zone, product_id, carrier, cost, days, co2_kg
+
+    def locations(self):
+        return sorted(self._location_ids)
+
+    def zones(self):
+        return sorted({zone for _, zone, _ in self._lanes})
+
+    def carriers(self):
+        return sorted({option[0] for options in self._lanes.values() for option in options})
+
+    def product_weight(self, product_id):
+        return self.product_weight_db.get(product_id)
+
+    def _section(self, section):
+        if section == "customers":
+            return self.crm_db
+        if section == "shipping_options":
+            return self.shipping_options_db
+        if section == "zip_to_zone":
+            return self.zip_to_zone_db
+        if section == "product_weights":
+            return self.product_weight_db
+        raise KeyError(section)
+
+    def _inventory_at(self, location_ids):
+        # {location_id: {product_id: units}} for the given locations only
+        inventory = {location_id: {} for location_id in location_ids}
+        with self._lock:
+            for product_id, stock in self._stock.items():
+                for location_id, units in stock.items():
+                    if location_id in inventory:
+                        inventory[location_id][product_id] = units
+        return inventory
+
+    def count(self, section):
+        return len(self.locations()) if section == "inventory" else len(self._section(section))
+
+    def page(self, section, offset=0, limit=PAGE_MAX_ENTRIES, prefix=None):
+        if section == "inventory":
+            keys = [key for key in self.locations() if not prefix or key.startswith(prefix)]
+            selected = keys[offset:offset + page_limit(limit)]
+            return len(keys), self._inventory_at(selected)
+        data = self._section(section)
+        keys = sorted(key for key in data if not prefix or key.startswith(prefix))
+        return len(keys), {key: data[key] for key in keys[offset:offset + page_limit(limit)]}
+
+    def iter_section(self, section):
+        if section == "inventory":
+            yield from sorted(self._inventory_at(self.locations()).items())
+        else:
+            data = self._section(section)
+            for key in sorted(data):
+                yield key, data[key]
+
+    async def call_async(self, method, *args):
+        # Dict reads never wait on I/O, so they run inline rather than in a worker thread
+        return getattr(self, method)(*args)
+
+
+class DelegatingDataStore(DataStore):
+    """
+    Base for stores that wrap another store: every call is forwarded to `store`, so a
+    subclass only overrides the calls it changes.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.in_memory = store.in_memory
+
+    def get_customer(self, customer_id):
+        return self.store.get_customer(customer_id)
+
+    def zone_for_zip(self, zip_code):
+        return self.store.zone_for_zip(zip_code)
+
+    def zip_zone_ranges(self):
+        return self.store.zip_zone_ranges()
+
+    def stock_for_product(self, product_id):
+        return self.store.stock_for_product(product_id)
+
+    def set_stock(self, product_id, location_id, units):
+        self.store.set_stock(product_id, location_id, units)
+
+    def set_stock_many(self, rows):
+        self.store.set_stock_many(rows)
+
+    def iter_stock(self):
+        return self.store.iter_stock()
+
+    def stocked_products(self, limit=None):
+        return self.store.stocked_products(limit)
+
+    def count_stocked_products(self):
+        return self.store.count_stocked_products()
+
+    def shipping_options(self, location_id, zone, product_id):
+        return self.store.shipping_options(location_id, zone, product_id)
+
+    def shipping_options_for_product(self, product_id):
+        return self.store.shipping_options_for_product(product_id)
+
+    def product_lane_arrays(self, product_id):
+        return self.store.product_lane_arrays(product_id)
+
+    def iter_shipping_options(self):
+        return self.store.iter_shipping_options()
+
+    def locations(self):
+        return self.store.locations()
+
+    def zones(self):
+        return self.store.zones()
+
+    def carriers(self):
+        return self.store.carriers()
+
+    def product_weight(self, product_id):
+        return self.store.product_weight(product_id)
+
+    def count(self, section):
+        return self.store.count(section)
+
+    def page(self, section, offset=0, limit=PAGE_MAX_ENTRIES, prefix=None):
+        return self.store.page(section, offset, limit, prefix)
+
+    def iter_section(self, section):
+        return self.store.iter_section(section)
+
+    async def call_async(self, method, *args):
+        return await self.store.call_async(method, *args)
+
+    def close(self):
+        self.store.close()
+
+
+class SimulatedLatencyDataStore(DelegatingDataStore):
+    """
+    Wraps another store and delays each per-order lookup (customers, ZIP zones, stock,
+    shipping lanes, weights) as a remote database or carrier-rate service would; every
+    other call passes straight through. Sync calls sleep the calling thread, while
+    call_async awaits the delay, so async callers leave the event loop free.
+
+    Args:
+        store: The store that answers the calls.
+        latency_ms: Mean delay per lookup.
+        jitter_ms: Each delay is drawn uniformly from latency_ms +/- jitter_ms.
+        seed: Seed for the jitter.
+    """
+
+    DELAYED = frozenset(("get_customer", "zone_for_zip", "stock_for_product", "shipping_options", "shipping_options_for_product", "product_weight"))
+
+    def __init__(self, store, latency_ms=20.0, jitter_ms=0.0, seed=None):
+        super().__init__(store)
+        self.in_memory = False  # Lookups go through the delay, so nothing is indexed up front
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+
+    def delay_seconds(self):
+        return max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _lookup(self, method, *args):
+        time.sleep(self.delay_seconds())
+        return getattr(self.store, method)(*args)
+
+    def get_customer(self, customer_id):
+        return self._lookup("get_customer", customer_id)
+
+    def zone_for_zip(self, zip_code):
+        return self._lookup("zone_for_zip", zip_code)
+
+    def stock_for_product(self, product_id):
+        return self._lookup("stock_for_product", product_id)
+
+    def shipping_options(self, location_id, zone, product_id):
+        return self._lookup("shipping_options", location_id, zone, product_id)
+
+    def shipping_options_for_product(self, product_id):
+        return self._lookup("shipping_options_for_product", product_id)
+
+    def product_weight(self, product_id):
+        return self._lookup("product_weight", product_id)
+
+    async def call_async(self, method, *args):
+        if method in self.DELAYED:
+            await asyncio.sleep(self.delay_seconds())
+        return await self.store.call_async(method, *args)
+
+
+# --- SQLite ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY, name TEXT NOT NULL, zip_code TEXT, tier TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS zip_zones (
+    zip_code TEXT PRIMARY KEY, zone TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS zip_zone_ranges (
+    range_start INTEGER PRIMARY KEY, range_end INTEGER NOT NULL, zone TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS inventory (
+    product_id TEXT NOT NULL, location_id TEXT NOT NULL, units INTEGER NOT NULL,
+    PRIMARY KEY (product_id, location_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS inventory_by_location ON inventory (location_id, product_id);
+CREATE TABLE IF NOT EXISTS shipping_options (
+    location_id TEXT NOT NULL, zone TEXT NOT NULL, product_id TEXT NOT NULL, carrier TEXT NOT NULL,
+    cost REAL NOT NULL, days INTEGER NOT NULL, co2_kg REAL NOT NULL,
+    PRIMARY KEY (location_id, zone, product_id, carrier)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS shipping_by_product ON shipping_options (product_id, location_id, zone);
+CREATE TABLE IF NOT EXISTS product_weights (
+    product_id TEXT PRIMARY KEY, weight_kg REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS locations (location_id TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS zones (zone TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS carriers (carrier TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dataset_info (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+# Key column and table per browsable section
+_SECTION_KEYS = {
+    "customers": ("customers", "customer_id"),
+    "inventory": ("locations", "location_id"),
+    "shipping_options": ("locations", "location_id"),
+    "zip_to_zone": ("zip_zones", "zip_code"),
+    "product_weights": ("product_weights", "product_id"),
+}
+
+
+def _number(value):
+    # SQLite returns REAL columns as floats; keep integral values as ints like the mock data
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared across threads. Connections are opened
+    on demand up to `size`; callers beyond that wait for one to be returned. Each
+    connection keeps its own cache of compiled (prepared) statements.
+    """
+
+    def __init__(self, path, size=8, timeout=30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256, timeout=self.timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Bounded page cache per connection (negative = KiB)
+        conn.execute("PRAGMA cache_size=-16384")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    conn = self._open()
+            if conn is None:
+                conn = self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SQLiteDataStore(DataStore):
+    """
+    DataStore over an SQLite catalog (see SCHEMA). Every lookup is a parameterized
+    statement on a primary key or index, so its cost does not grow with the catalog.
+    """
+
+    def __init__(self, path, pool_size=8):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        # Key counts per (table, prefix); the key tables do not change while serving
+        self._counts = OrderedDict()
+        self._counts_lock = threading.Lock()
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            # The small dimension tables are read once
+            self._locations = [row[0] for row in conn.execute("SELECT location_id FROM locations ORDER BY location_id")]
+            self._zones = [row[0] for row in conn.execute("SELECT zone FROM zones ORDER BY zone")]
+            self._carriers = [row[0] for row in conn.execute("SELECT carrier FROM carriers ORDER BY carrier")]
+
+    def _all(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _one(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def get_customer(self, customer_id):
+        row = self._one("SELECT name, zip_code, tier FROM customers WHERE customer_id = ?", (customer_id,))
+        return {"name": row[0], "zip_code": row[1], "tier": row[2]} if row else None
+
+    def zone_for_zip(self, zip_code):
+        row = self._one("SELECT zone FROM zip_zones WHERE zip_code = ?", (zip_code,))
+        return row[0] if row else None
+
+    def zip_zone_ranges(self):
+        return self._all("SELECT range_start, range_end, zone FROM zip_zone_ranges ORDER BY range_start")
+
+    def stock_for_product(self, product_id):
+        return dict(self._all("SELECT location_id, units FROM inventory WHERE product_id = ? AND units > 0", (product_id,)))
+
+    def set_stock(self, product_id, location_id, units):
+        self.set_stock_many(((product_id, location_id, units),))
+
+    def set_stock_many(self, rows):
+        # One transaction per batch
+        rows = list(rows)
+        with self.pool.connection() as conn, conn:
+            conn.executemany(
+                "INSERT INTO inventory (product_id, location_id, units) VALUES (?, ?, ?) "
+                "ON CONFLICT (product_id, location_id) DO UPDATE SET units = excluded.units",
+                [row for row in rows if row[2] > 0],
+            )
+            conn.executemany(
+                "DELETE FROM inventory WHERE product_id = ? AND location_id = ?",
+                [(product_id, location_id) for product_id, location_id, units in rows if units <= 0],
+            )
+
+    def iter_stock(self):
+        # Streams rows in batches so a large catalog is never materialized at once
+        with self.pool.connection() as conn:
+            cursor = conn.execute("SELECT location_id, product_id, units FROM inventory WHERE units > 0 ORDER BY location_id, product_id")
+            while rows := cursor.fetchmany(1000):
+                yield from rows
+
+    def stocked_products(self, limit=None):
+        rows = self._all("SELECT DISTINCT product_id FROM inventory WHERE units > 0 ORDER BY product_id LIMIT ?",
+                         (-1 if limit is None else limit,))
+        return [row[0] for row in rows]
+
+    def count_stocked_products(self):
+        return self._one("SELECT COUNT(DISTINCT product_id) FROM inventory WHERE units > 0")[0]
+
+    def shipping_options(self, location_id, zone, product_id):
+        rows = self._all(
+            "SELECT carrier, cost, days, co2_kg FROM shipping_options WHERE location_id = ? AND zone = ? AND product_id = ? ORDER BY carrier",
+            (location_id, zone, product_id),
+        )
+        return [(carrier, _number(cost), days, co2_kg) for carrier, cost, days, co2_kg in rows]
+
+    def shipping_options_for_product(self, product_id):
+        rows = self._all(
+            "SELECT location_id, zone, carrier, cost, days, co2_kg FROM shipping_options WHERE product_id = ?",
+            (product_id,),
+        )
+        return [(location_id, zone, carrier, _number(cost), days, co2_kg) for location_id, zone, carrier, cost, days, co2_kg in rows]
+
+    def iter_shipping_options(self):
+        with self.pool.connection() as conn:
+            cursor = conn.execute("SELECT location_id, zone, product_id, carrier, cost, days, co2_kg FROM shipping_options")
+            while rows := cursor.fetchmany(1000):
+                for location_id, zone, product_id, carrier, cost, days, co2_kg in rows:
+                    yield location_id, zone, product_id, carrier, _number(cost), days, co2_kg
+
+    def locations(self):
+        return list(self._locations)
+
+    def zones(self):
+        return list(self._zones)
+
+    def carriers(self):
+        return list(self._carriers)
+
+    def product_weight(self, product_id):
+        row = self._one("SELECT weight_kg FROM product_weights WHERE product_id = ?", (product_id,))
+        return row[0] if row else None
+
+    @staticmethod
+    def _prefix_clause(column, prefix):
+        # A key range instead of LIKE, so the primary key index is used
+        if not prefix:
+            return "", ()
+        return f" WHERE {column} >= ? AND {column} < ?", (prefix, prefix + "\U0010ffff")
+
+    def _count_keys(self, table, column, prefix):
+        key = (table, prefix)
+        with self._counts_lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+        where, params = self._prefix_clause(column, prefix)
+        total = self._one(f"SELECT COUNT(*) FROM {table}{where}", params)[0]
+        with self._counts_lock:
+            self._counts[key] = total
+            while len(self._counts) > 1024:
+                self._counts.popitem(last=False)
+        return total
+
+    def count(self, section):
+        return self._count_keys(*_SECTION_KEYS[section], None)
+
+    def page(self, section, offset=0, limit=PAGE_MAX_ENTRIES, prefix=None):
+        table, column = _SECTION_KEYS[section]
+        where, params = self._prefix_clause(column, prefix)
+        total = self._count_keys(table, column, prefix)
+        paging = (*params, page_limit(limit), offset)
+        # Key-value tables are read in one range scan
+        if section == "customers":
+            rows = self._all(f"SELECT customer_id, name, zip_code, tier FROM customers{where} ORDER BY customer_id LIMIT ? OFFSET ?", paging)
+            return total, {key: {"name": name, "zip_code": zip_code, "tier": tier} for key, name, zip_code, tier in rows}
+        if section == "zip_to_zone":
+            return total, dict(self._all(f"SELECT zip_code, zone FROM zip_zones{where} ORDER BY zip_code LIMIT ? OFFSET ?", paging))
+        if section == "product_weights":
+            return total, dict(self._all(f"SELECT product_id, weight_kg FROM product_weights{where} ORDER BY product_id LIMIT ? OFFSET ?", paging))
+        items = {}
+        for (key,) in self._all(f"SELECT location_id FROM locations{where} ORDER BY location_id LIMIT ? OFFSET ?", paging):
+            if section == "inventory":
+                items[key] = dict(self._all(
+                    "SELECT product_id, units FROM inventory WHERE location_id = ? AND units > 0 ORDER BY product_id", (key,)))
+            else:
+                zones = {}
+                for zone, product_id, carrier, cost, days, co2_kg in self._all(
+                        "SELECT zone, product_id, carrier, cost, days, co2_kg FROM shipping_options WHERE location_id = ? "
+                        "ORDER BY zone, product_id, carrier", (key,)):
+                    zones.setdefault(zone, []).append((product_id, carrier, _number(cost), days, co2_kg))
+                items[key] = zones
+        return total, items
+
+    def iter_section(self, section):
+        # Key-value tables stream from one cursor instead of OFFSET pages
+        if section == "customers":
+            sql, row = "SELECT customer_id, name, zip_code, tier FROM customers ORDER BY customer_id", \
+                lambda key, name, zip_code, tier: (key, {"name": name, "zip_code": zip_code, "tier": tier})
+        elif section == "zip_to_zone":
+            sql, row = "SELECT zip_code, zone FROM zip_zones ORDER BY zip_code", lambda key, zone: (key, zone)
+        elif section == "product_weights":
+            sql, row = "SELECT product_id, weight_kg FROM product_weights ORDER BY product_id", lambda key, weight: (key, weight)
+        else:
+            yield from super().iter_section(section)
+            return
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql)
+            while rows := cursor.fetchmany(1000):
+                for values in rows:
+                    yield row(*values)
+
+    def info(self):
+        """Returns the {key: value} metadata recorded when the catalog was built (e.g. by synthetic_data.py)."""
+        return dict(self._all("SELECT key, value FROM dataset_info"))
+
+    def close(self):
+        self.pool.close()
+
+    # --- Loading ---
+    @classmethod
+    def build(cls, path, customers=(), zip_zones=(), inventory=(), shipping_options=(), product_weights=(), zip_zone_ranges=(), info=None, batch_size=50_000):
+        """
+        Creates (or extends) a catalog from row iterables and returns a store over it.
+
+        Args:
+            customers: (customer_id, name, zip_code, tier) rows.
+            zip_zones: (zip_code, zone) rows.
+            inventory: (product_id, location_id, units) rows.
+            shipping_options: (location_id, zone, product_id, carrier, cost, days, co2_kg) rows.
+            product_weights: (product_id, weight_kg) rows.
+            zip_zone_ranges: (first ZIP, last ZIP, zone) rows with integer, inclusive bounds.
+            info: Optional {key: value} metadata describing the catalog.
+        """
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.execute("PRAGMA journal_mode=WAL")
+            statements = (
+                ("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?)", customers),
+                ("INSERT OR REPLACE INTO zip_zones VALUES (?, ?)", zip_zones),
+                ("INSERT OR REPLACE INTO inventory VALUES (?, ?, ?)", inventory),
+                ("INSERT OR REPLACE INTO shipping_options VALUES (?, ?, ?, ?, ?, ?, ?)", shipping_options),
+                ("INSERT OR REPLACE INTO product_weights VALUES (?, ?)", product_weights),
+                ("INSERT OR REPLACE INTO zip_zone_ranges VALUES (?, ?, ?)", zip_zone_ranges),
+                ("INSERT OR REPLACE INTO dataset_info VALUES (?, ?)", ((key, str(value)) for key, value in (info or {}).items())),
+            )
+            for sql, rows in statements:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        conn.executemany(sql, batch)
+                        batch.clear()
+                if batch:
+                    conn.executemany(sql, batch)
+            conn.execute("INSERT OR IGNORE INTO locations SELECT DISTINCT location_id FROM inventory")
+            conn.execute("INSERT OR IGNORE INTO locations SELECT DISTINCT location_id FROM shipping_options")
+            conn.execute("INSERT OR IGNORE INTO zones SELECT DISTINCT zone FROM shipping_options")
+            conn.execute("INSERT OR IGNORE INTO carriers SELECT DISTINCT carrier FROM shipping_options")
+            conn.commit()
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        return cls(path)
+
+    @classmethod
+    def from_memory(cls, path, store):
+        """Copies an InMemoryDataStore (e.g. the mock data) into a new catalog."""
+        return cls.build(
+            path,
+            customers=((cid, c.get("name", "N/A"), c.get("zip_code"), c.get("tier")) for cid, c in store.crm_db.items()),
+            zip_zones=store.zip_to_zone_db.items(),
+            inventory=((product_id, location_id, units) for location_id, product_id, units in store.iter_stock()),
+            shipping_options=store.iter_shipping_options(),
+            product_weights=store.product_weight_db.items(),
+            zip_zone_ranges=store.zip_zone_ranges(),
+        )
+
+
+def mock_data_store():
+    """Returns an InMemoryDataStore over the mock_data.py dictionaries."""
+    return InMemoryDataStore(MOCK_CRM_DB, INVENTORY_DB, SHIPPING_OPTIONS_DB, ZIP_TO_ZONE_DB, PRODUCT_WEIGHT_DB, ZIP_ZONE_RANGES)
+
+
+def load_in_memory(store):
+    """
+    Copies any DataStore into an InMemoryDataStore (e.g. to compare backends on one
+    catalog). This reads every table; it is meant for benchmarks and tools, never for a
+    request path.
+    """
+    crm_db = dict(store.iter_section("customers"))
+    inventory_db = {location_id: {} for location_id in store.locations()}
+    for location_id, product_id, units in store.iter_stock():
+        inventory_db[location_id][product_id] = units
+    shipping_options_db = {}
+    for location_id, zone, product_id, carrier, cost, days, co2_kg in store.iter_shipping_options():
+        shipping_options_db.setdefault(location_id, {}).setdefault(zone, []).append((product_id, carrier, cost, days, co2_kg))
+    return InMemoryDataStore(
+        crm_db, inventory_db, shipping_options_db, dict(store.iter_section("zip_to_zone")), dict(store.iter_section("product_weights")),
+        store.zip_zone_ranges(),
+    )
+
+
+def open_data_store(url):
+    """Opens a store from a URL: "memory" or "sqlite:///path/to/catalog.db"."""
+    if url in (None, "", "memory"):
+        return mock_data_store()
+    if url.startswith("sqlite:///"):
+        return SQLiteDataStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported data store '{url}'. Expected 'memory' or 'sqlite:///path'.")
+
+
+def with_simulated_latency(store, setting):
+    """
+    Wraps `store` in a SimulatedLatencyDataStore for an ORDER_ROUTING_SIMULATED_LATENCY_MS
+    value: "LATENCY" or "LATENCY,JITTER" in milliseconds. Empty or zero returns `store` as is.
+    """
+    if not setting:
+        return store
+    latency_ms, _, jitter_ms = setting.partition(",")
+    latency_ms, jitter_ms = float(latency_ms), float(jitter_ms or 0)
+    if latency_ms <= 0 and jitter_ms <= 0:
+        return store
+    return SimulatedLatencyDataStore(store, latency_ms, jitter_ms)
+
+
+_store = None
+
+def get_data_store():
+    """Returns the process-wide data store selected by ORDER_ROUTING_DATA_STORE."""
+    global _store
+    if _store is None:
+        store = open_data_store(os.getenv(DATA_STORE_ENV))
+        if os.getenv(SHARED_SNAPSHOT_ENV):
+            # Imported here because shared_snapshot.py builds on this module
+            from agentic_order_routing.shared_snapshot import SharedSnapshotDataStore, get_shared_snapshot
+            store = SharedSnapshotDataStore(store, get_shared_snapshot())
+        _store = with_simulated_latency(store, os.getenv(SIMULATED_LATENCY_ENV))
+        logger.info(f"DATA_STORE: using {type(_store).__name__}")
+    return _store
+
+
+def set_data_store(store):
+    """Replaces the process-wide data store; call before the services built on it are first used."""
+    global _store
+    _store = store
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m agentic_order_routing.data_store CATALOG.db  (build one with agentic_order_routing.synthetic_data)")
+    store = SQLiteDataStore(sys.argv[1])
+    print(f"{sys.argv[1]}: {store.info()}, {store.count('customers')} customers, {len(store.locations())} locations")
+    for label, call in (
+        ("get_customer", lambda: store.get_customer("cust123")),
+        ("zone_for_zip", lambda: store.zone_for_zip("10001")),
+        ("stock_for_product", lambda: store.stock_for_product("product_A")),
+        ("shipping_options", lambda: store.shipping_options("WH_EAST", "ZONE_1", "product_A")),
+    ):
+        start = time.perf_counter()
+        for _ in range(1000):
+            result = call()
+        print(f"{label}: {(time.perf_counter() - start) * 1000:.1f} us/call -> {str(result)[:80]}")
@@ -0,0 +1,91 @@
+# Routing-decision cache for the Agentic AI Order Routing POC.
+# Most order volume is a handful of (product, zone, tier, priority) combinations, so a
+# decision computed once - by the engine or by the two-agent LLM workflow - can be reused
+# for later orders until the inventory or shipping data it was computed from changes.
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("agent_workflow")
+
+DECISION_CACHE_MAX_ENTRIES = 1024
+DECISION_CACHE_TTL_SECONDS = 300
+
+
+class DecisionCache:
+    """
+    Bounded LRU cache with TTL whose entries are tagged with the data version they were
+    computed from. A lookup whose current version differs from the stored tag is treated
+    as a miss and the stale entry is dropped, so changes to the underlying inventory or
+    shipping data invalidate affected decisions automatically.
+    """
+
+    def __init__(self, max_entries=DECISION_CACHE_MAX_ENTRIES, ttl_seconds=DECISION_CACHE_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, value = entry
+            if entry_version != version or expires_at <= self._clock():
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+
+def get_decision_cache():
+    """Returns the process-wide routing-decision cache."""
+    global _cache
+    if _cache is None:
+        _cache = DecisionCache()
+    return _cache
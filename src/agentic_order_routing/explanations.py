@@ -0,0 +1,223 @@
+# Deferred explanations for the Agentic AI Order Routing POC.
+# With explanations="deferred" the route is decided by the engine (or the split-shipment
+# optimizer) and returned straight away with its template reasoning and a decision ID;
+# the explainer agent's wording is produced afterwards by the ExplanationQueue. The
+# queue runs a few worker tasks on the event loop, so model latency never sits on the
+# order's critical path and a burst of orders cannot start more concurrent model runs
+# than EXPLANATION_WORKERS. Finished explanations are kept in a bounded LRU/TTL store
+# and served by GET /explanations/{decision_id}; the stream endpoint pushes them to the
+# dashboard as an "explanation" event.
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+EXPLANATION_WORKERS = 4
+# Explanations waiting for a worker; past this, new ones are dropped and the template stays
+EXPLANATION_MAX_PENDING = 1000
+EXPLANATION_MAX_ENTRIES = 10000
+EXPLANATION_TTL_SECONDS = 3600
+EXPLANATION_TIMEOUT_SECONDS = 60.0
+
+EXPLANATION_PENDING = "pending"
+EXPLANATION_READY = "ready"
+# The template reasoning stands: the agent failed, timed out or the queue was full
+EXPLANATION_FAILED = "failed"
+
+
+class ExplanationQueue:
+    """
+    Runs explainer coroutines in the background and keeps their results by decision ID.
+
+    Args:
+        workers: Explanations written at the same time.
+        max_pending: Explanations that may wait for a worker.
+        max_entries: Explanations kept for lookup; the least recently used are evicted.
+        ttl_seconds: How long an explanation can be looked up.
+        timeout_seconds: Longest a single explanation may take.
+    """
+
+    def __init__(self, workers=EXPLANATION_WORKERS, max_pending=EXPLANATION_MAX_PENDING, max_entries=EXPLANATION_MAX_ENTRIES,
+                 ttl_seconds=EXPLANATION_TTL_SECONDS, timeout_seconds=EXPLANATION_TIMEOUT_SECONDS, clock=time.monotonic):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.metrics = get_routing_metrics()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # decision_id -> (expires_at, entry dict)
+        self._done = {}  # decision_id -> asyncio.Event, while pending
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        self.submitted = 0
+        self.ready = 0
+        self.failed = 0
+        self.dropped = 0
+
+    # --- Submitting ---
+    def submit(self, decision, explain):
+        """
+        Queues `explain` for a decision that is returned now with its template reasoning.
+        Must be called from a running event loop.
+
+        Args:
+            decision: The decision dict; its "reasoning" is kept until the explanation is ready.
+            explain: A coroutine function returning the explained decision, with
+                "explained_by" set when the agent produced usable reasoning (see
+                explain_route and explain_plan in main.py).
+
+        Returns:
+            The decision with "decision_id" and "explanation_status".
+        """
+        queue = self._ensure_workers()
+        decision_id = uuid.uuid4().hex
+        entry = {
+            "decision_id": decision_id,
+            "status": EXPLANATION_PENDING,
+            "reasoning": decision.get("reasoning"),
+            "explained_by": None,
+            "error": None,
+            "explain_ms": None,
+        }
+        with self._lock:
+            self.submitted += 1
+            if queue.qsize() >= self.max_pending:
+                self.dropped += 1
+                entry.update(status=EXPLANATION_FAILED, error="Explanation queue is full; the template reasoning stands.")
+            else:
+                self._done[decision_id] = asyncio.Event()
+            self._store(entry)
+        if entry["status"] == EXPLANATION_FAILED:
+            logger.warning(f"EXPLANATIONS: queue full ({self.max_pending} pending), keeping the template reasoning for {decision_id}")
+            self.metrics.explanations.inc("dropped")
+        else:
+            queue.put_nowait((decision_id, explain))
+        return {**decision, "decision_id": decision_id, "explanation_status": entry["status"]}
+
+    def _store(self, entry):
+        # Callers hold self._lock
+        self._entries[entry["decision_id"]] = (self._clock() + self.ttl_seconds, entry)
+        self._entries.move_to_end(entry["decision_id"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Lookup ---
+    def get(self, decision_id):
+        """Returns a copy of the explanation entry, or None if unknown or expired."""
+        with self._lock:
+            item = self._entries.get(decision_id)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= self._clock():
+                del self._entries[decision_id]
+                return None
+            self._entries.move_to_end(decision_id)
+            return dict(entry)
+
+    async def wait(self, decision_id, timeout):
+        """
+        Waits up to `timeout` seconds for a pending explanation to finish.
+
+        Returns:
+            The entry as get() returns it (still pending if the wait timed out), or None.
+        """
+        done = self._done.get(decision_id)
+        if done is not None:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(decision_id)
+
+    async def drain(self):
+        """Waits until every queued explanation has finished, e.g. before a script exits."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    # --- Workers ---
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (e.g. another asyncio.run): the old loop's workers are gone
+            with self._lock:
+                for decision_id in list(self._done):
+                    self._finish(decision_id, EXPLANATION_FAILED, error="The explanation worker stopped before it ran.")
+            self._loop, self._queue = loop, asyncio.Queue()
+            self._tasks = [loop.create_task(self._work(self._queue)) for _ in range(self.workers)]
+        return self._queue
+
+    async def _work(self, queue):
+        while True:
+            decision_id, explain = await queue.get()
+            try:
+                await self._explain(decision_id, explain)
+            finally:
+                queue.task_done()
+
+    async def _explain(self, decision_id, explain):
+        start = time.perf_counter()
+        try:
+            explained = await asyncio.wait_for(explain(), self.timeout_seconds)
+        except Exception as e:
+            # The decision (and its reservation) stands without the agent's wording
+            logger.error(f"EXPLANATIONS: explainer failed for {decision_id}, keeping the template reasoning: {e!r}")
+            explained, error = None, f"Explainer failed: {e!r}"
+        else:
+            error = None if explained.get("explained_by") else "Explainer returned no usable reasoning; the template reasoning stands."
+        elapsed = time.perf_counter() - start
+        self.metrics.stage_duration.observe("deferred_explanation", value=elapsed)
+        with self._lock:
+            if error is None:
+                self._finish(decision_id, EXPLANATION_READY, reasoning=explained["reasoning"],
+                             explained_by=explained["explained_by"], explain_ms=round(elapsed * 1000, 3))
+            else:
+                self._finish(decision_id, EXPLANATION_FAILED, error=error, explain_ms=round(elapsed * 1000, 3))
+
+    def _finish(self, decision_id, status, **fields):
+        # Callers hold self._lock. The entry may have been evicted meanwhile; waiters are woken regardless.
+        item = self._entries.get(decision_id)
+        if item is not None:
+            item[1].update(status=status, **fields)
+        if status == EXPLANATION_READY:
+            self.ready += 1
+        else:
+            self.failed += 1
+        self.metrics.explanations.inc(status)
+        done = self._done.pop(decision_id, None)
+        if done is not None:
+            done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": len(self._done),
+                "entries": len(self._entries),
+                "submitted": self.submitted,
+                "ready": self.ready,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_explanation_queue():
+    """Returns the process-wide explanation queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ExplanationQueue()
+        return _queue
@@ -0,0 +1,162 @@
+# Deterministic order intake for the Agentic AI Order Routing POC.
+# Does in-process what the OrderIntakeAgent does with a full model turn: validate the raw
+# order, enrich it from the CRM and build the OrderRoutingPayloadModel handed to routing.
+# Error messages match the ones the intake agent is instructed to produce.
+# Multi-line orders (carts) go through validate_raw_cart / process_raw_cart and are
+# routed by the split-shipment optimizer (split_shipment.py).
+
+import logging
+
+from agentic_order_routing.models import (
+    CartRoutingPayloadModel, OrderLineModel, OrderRoutingPayloadModel, ProcessedCartModel, ProcessedOrderModel,
+)
+from agentic_order_routing.tools.intake_agent_tools import lookup_customer_details, lookup_customer_details_async
+
+logger = logging.getLogger("agent_workflow")
+
+# Largest number of lines accepted in one cart
+MAX_CART_LINES = 100
+
+
+def _is_non_empty_string(value):
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _is_positive_int(value):
+    # bool is a subclass of int, but True is not a quantity
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def validate_raw_order(raw_order):
+    """
+    Applies the intake agent's validation rules to a raw order.
+
+    Returns:
+        None if the order is valid, otherwise the reason it failed.
+    """
+    if not isinstance(raw_order, dict):
+        return "raw_order must be a JSON object."
+    if not _is_non_empty_string(raw_order.get("product_id")):
+        return "product_id is required and must be a non-empty string."
+    if not _is_positive_int(raw_order.get("quantity")):
+        return "quantity is required and must be a positive integer."
+    if not _is_non_empty_string(raw_order.get("customer_id")):
+        return "customer_id is required and must be a non-empty string."
+    return None
+
+
+def process_raw_order(raw_order, business_priority):
+    """
+    Validates and enriches a raw order without an LLM round trip.
+
+    Args:
+        raw_order: The raw order dict (product_id, quantity, customer_id).
+        business_priority: The business priority to route under.
+
+    Returns:
+        A tuple (payload, error): the OrderRoutingPayloadModel for the routing stage and
+        None, or None and an error dict in the intake agent's error format.
+    """
+    reason = validate_raw_order(raw_order)
+    if reason is not None:
+        logger.warning(f"INTAKE: Validation failed: {reason}")
+        return None, {"error": f"Validation failed: {reason}"}
+    return _order_payload(raw_order, lookup_customer_details(raw_order["customer_id"]), business_priority)
+
+
+async def process_raw_order_async(raw_order, business_priority):
+    """Async form of process_raw_order; the CRM read does not block the event loop."""
+    reason = validate_raw_order(raw_order)
+    if reason is not None:
+        logger.warning(f"INTAKE: Validation failed: {reason}")
+        return None, {"error": f"Validation failed: {reason}"}
+    return _order_payload(raw_order, await lookup_customer_details_async(raw_order["customer_id"]), business_priority)
+
+
+def _order_payload(raw_order, customer, business_priority):
+    if "error" in customer:
+        return None, customer
+
+    payload = OrderRoutingPayloadModel(
+        processed_order=ProcessedOrderModel(
+            product_id=raw_order["product_id"],
+            quantity=raw_order["quantity"],
+            customer_id=customer["customer_id"],
+            customer_name=customer["name"],
+            customer_zip_code=customer["zip_code"],
+            customer_tier=customer["tier"],
+        ),
+        business_priority=business_priority,
+    )
+    logger.info(f"INTAKE: Processed order {payload.processed_order.model_dump()}")
+    return payload, None
+
+
+def is_cart(raw_order):
+    """True if the raw order is a multi-line order (carries "lines")."""
+    return isinstance(raw_order, dict) and "lines" in raw_order
+
+
+def validate_raw_cart(raw_cart):
+    """
+    Applies the intake validation rules to a multi-line order.
+
+    Returns:
+        None if the cart is valid, otherwise the reason it failed.
+    """
+    if not isinstance(raw_cart, dict):
+        return "raw_order must be a JSON object."
+    lines = raw_cart.get("lines")
+    if not isinstance(lines, list) or not lines:
+        return "lines is required and must be a non-empty list."
+    if len(lines) > MAX_CART_LINES:
+        return f"lines may contain at most {MAX_CART_LINES} entries."
+    for i, line in enumerate(lines):
+        if not isinstance(line, dict):
+            return f"lines[{i}] must be a JSON object."
+        if not _is_non_empty_string(line.get("product_id")):
+            return f"lines[{i}].product_id is required and must be a non-empty string."
+        if not _is_positive_int(line.get("quantity")):
+            return f"lines[{i}].quantity is required and must be a positive integer."
+    if not _is_non_empty_string(raw_cart.get("customer_id")):
+        return "customer_id is required and must be a non-empty string."
+    return None
+
+
+def process_raw_cart(raw_cart, business_priority):
+    """
+    Validates and enriches a multi-line order. Lines for the same product are merged,
+    keeping the order in which products first appear.
+
+    Args:
+        raw_cart: The raw cart dict (lines of product_id and quantity, customer_id).
+        business_priority: The business priority to route under.
+
+    Returns:
+        A tuple (payload, error): the CartRoutingPayloadModel and None, or None and an
+        error dict in the intake agent's error format.
+    """
+    reason = validate_raw_cart(raw_cart)
+    if reason is not None:
+        logger.warning(f"INTAKE: Validation failed: {reason}")
+        return None, {"error": f"Validation failed: {reason}"}
+
+    customer = lookup_customer_details(raw_cart["customer_id"])
+    if "error" in customer:
+        return None, customer
+
+    quantities = {}
+    for line in raw_cart["lines"]:
+        quantities[line["product_id"]] = quantities.get(line["product_id"], 0) + line["quantity"]
+    payload = CartRoutingPayloadModel(
+        processed_cart=ProcessedCartModel(
+            lines=[OrderLineModel(product_id=product_id, quantity=quantity) for product_id, quantity in quantities.items()],
+            customer_id=customer["customer_id"],
+            customer_name=customer["name"],
+            customer_zip_code=customer["zip_code"],
+            customer_tier=customer["tier"],
+        ),
+        business_priority=business_priority,
+    )
+    logger.info(f"INTAKE: Processed cart with {len(payload.processed_cart.lines)} line(s) for {customer['customer_id']}")
+    return payload, None
@@ -0,0 +1,434 @@
+# Inventory service for the Agentic AI Order Routing POC.
+# Replaces direct reads of the bare INVENTORY_DB dict with a product -> {location: stock}
+# index and reserve/commit/release operations, so concurrent orders cannot both be
+# routed to the same last units. On-hand stock is read from the data store on a
+# product's first use and committed changes are written back to it; only recently used
+# products (and those with live reservations) are kept in memory.
+#
+# All operations are synchronous and guarded by a single lock, which makes them atomic
+# across asyncio tasks as well as across worker threads. find_available_async() serves
+# the async tools: a product that is not in memory yet is read from the store without
+# holding the lock or blocking the event loop. apply_stock_changes() takes batches of
+# WMS stock deltas (see stock_updates.py) and updates the cached stock in place. When a
+# change leaves a location with fewer units on hand than are reserved there, the newest
+# reservations at that location are cancelled until the rest fit: a reservation is never
+# shrunk (the order would ship short), and available stock never goes negative. Committing
+# or releasing a cancelled reservation fails, and cancellation_reason() tells why.
+# Multi-worker servers use the
+# SharedInventoryService in shared_snapshot.py instead, which keeps the same interface.
+
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from agentic_order_routing.data_store import SHARED_SNAPSHOT_ENV, InMemoryDataStore, get_data_store
+
+logger = logging.getLogger("agent_workflow")
+
+# Unconfirmed reservations are released automatically after this many seconds.
+RESERVATION_TTL_SECONDS = 900
+# Products whose on-hand stock is kept in memory; products with live reservations are never evicted.
+PRODUCT_CACHE_SIZE = 100_000
+# Cancelled reservation IDs remembered for cancellation_reason()
+CANCELLED_RESERVATIONS_KEPT = 10_000
+CANCELLED_BY_STOCK_UPDATE = "Cancelled by a stock update: the location no longer has the reserved units on hand."
+
+
+class Reservation:
+    """Units held at one location for one order until committed, released or expired."""
+
+    __slots__ = ("reservation_id", "product_id", "location_id", "quantity", "expires_at")
+
+    def __init__(self, reservation_id, product_id, location_id, quantity, expires_at):
+        self.reservation_id = reservation_id
+        self.product_id = product_id
+        self.location_id = location_id
+        self.quantity = quantity
+        self.expires_at = expires_at
+
+    def to_dict(self):
+        return {
+            "reservation_id": self.reservation_id,
+            "product_id": self.product_id,
+            "location_id": self.location_id,
+            "quantity": self.quantity,
+        }
+
+
+class InventoryService:
+    """
+    Stock index with reservations.
+
+    Available stock at a location is its on-hand quantity minus the units held by
+    live reservations. Only locations with on-hand stock are kept in the per-product
+    index, so lookups cost O(locations-with-stock) rather than O(all locations).
+
+    Every change to on-hand stock bumps the global `version`. `availability_version`
+    increases on every change to available stock, reservations included, for views of
+    availability such as the /contextual-data snapshot. A product's version is stamped
+    from it whenever the product's stock changes or reserved units return to it
+    (released, expired or cancelled reservations), which lets derived data such as
+    cached routing decisions detect that the inventory they were computed from is
+    stale. New reservations do not bump it; consumers re-validate availability by
+    reserving.
+
+    `store` is a DataStore, or an INVENTORY_DB-shaped {location_id: {product_id: units}}
+    dict that is wrapped in an InMemoryDataStore.
+    """
+
+    def __init__(self, store, reservation_ttl=RESERVATION_TTL_SECONDS, clock=time.monotonic, cache_size=PRODUCT_CACHE_SIZE):
+        if isinstance(store, dict):
+            store = InMemoryDataStore(inventory_db=store)
+        self.store = store
+        self._lock = threading.Lock()
+        # Held by every writer of on-hand stock (commits, stock updates) until its change
+        # has reached the store, so store writes land in the order they were made
+        self._write_lock = threading.Lock()
+        self._clock = clock
+        self.reservation_ttl = reservation_ttl
+        self.cache_size = cache_size
+        self._locations = store.locations()
+        self._location_set = frozenset(self._locations)
+        self._on_hand = OrderedDict()  # product_id -> {location_id: on-hand units}, most recently used last
+        self._reserved = {}  # product_id -> {location_id: reserved units}
+        self._reservations = {}  # reservation_id -> Reservation
+        self._pair_reservations = {}  # (product_id, location_id) -> {reservation_id: Reservation}, oldest first
+        self._expiry_heap = []   # (expires_at, reservation_id)
+        self._cancelled = OrderedDict()  # reservation_id -> reason, most recent last
+        self.version = 0
+        self.availability_version = 0
+        self._product_versions = {}  # product_id -> availability_version of its last stock change or return
+        self._unwritten = set()  # products whose new on-hand stock is being written to the store
+
+    # --- Reads ---
+    def locations(self):
+        return list(self._locations)
+
+    def product_version(self, product_id):
+        """
+        Returns the version of a product's stock; it increases whenever the on-hand stock
+        changes or reserved units are returned, but not when units are reserved.
+        """
+        with self._lock:
+            # Expired reservations return their units, so they count as a change
+            self._expire_locked()
+            return self._product_versions.get(product_id, 0)
+
+    def available_by_location(self, product_id):
+        """Returns {location_id: available units} for every location stocking the product."""
+        with self._lock:
+            self._expire_locked()
+            return self._available_locked(product_id)
+
+    def find_available(self, product_id, quantity):
+        """Returns {location_id: available units} for locations that can cover `quantity`."""
+        return {loc: units for loc, units in self.available_by_location(product_id).items() if units >= quantity}
+
+    async def find_available_async(self, product_id, quantity):
+        """Async find_available: on a cache miss the store is read with store.call_async."""
+        if product_id not in self._on_hand:
+            on_hand = await self.store.call_async("stock_for_product", product_id)
+            with self._lock:
+                # A commit may have loaded (and changed) the product meanwhile; keep its copy
+                if product_id not in self._on_hand:
+                    self._cache_on_hand_locked(product_id, on_hand)
+        return self.find_available(product_id, quantity)
+
+    def snapshot(self):
+        """
+        Returns the available stock of every location as {location_id: {product_id: units}}.
+        This reads the whole inventory table; use available_at() to view one location.
+        Only the reserved units are copied under the lock, so reservations are not held
+        up while the table is read.
+        """
+        with self._lock:
+            self._expire_locked()
+            reserved_units = {product_id: dict(reserved) for product_id, reserved in self._reserved.items() if reserved}
+        snapshot = {location_id: {} for location_id in self._locations}
+        for location_id, product_id, units in self.store.iter_stock():
+            reserved = reserved_units.get(product_id)
+            snapshot.setdefault(location_id, {})[product_id] = max(0, units - (reserved.get(location_id, 0) if reserved else 0))
+        return snapshot
+
+    def available_at(self, location_id, on_hand):
+        """Returns {product_id: available units} for one location's {product_id: on-hand units}."""
+        with self._lock:
+            self._expire_locked()
+            return {
+                product_id: max(0, units - self._reserved.get(product_id, {}).get(location_id, 0))
+                for product_id, units in on_hand.items()
+            }
+
+    # --- Reservations ---
+    def reserve(self, product_id, location_id, quantity, ttl=None):
+        """
+        Atomically holds `quantity` units at a location.
+
+        Returns:
+            The Reservation, or None if the location no longer has enough available stock.
+        """
+        if quantity <= 0:
+            return None
+        with self._lock:
+            now = self._clock()
+            self._expire_locked(now)
+            available = self._available_locked(product_id).get(location_id, 0)
+            if available < quantity:
+                logger.info(f"INVENTORY: reserve rejected for {quantity} x {product_id} at {location_id} (available={available})")
+                return None
+            reservation = Reservation(
+                uuid.uuid4().hex, product_id, location_id, quantity,
+                now + (self.reservation_ttl if ttl is None else ttl),
+            )
+            self._hold_locked(reservation)
+            self.availability_version += 1
+        logger.info(f"INVENTORY: reserved {quantity} x {product_id} at {location_id} ({reservation.reservation_id})")
+        return reservation
+
+    def reserve_first(self, product_id, location_ids, quantity, ttl=None):
+        """Reserves at the first location in `location_ids` that can still cover the order."""
+        for location_id in location_ids:
+            reservation = self.reserve(product_id, location_id, quantity, ttl)
+            if reservation is not None:
+                return reservation
+        return None
+
+    def reserve_many(self, requests, ttl=None):
+        """
+        Holds stock for many (product_id, location_id, quantity) requests under one lock,
+        e.g. for a whole allocation wave. Requests are applied in order, each
+        independently; one summary line is logged instead of one per reservation.
+
+        Returns:
+            A list with the Reservation for each request, or None where the location no
+            longer had enough available stock.
+        """
+        results = []
+        with self._lock:
+            now = self._clock()
+            self._expire_locked(now)
+            expires_at = now + (self.reservation_ttl if ttl is None else ttl)
+            available = {}  # product_id -> {location_id: available units}, as reserved so far
+            for product_id, location_id, quantity in requests:
+                if product_id not in available:
+                    available[product_id] = self._available_locked(product_id)
+                units = available[product_id].get(location_id, 0)
+                if quantity <= 0 or units < quantity:
+                    results.append(None)
+                    continue
+                available[product_id][location_id] = units - quantity
+                reservation = Reservation(uuid.uuid4().hex, product_id, location_id, quantity, expires_at)
+                self._hold_locked(reservation)
+                results.append(reservation)
+            if any(reservation is not None for reservation in results):
+                self.availability_version += 1
+        rejected = sum(1 for reservation in results if reservation is None)
+        logger.info(f"INVENTORY: bulk reserved {len(results) - rejected} of {len(results)} request(s)")
+        return results
+
+    def commit(self, reservation_id):
+        """Converts a live reservation into a permanent stock decrement. Returns False if unknown or expired."""
+        with self._write_lock, self._lock:
+            self._expire_locked()
+            reservation = self._pop_reservation_locked(reservation_id)
+            if reservation is None:
+                return False
+            on_hand = self._on_hand_locked(reservation.product_id)
+            remaining = max(0, on_hand.get(reservation.location_id, 0) - reservation.quantity)
+            if remaining > 0:
+                on_hand[reservation.location_id] = remaining
+            else:
+                on_hand.pop(reservation.location_id, None)
+            self.store.set_stock(reservation.product_id, reservation.location_id, remaining)
+            self._bump_version_locked(reservation.product_id)
+        logger.info(f"INVENTORY: committed reservation {reservation_id}")
+        return True
+
+    def release(self, reservation_id):
+        """Returns a live reservation's units to available stock. Returns False if unknown or expired."""
+        with self._lock:
+            released = self._pop_reservation_locked(reservation_id) is not None
+        if released:
+            logger.info(f"INVENTORY: released reservation {reservation_id}")
+        return released
+
+    def cancellation_reason(self, reservation_id):
+        """Returns why a reservation was cancelled by the inventory, or None if it was not (or long ago)."""
+        with self._lock:
+            return self._cancelled.get(reservation_id)
+
+    def get_reservation(self, reservation_id):
+        with self._lock:
+            self._expire_locked()
+            return self._reservations.get(reservation_id)
+
+    # --- Stock updates ---
+    def apply_stock_changes(self, changes):
+        """
+        Applies a batch of on-hand stock changes (receipts, picks, adjustments, counts).
+
+        The cached stock of each product is updated in place and the whole batch bumps
+        `version` once, so readers wait for the in-memory update only; the changed rows
+        are then written to the store in one batch, outside the read lock.
+
+        Args:
+            changes: (product_id, location_id, delta, on_hand) tuples (see
+                stock_updates.parse_stock_change): `delta` is added to the on-hand units,
+                or, when it is None, the units are set to `on_hand`. On-hand stock never
+                goes below zero, and reservations that no longer fit are cancelled
+                (newest first).
+
+        Returns:
+            A list with None for each applied change, or the reason it was rejected.
+        """
+        results = [None] * len(changes)
+        with self._write_lock:
+            # Products not in memory are read before taking the read lock
+            loaded = {product_id: self.store.stock_for_product(product_id)
+                      for product_id in {change[0] for change in changes} if product_id not in self._on_hand}
+            written = {}  # (product_id, location_id) -> new on-hand units
+            with self._lock:
+                for product_id, on_hand in loaded.items():
+                    if product_id not in self._on_hand:
+                        self._cache_on_hand_locked(product_id, on_hand)
+                for i, (product_id, location_id, delta, units) in enumerate(changes):
+                    if location_id not in self._location_set:
+                        results[i] = f"Unknown location '{location_id}'."
+                        continue
+                    on_hand = self._on_hand_locked(product_id)
+                    units = max(0, on_hand.get(location_id, 0) + delta if delta is not None else units)
+                    if units > 0:
+                        on_hand[location_id] = units
+                    else:
+                        on_hand.pop(location_id, None)
+                    written[(product_id, location_id)] = units
+                    self._cancel_excess_locked(product_id, location_id, units)
+                if written:
+                    self.version += 1
+                    self.availability_version += 1
+                    for product_id, _ in written:
+                        self._product_versions[product_id] = self.availability_version
+                    self._unwritten.update(product_id for product_id, _ in written)
+            if written:
+                try:
+                    self.store.set_stock_many([(product_id, location_id, units) for (product_id, location_id), units in written.items()])
+                finally:
+                    with self._lock:
+                        self._unwritten.clear()
+        return results
+
+    # --- Internals (caller holds the lock) ---
+    def _on_hand_locked(self, product_id):
+        on_hand = self._on_hand.get(product_id)
+        if on_hand is not None:
+            self._on_hand.move_to_end(product_id)
+            return on_hand
+        return self._cache_on_hand_locked(product_id, self.store.stock_for_product(product_id))
+
+    def _cache_on_hand_locked(self, product_id, on_hand):
+        self._on_hand[product_id] = on_hand
+        excess = len(self._on_hand) - self.cache_size
+        if excess > 0:
+            # Evict the least recently used products without live reservations
+            evicted = []
+            for pid in self._on_hand:
+                if len(evicted) == excess:
+                    break
+                if not self._reserved.get(pid) and pid not in self._unwritten:
+                    evicted.append(pid)
+            for pid in evicted:
+                del self._on_hand[pid]
+        return on_hand
+
+    def _available_locked(self, product_id):
+        reserved = self._reserved.get(product_id, {})
+        return {
+            location_id: max(0, units - reserved.get(location_id, 0))
+            for location_id, units in self._on_hand_locked(product_id).items()
+        }
+
+    def _cancel_excess_locked(self, product_id, location_id, on_hand_units):
+        # Cancels the newest reservations at the location until the rest fit in its stock
+        reserved = self._reserved.get(product_id, {}).get(location_id, 0)
+        pair_reservations = self._pair_reservations.get((product_id, location_id))
+        while reserved > on_hand_units and pair_reservations:
+            reservation = self._pop_reservation_locked(next(reversed(pair_reservations)))
+            reserved -= reservation.quantity
+            self._cancelled[reservation.reservation_id] = CANCELLED_BY_STOCK_UPDATE
+            if len(self._cancelled) > CANCELLED_RESERVATIONS_KEPT:
+                self._cancelled.popitem(last=False)
+            logger.warning(f"INVENTORY: cancelled reservation {reservation.reservation_id} for {reservation.quantity} x {product_id} "
+                           f"at {location_id}: only {on_hand_units} unit(s) left on hand")
+
+    def _bump_version_locked(self, product_id):
+        self.version += 1
+        self.availability_version += 1
+        self._product_versions[product_id] = self.availability_version
+
+    def _hold_locked(self, reservation):
+        reserved = self._reserved.setdefault(reservation.product_id, {})
+        reserved[reservation.location_id] = reserved.get(reservation.location_id, 0) + reservation.quantity
+        self._reservations[reservation.reservation_id] = reservation
+        self._pair_reservations.setdefault((reservation.product_id, reservation.location_id), {})[reservation.reservation_id] = reservation
+        heapq.heappush(self._expiry_heap, (reservation.expires_at, reservation.reservation_id))
+
+    def _pop_reservation_locked(self, reservation_id):
+        reservation = self._reservations.pop(reservation_id, None)
+        if reservation is not None:
+            pair = (reservation.product_id, reservation.location_id)
+            pair_reservations = self._pair_reservations[pair]
+            del pair_reservations[reservation_id]
+            if not pair_reservations:
+                del self._pair_reservations[pair]
+            reserved = self._reserved[reservation.product_id]
+            remaining = reserved[reservation.location_id] - reservation.quantity
+            if remaining > 0:
+                reserved[reservation.location_id] = remaining
+            else:
+                del reserved[reservation.location_id]
+            self.availability_version += 1
+            # The units are available again, so decisions made without them are stale
+            self._product_versions[reservation.product_id] = self.availability_version
+        return reservation
+
+    def _expire_locked(self, now=None):
+        now = self._clock() if now is None else now
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, reservation_id = heapq.heappop(heap)
+            if self._pop_reservation_locked(reservation_id) is not None:
+                logger.info(f"INVENTORY: reservation {reservation_id} expired")
+
+
+_service = None
+
+def get_inventory_service():
+    """
+    Returns the process-wide inventory service over the data store: a
+    SharedInventoryService when ORDER_ROUTING_SHARED_SNAPSHOT is set, so every worker
+    process shares one view of stock and reservations.
+    """
+    global _service
+    if _service is None:
+        if os.getenv(SHARED_SNAPSHOT_ENV):
+            # Imported here because shared_snapshot.py builds on this module
+            from agentic_order_routing.shared_snapshot import SharedInventoryService, get_shared_snapshot
+            _service = SharedInventoryService(get_shared_snapshot(), get_data_store())
+        else:
+            _service = InventoryService(get_data_store())
+    return _service
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+    service = get_inventory_service()
+    print(f"product_C with >= 1 unit: {service.find_available('product_C', 1)}")
+    first = service.reserve("product_A", "STORE_CENTRAL", 3)
+    second = service.reserve("product_A", "STORE_CENTRAL", 3)
+    print(f"First reservation: {first.to_dict() if first else None}, second (should be None): {second}")
+    service.commit(first.reservation_id)
+    print(f"product_A after commit: {service.available_by_location('product_A')}")
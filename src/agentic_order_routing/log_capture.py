@@ -0,0 +1,82 @@
+# Request-scoped log capture for the Agentic AI Order Routing POC.
+# A single shared handler on the "agent_workflow" logger routes each record to the buffer
+# of the request that emitted it, identified by a contextvar. Context variables follow the
+# request into asyncio tasks and into the worker threads used for sync tools
+# (asyncio.to_thread copies the context), so concurrent requests never see each other's
+# lines, and each record costs one dict lookup however many requests are in flight.
+
+import contextvars
+import logging
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# Lines kept per request; older lines are dropped once the buffer is full.
+REQUEST_LOG_MAX_LINES = 500
+
+_current_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def current_request_id():
+    """Returns the ID of the request being handled in this context, or None."""
+    return _current_request_id.get()
+
+
+class RequestLogBuffer:
+    """Bounded ring buffer of formatted log lines for one request."""
+
+    __slots__ = ("request_id", "_lines", "dropped")
+
+    def __init__(self, request_id, max_lines):
+        self.request_id = request_id
+        self._lines = deque(maxlen=max_lines)
+        self.dropped = 0
+
+    def append(self, line):
+        if len(self._lines) == self._lines.maxlen:
+            self.dropped += 1
+        self._lines.append(line)
+
+    def lines(self):
+        lines = list(self._lines)
+        if self.dropped:
+            lines.insert(0, f"... {self.dropped} earlier log line(s) dropped ...")
+        return lines
+
+
+class RequestLogRouter(logging.Handler):
+    """Shared handler that appends each record to the buffer of the request in context."""
+
+    def __init__(self, max_lines=REQUEST_LOG_MAX_LINES):
+        super().__init__()
+        self.max_lines = max_lines
+        self._buffers = {}  # request_id -> RequestLogBuffer
+
+    def emit(self, record):
+        request_id = _current_request_id.get()
+        if request_id is None:
+            return
+        buffer = self._buffers.get(request_id)
+        if buffer is not None:
+            buffer.append(self.format(record))
+
+    @contextmanager
+    def capture(self, request_id=None):
+        """
+        Captures the log lines emitted in the current context until the block exits.
+
+        Yields:
+            The RequestLogBuffer collecting this request's lines.
+        """
+        request_id = request_id or uuid.uuid4().hex
+        buffer = RequestLogBuffer(request_id, self.max_lines)
+        self._buffers[request_id] = buffer
+        token = _current_request_id.set(request_id)
+        try:
+            yield buffer
+        finally:
+            _current_request_id.reset(token)
+            self._buffers.pop(request_id, None)
+
+    def in_flight(self):
+        return len(self._buffers)
@@ -3,14 +3,14 @@
 
 import os
 import json
+import time
 import asyncio
 import logging
 from dotenv import load_dotenv
 
-from agents import Agent, Runner, gen_trace_id, trace, RunConfig, handoff
+from agents import Agent, ModelSettings, Runner, gen_trace_id, trace, RunConfig, handoff
 from agents.extensions.handoff_prompt import RECOMMENDED_PROMPT_PREFIX
 from agents.handoffs import Handoff
-from pydantic import BaseModel
 
 
 # Set up logging
@@ -19,7 +19,19 @@ logger = logging.getLogger(__name__)
 
 # Import tools for each assistant
 from agentic_order_routing.tools.intake_agent_tools import get_customer_details_tool
-from agentic_order_routing.tools.routing_tools import get_customer_zone, get_inventory, get_shipping_options
+from agentic_order_routing.tools.routing_tools import get_customer_zone, get_inventory, get_shipping_options, get_route_candidates, lookup_customer_zone
+from agentic_order_routing.routing_engine import get_routing_engine
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.shipping_index import get_shipping_index
+from agentic_order_routing.decision_cache import get_decision_cache
+from agentic_order_routing.intake import process_raw_order_async, process_raw_cart, is_cart
+from agentic_order_routing.models import ProcessedOrderModel, OrderRoutingPayloadModel
+from agentic_order_routing.split_shipment import get_split_shipment_optimizer
+from agentic_order_routing.metrics import get_routing_metrics, MetricsHooks
+from agentic_order_routing.tool_output import summarize_tool_outputs
+from agentic_order_routing.explanations import get_explanation_queue
+from agentic_order_routing.resilience import get_agent_run_guard, AgentUnavailable
+from agentic_order_routing.profiling import PROFILERS, profile_request
 
 # --- Load Environment Variables and Model ---
 load_dotenv()
@@ -27,6 +39,34 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL = "gpt-4o-mini"
 
+# --- Routing modes ---
+# "agent": the full OrderIntakeAgent -> OrderRoutingDecisionAgent LLM workflow.
+# "deterministic": the vectorized routing engine decides; the LLM workflow is only
+# used when the engine cannot decide (e.g. unknown priority or tied candidates).
+ROUTING_MODE_AGENT = "agent"
+ROUTING_MODE_DETERMINISTIC = "deterministic"
+ROUTING_MODES = (ROUTING_MODE_AGENT, ROUTING_MODE_DETERMINISTIC)  # also the metric labels in metrics.DECISION_MODES
+
+# --- Intake modes ---
+# "deterministic": orders are validated and enriched in-process (intake.py) and the LLM
+# workflow, when needed, starts directly at the OrderRoutingDecisionAgent.
+# "agent": the OrderIntakeAgent handles intake, e.g. for non-standard orders that fail
+# deterministic validation but that the model may still be able to interpret.
+INTAKE_MODE_DETERMINISTIC = "deterministic"
+INTAKE_MODE_AGENT = "agent"
+INTAKE_MODES = (INTAKE_MODE_DETERMINISTIC, INTAKE_MODE_AGENT)
+
+# --- Explanation modes ---
+# "inline": the reasoning is part of the decision (written by the routing or explainer
+# agent in agent mode, a template in deterministic mode).
+# "deferred": the engine or optimizer decides and the decision is returned at once with
+# its template reasoning and a "decision_id"; an explainer agent writes the reasoning in
+# the background (see explanations.py). The LLM workflow still decides orders the engine
+# cannot.
+EXPLANATIONS_INLINE = "inline"
+EXPLANATIONS_DEFERRED = "deferred"
+EXPLANATION_MODES = (EXPLANATIONS_INLINE, EXPLANATIONS_DEFERRED)
+
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
 
 def load_instruction_from_file(filename):
@@ -34,29 +74,21 @@ def load_instruction_from_file(filename):
     with open(prompt_file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-# --- Pydantic model for handoff payload ---
-class ProcessedOrderModel(BaseModel):
-    product_id: str
-    quantity: int
-    customer_id: str
-    customer_name: str
-    customer_zip_code: str
-    customer_tier: str
-
-class OrderRoutingPayloadModel(BaseModel):
-    processed_order: ProcessedOrderModel
-    business_priority: str
-
 # --- Handoff callback ---
 async def on_handoff(ctx, input_data):
     logger.info(f"Handoff to OrderRoutingDecisionAgent invoked with input: {input_data}")
+    # Keep the intake agent's processed order so the routed stock can be reserved
+    if isinstance(ctx.context, dict):
+        ctx.context["routing_payload"] = input_data
 
 # --- Agent Definitions ---
 order_routing_agent = Agent(
     name="OrderRoutingDecisionAgent",
     handoff_description="Specialist agent for determining optimal order fulfillment routes",
     instructions=load_instruction_from_file("order_routing_decision_agent_instructions.md"),
-    tools=[get_customer_zone, get_inventory, get_shipping_options],
+    tools=[get_route_candidates, get_customer_zone, get_inventory, get_shipping_options],
+    # The fallback tools are requested together and run concurrently (the tools are async)
+    model_settings=ModelSettings(parallel_tool_calls=True),
     model=MODEL
 )
 
@@ -77,69 +109,580 @@ order_intake_agent = Agent(
     model=MODEL
 )
 
-async def main(raw_order=None, business_priority=None):
+# Explains plans chosen by the split-shipment optimizer; it has no tools and decides nothing
+shipment_plan_explainer_agent = Agent(
+    name="ShipmentPlanExplainerAgent",
+    handoff_description="Explains multi-line shipment plans chosen by the split-shipment optimizer.",
+    instructions=load_instruction_from_file("shipment_plan_explainer_agent_instructions.md"),
+    model=MODEL
+)
+
+# Explains single-line routes decided by the engine when explanations are deferred
+route_explainer_agent = Agent(
+    name="RouteExplainerAgent",
+    handoff_description="Explains single-line routes chosen by the deterministic routing engine.",
+    instructions=load_instruction_from_file("route_explainer_agent_instructions.md"),
+    model=MODEL
+)
+
+def route_deterministically(routing_payload):
+    """
+    Routes a processed order with the vectorized engine, skipping every LLM round trip.
+
+    Returns:
+        The routing result dict (recommendation or routing error), or None when the
+        engine cannot decide and the routing agent should be consulted.
+    """
+    order = routing_payload.processed_order
+    zone = lookup_customer_zone(order.customer_zip_code)
+    return get_routing_engine().recommend(
+        order.product_id, order.quantity, zone, order.customer_tier, routing_payload.business_priority
+    )
+
+def fallback_route(routing_payload, reason, message):
+    """
+    Rule-based choice for when the LLM workflow is unavailable (see resilience.py): the
+    engine scores the candidates the tools would have served, breaking ties and treating
+    unknown priorities as balanced instead of deferring to the agent.
+
+    Returns:
+        The routing result dict (or routing error), flagged with "fallback" and "fallback_reason".
+    """
+    flags = {"fallback": True, "fallback_reason": reason}
+    if routing_payload is None:
+        return {"error": f"The routing agent is unavailable ({message}) and the order could not be processed without it.", **flags}
+    order = routing_payload.processed_order
+    zone = lookup_customer_zone(order.customer_zip_code)
+    decision = get_routing_engine().recommend(
+        order.product_id, order.quantity, zone, order.customer_tier, routing_payload.business_priority, break_ties=True
+    )
+    if isinstance(decision.get("recommendation"), dict):
+        decision = {**decision, "reasoning": f"{decision['reasoning']} Rule-based fallback: {message}", "decision_source": "rule_based_fallback"}
+    return {**decision, **flags}
+
+def decision_cache_key(routing_payload, mode):
+    """
+    Returns (key, version) for the decision cache.
+    The version combines the product's inventory version and the shipping data version,
+    so cached decisions are invalidated as soon as either changes. The key holds the
+    exact quantity: which locations can cover an order depends on it, so a decision is
+    never served for another quantity.
+    """
+    order = routing_payload.processed_order
+    zone = lookup_customer_zone(order.customer_zip_code)
+    key = (order.product_id, order.quantity, zone, order.customer_tier, routing_payload.business_priority, mode)
+    version = (get_inventory_service().product_version(order.product_id), get_shipping_index().version)
+    return key, version
+
+def reserve_route(decision, product_id, quantity):
+    """
+    Holds stock for a routing decision so concurrent orders cannot oversell.
+    The recommended location is tried first, then the alternatives in the order they
+    were considered; the first one that can still cover the order becomes the
+    recommendation.
+
+    Returns:
+        The decision with a "reservation_id", or the no-stock error if every
+        candidate location was drained by concurrent orders.
+    """
+    routes = [decision["recommendation"], *decision.get("alternatives_considered", [])]
+    inventory = get_inventory_service()
+    for i, route in enumerate(routes):
+        if not isinstance(route, dict) or not route.get("fulfillment_location"):
+            continue
+        reservation = inventory.reserve(product_id, route["fulfillment_location"], quantity)
+        if reservation is None:
+            continue
+        if i > 0:
+            logger.info(f"Recommended route no longer has stock, reserved alternative at {route['fulfillment_location']}")
+            decision = {
+                **decision,
+                "recommendation": route,
+                "reasoning": f"{decision.get('reasoning', '')} Stock at {routes[0].get('fulfillment_location')} was "
+                             f"taken by a concurrent order, so the next best option was reserved.".strip(),
+                "alternatives_considered": routes[i + 1:],
+            }
+        return {**decision, "reservation_id": reservation.reservation_id}
+    logger.warning(f"No candidate location could reserve {quantity} x {product_id}")
+    return {"error": "No stock available for the product at any location."}
+
+def plan_cart(cart_payload):
+    """
+    Plans the shipments of a multi-line order with the split-shipment optimizer.
+
+    Returns:
+        The optimizer result dict ("plan", "reasoning", "decision_source") or an error dict.
+    """
+    cart = cart_payload.processed_cart
+    zone = lookup_customer_zone(cart.customer_zip_code)
+    return get_split_shipment_optimizer().plan(
+        [(line.product_id, line.quantity) for line in cart.lines], zone, cart.customer_tier, cart_payload.business_priority
+    )
+
+def reserve_plan(decision):
+    """
+    Holds stock for every line of a shipment plan, all or nothing.
+
+    Returns:
+        The decision with "reservation_ids" (one per line, in plan order), or None if a
+        line could no longer be reserved; reservations already taken are then released.
+    """
+    inventory = get_inventory_service()
+    reservation_ids = []
+    for shipment in decision["plan"]["shipments"]:
+        for line in shipment["lines"]:
+            reservation = inventory.reserve(line["product_id"], shipment["fulfillment_location"], line["quantity"])
+            if reservation is None:
+                logger.warning(f"Could not reserve {line['quantity']} x {line['product_id']} at {shipment['fulfillment_location']}, releasing the plan")
+                for reservation_id in reservation_ids:
+                    inventory.release(reservation_id)
+                return None
+            reservation_ids.append(reservation.reservation_id)
+    return {**decision, "reservation_ids": reservation_ids}
+
+async def _explain(agent, message, decision, workflow_name, run_config, hooks):
+    # Explainer agents only word the reasoning; the decision itself is never changed
+    run_config = run_config or RunConfig()
+    with trace(workflow_name=workflow_name, disabled=run_config.tracing_disabled):
+        result = await Runner.run(
+            starting_agent=agent,
+            input=json.dumps(message),
+            run_config=run_config,
+            hooks=hooks
+        )
+    explanation = parse_agent_output(result.final_output)
+    if not isinstance(explanation.get("reasoning"), str) or not explanation["reasoning"].strip():
+        logger.warning(f"{agent.name} returned no usable reasoning ({explanation}), keeping the template explanation")
+        return decision
+    return {**decision, "reasoning": explanation["reasoning"], "explained_by": agent.name}
+
+async def explain_plan(decision, cart_payload, run_config=None, hooks=None):
+    """
+    Asks the ShipmentPlanExplainerAgent to explain a plan. The plan itself is never
+    changed; if the agent fails, the optimizer's template reasoning is kept.
+    """
+    message = {
+        "plan": decision["plan"],
+        "business_priority": cart_payload.business_priority,
+        "customer_tier": cart_payload.processed_cart.customer_tier,
+    }
+    return await _explain(shipment_plan_explainer_agent, message, decision, "Shipment Plan Explanation", run_config, hooks)
+
+async def explain_route(decision, routing_payload, run_config=None, hooks=None):
+    """
+    Asks the RouteExplainerAgent to explain a single-line route decided by the engine.
+    The route itself is never changed; if the agent fails, the engine's template
+    reasoning is kept.
+    """
+    message = {
+        "recommendation": decision["recommendation"],
+        "alternatives_considered": decision.get("alternatives_considered", []),
+        "processed_order": routing_payload.processed_order.model_dump(),
+        "business_priority": routing_payload.business_priority,
+    }
+    return await _explain(route_explainer_agent, message, decision, "Route Explanation", run_config, hooks)
+
+def defer_explanation(decision, explain):
+    """
+    Returns the decision as it stands, with a "decision_id" under which the background
+    explanation produced by `explain` (a coroutine function) can be fetched.
+    """
+    return get_explanation_queue().submit(decision, explain)
+
+def parse_agent_output(final_output):
+    """Turns the agent's final output into a result dict, or an error dict if it is unusable."""
+    # Ensure we always return a valid dict
+    if not final_output:
+        return {"error": "No recommendation produced by agent."}
+    try:
+        parsed = final_output
+        # If the agent returned a string, try to parse as JSON
+        if isinstance(parsed, str):
+            parsed = json.loads(parsed)
+        if not isinstance(parsed, dict):
+            return {"error": "Agent did not return a valid dict."}
+        return parsed
+    except Exception as e:
+        logger.error(f"Failed to parse agent output: {e}")
+        return {"error": f"Failed to parse agent output: {e}"}
+
+def _workflow_start(raw_order, business_priority, routing_payload):
+    # With a processed order the run starts at the routing agent; otherwise at intake
+    if routing_payload is not None:
+        return order_routing_agent, routing_payload.model_dump_json()
+    return order_intake_agent, json.dumps({
+        "raw_order": raw_order,
+        "business_priority": business_priority
+    })
+
+async def run_agent_workflow(raw_order, business_priority, routing_payload=None, run_context=None, run_config=None, hooks=None):
     # Restore tracing
+    run_config = run_config or RunConfig()
     trace_id = gen_trace_id()
-    with trace(workflow_name="Order Routing Workflow", trace_id=trace_id):
-        print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}\n")
-        
-        # Use defaults if not provided
-        if raw_order is None:
-            raw_order = {"product_id": "product_A", "quantity": 1, "customer_id": "cust123"}
-        if business_priority is None:
-            business_priority = "PRIORITIZE_GOLD_TIER_SPEED"
+    with trace(workflow_name="Order Routing Workflow", trace_id=trace_id, disabled=run_config.tracing_disabled):
+        if not run_config.tracing_disabled:
+            print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}\n")
         
         # Create initial message with both order and priority
-        initial_message = json.dumps({
-            "raw_order": raw_order,
-            "business_priority": business_priority
-        })
+        starting_agent, initial_message = _workflow_start(raw_order, business_priority, routing_payload)
         
         # Run the conversation with tracing
-        logger.info("Starting order processing with intake agent")
+        logger.info(f"Starting order processing with {starting_agent.name}")
         result = await Runner.run(
-            starting_agent=order_intake_agent,
+            starting_agent=starting_agent,
             input=initial_message,
-            run_config=RunConfig()
+            context=run_context,
+            run_config=run_config,
+            hooks=hooks
         )
         logger.info("Order processing completed")
         logger.info(f"Final result from main: {result.final_output}")
-        # Ensure we always return a valid dict
-        if not result.final_output:
-            return {"error": "No recommendation produced by agent."}
+        return parse_agent_output(result.final_output)
+
+def _item_field(raw_item, name):
+    # Run items carry either SDK/OpenAI objects or plain dicts depending on the item type
+    if isinstance(raw_item, dict):
+        return raw_item.get(name)
+    return getattr(raw_item, name, None)
+
+async def stream_agent_workflow(raw_order, business_priority, routing_payload=None, run_context=None, run_config=None, hooks=None):
+    """
+    Same workflow as run_agent_workflow, but driven by Runner.run_streamed so progress can
+    be forwarded as it happens. Yields {"event": ..., "data": ...} dicts for agent changes,
+    tool calls, tool results and handoffs, then a final "agent_output" event carrying the
+    parsed result.
+    """
+    run_config = run_config or RunConfig()
+    trace_id = gen_trace_id()
+    with trace(workflow_name="Order Routing Workflow", trace_id=trace_id, disabled=run_config.tracing_disabled):
+        if not run_config.tracing_disabled:
+            print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}\n")
+        starting_agent, initial_message = _workflow_start(raw_order, business_priority, routing_payload)
+
+        logger.info(f"Starting streamed order processing with {starting_agent.name}")
+        result = Runner.run_streamed(
+            starting_agent=starting_agent,
+            input=initial_message,
+            context=run_context,
+            run_config=run_config,
+            hooks=hooks
+        )
+        tool_names = {}  # call_id -> tool name, to label tool results
+        async for event in result.stream_events():
+            if event.type == "agent_updated_stream_event":
+                yield {"event": "agent", "data": {"agent": event.new_agent.name}}
+            elif event.type == "run_item_stream_event":
+                agent_name = event.item.agent.name if getattr(event.item, "agent", None) else None
+                if event.name == "tool_called":
+                    call_id = _item_field(event.item.raw_item, "call_id")
+                    tool_names[call_id] = _item_field(event.item.raw_item, "name")
+                    yield {"event": "tool_call", "data": {
+                        "agent": agent_name,
+                        "tool": tool_names[call_id],
+                        "arguments": _item_field(event.item.raw_item, "arguments"),
+                    }}
+                elif event.name == "tool_output":
+                    call_id = _item_field(event.item.raw_item, "call_id")
+                    yield {"event": "tool_result", "data": {
+                        "agent": agent_name,
+                        "tool": tool_names.get(call_id),
+                        "output": str(event.item.output),
+                    }}
+                elif event.name == "handoff_occured":
+                    yield {"event": "handoff", "data": {
+                        "from": event.item.source_agent.name,
+                        "to": event.item.target_agent.name,
+                    }}
+        logger.info("Streamed order processing completed")
+        logger.info(f"Final result from main: {result.final_output}")
+        yield {"event": "agent_output", "data": parse_agent_output(result.final_output)}
+
+async def route_order_events(raw_order=None, business_priority=None, mode=ROUTING_MODE_AGENT, reserve=True, use_cache=True, stream_agent=False, intake=INTAKE_MODE_DETERMINISTIC, run_config=None, hooks=None, explanations=EXPLANATIONS_INLINE, deadline_seconds=None, hedge=False):
+    """
+    The routing pipeline as a stream of progress events: an "intake" event first, any
+    agent/tool/handoff events while the LLM workflow runs (when stream_agent is set),
+    and always a final "decision" event carrying the result dict that main() returns.
+    With explanations="deferred" the decision event carries a "decision_id" and an
+    "explanation_status"; the explanation itself is looked up in the explanation queue.
+
+    Agent runs are bounded by the agent run guard (see resilience.py): deadline_seconds
+    overrides its default deadline and hedge allows a hedged second attempt. If the run
+    fails, times out or the model circuit breaker is open, the decision comes from the
+    rule-based fallback and is flagged with "fallback" and "fallback_reason".
+
+    run_config and hooks are passed to the Agents SDK Runner, e.g. to run the agents on
+    another model provider (see scripted_model.py) or to observe model turns and tool calls.
+    Every run is also recorded in the routing metrics (see metrics.py).
+    """
+    metrics = get_routing_metrics()
+    hooks = MetricsHooks(metrics, delegate=hooks)
+    async for event in _route_order_events(raw_order, business_priority, mode, reserve, use_cache, stream_agent, intake, explanations, deadline_seconds, hedge, run_config, hooks, metrics):
+        if event["event"] == "decision":
+            metrics.record_decision(event["data"], mode)
+        yield event
+
+async def _route_order_events(raw_order, business_priority, mode, reserve, use_cache, stream_agent, intake, explanations, deadline_seconds, hedge, run_config, hooks, metrics):
+    observe_stage = metrics.stage_duration.observe
+    # Use defaults if not provided
+    if raw_order is None:
+        raw_order = {"product_id": "product_A", "quantity": 1, "customer_id": "cust123"}
+    if business_priority is None:
+        business_priority = "PRIORITIZE_GOLD_TIER_SPEED"
+    if mode not in ROUTING_MODES:
+        yield {"event": "decision", "data": {"error": f"Unknown routing mode '{mode}'. Expected one of {list(ROUTING_MODES)}."}}
+        return
+    if intake not in INTAKE_MODES:
+        yield {"event": "decision", "data": {"error": f"Unknown intake mode '{intake}'. Expected one of {list(INTAKE_MODES)}."}}
+        return
+    if explanations not in EXPLANATION_MODES:
+        yield {"event": "decision", "data": {"error": f"Unknown explanation mode '{explanations}'. Expected one of {list(EXPLANATION_MODES)}."}}
+        return
+    deferred = explanations == EXPLANATIONS_DEFERRED
+
+    if is_cart(raw_order):
+        async for event in _route_cart_events(raw_order, business_priority, mode, reserve, intake, deferred, deadline_seconds, run_config, hooks, metrics):
+            yield event
+        return
+
+    # Validate and enrich in-process; the intake agent is only used when explicitly requested
+    stage_start = time.perf_counter()
+    routing_payload, intake_error = await process_raw_order_async(raw_order, business_priority)
+    observe_stage("intake", value=time.perf_counter() - stage_start)
+    yield {"event": "intake", "data": {
+        "raw_order": raw_order,
+        "business_priority": business_priority,
+        "mode": mode,
+        "intake": intake,
+        "processed_order": routing_payload.processed_order.model_dump() if routing_payload else None,
+    }}
+    if intake_error is not None and intake == INTAKE_MODE_DETERMINISTIC:
+        yield {"event": "decision", "data": intake_error}
+        return
+
+    # Deferred explanations need a decision right away, so the engine decides in either mode
+    decide_mode = ROUTING_MODE_DETERMINISTIC if deferred else mode
+
+    # Repeat (product, quantity, zone, tier, priority) combinations are served from the cache
+    cache = get_decision_cache()
+    cache_entry = decision_cache_key(routing_payload, decide_mode) if use_cache and routing_payload else None
+    if cache_entry is not None:
+        stage_start = time.perf_counter()
+        cache_key, cache_version = cache_entry
+        cached = cache.get(cache_key, cache_version)
+        observe_stage("cache_lookup", value=time.perf_counter() - stage_start)
+        if cached is not None:
+            order = routing_payload.processed_order
+            decision = reserve_route(cached, order.product_id, order.quantity) if reserve else cached
+            if decision.get("recommendation") == cached["recommendation"]:
+                logger.info(f"Decision cache hit for {cache_key}")
+                if deferred:
+                    decision = _defer_route_explanation(decision, routing_payload, run_config)
+                yield {"event": "decision", "data": {**decision, "cache_hit": True}}
+                return
+            # The cached pick can no longer be reserved: drop the entry and decide afresh
+            if "reservation_id" in decision:
+                get_inventory_service().release(decision["reservation_id"])
+            cache.invalidate(cache_key)
+
+    decision = None
+    run_context = None
+    if decide_mode == ROUTING_MODE_DETERMINISTIC and routing_payload is not None:
+        stage_start = time.perf_counter()
+        decision = route_deterministically(routing_payload)
+        observe_stage("engine", value=time.perf_counter() - stage_start)
+        if decision is not None:
+            logger.info(f"Deterministic engine result: {decision}")
+        else:
+            logger.info("Deterministic engine could not decide, falling back to agent workflow")
+    if decision is None:
+        # Skip the intake agent's model turn unless agentic intake was requested
+        start_payload = routing_payload if intake == INTAKE_MODE_DETERMINISTIC else None
+        # The routing payload lets the tools rank their output for the order's priority and tier
+        run_context = {"routing_payload": start_payload} if start_payload is not None else {}
+        guard = get_agent_run_guard()
+
+        async def attempt(attempt_config):
+            # Hedged attempts run side by side, so each has its own context and hooks
+            context = dict(run_context)
+            attempt_hooks = MetricsHooks(metrics, delegate=hooks.delegate)
+            return await run_agent_workflow(raw_order, business_priority, start_payload, context, attempt_config, attempt_hooks), context
+
+        stage_start = time.perf_counter()
+        try:
+            if stream_agent:
+                stream = guard.stream(
+                    lambda attempt_config: stream_agent_workflow(raw_order, business_priority, start_payload, run_context, attempt_config, hooks),
+                    run_config or RunConfig(), deadline_seconds
+                )
+                async for event in stream:
+                    if event["event"] == "agent_output":
+                        decision = event["data"]
+                    else:
+                        yield event
+            else:
+                decision, run_context = await guard.run(attempt, run_config or RunConfig(), deadline_seconds, hedge)
+        except AgentUnavailable as e:
+            logger.warning(f"Agent workflow unavailable ({e.reason}), using the rule-based fallback: {e}")
+            metrics.agent_fallbacks.inc(e.reason)
+            decision = fallback_route(routing_payload, e.reason, str(e))
+        observe_stage("agent_workflow", value=time.perf_counter() - stage_start)
+        routing_payload = routing_payload or run_context.get("routing_payload")
+    # Fallback decisions are second best; the next order should try the agent again
+    if cache_entry is not None and isinstance(decision.get("recommendation"), dict) and not decision.get("fallback"):
+        cache.put(cache_key, cache_version, decision)
+    # Token savings of this run's tool outputs; not cached, since a cache hit makes no tool calls
+    if run_context is not None and isinstance(decision, dict):
+        tool_output = summarize_tool_outputs(run_context.get("tool_outputs"))
+        if tool_output is not None:
+            decision = {**decision, "tool_output": tool_output}
+
+    # Hold the stock as the decision is made so concurrent orders cannot oversell
+    if reserve and routing_payload is not None and isinstance(decision.get("recommendation"), dict):
+        stage_start = time.perf_counter()
+        order = routing_payload.processed_order
+        decision = reserve_route(decision, order.product_id, order.quantity)
+        observe_stage("reserve", value=time.perf_counter() - stage_start)
+    if deferred:
+        decision = _defer_route_explanation(decision, routing_payload, run_config)
+    yield {"event": "decision", "data": decision}
+
+def _defer_route_explanation(decision, routing_payload, run_config):
+    # Only engine decisions carry a template reasoning; the agent's own wording needs no second pass
+    if decision.get("decision_source") != "deterministic_engine" or not isinstance(decision.get("recommendation"), dict):
+        return decision
+    return defer_explanation(decision, lambda: explain_route(decision, routing_payload, run_config, MetricsHooks(get_routing_metrics())))
+
+async def _route_cart_events(raw_cart, business_priority, mode, reserve, intake, deferred, deadline_seconds, run_config, hooks, metrics):
+    # Multi-line orders: the optimizer decides the split, the agent (in agent mode or with
+    # deferred explanations) only explains it. Carts always use deterministic intake and
+    # skip the decision cache.
+    observe_stage = metrics.stage_duration.observe
+    stage_start = time.perf_counter()
+    cart_payload, intake_error = process_raw_cart(raw_cart, business_priority)
+    observe_stage("intake", value=time.perf_counter() - stage_start)
+    yield {"event": "intake", "data": {
+        "raw_order": raw_cart,
+        "business_priority": business_priority,
+        "mode": mode,
+        "intake": INTAKE_MODE_DETERMINISTIC,
+        "processed_cart": cart_payload.processed_cart.model_dump() if cart_payload else None,
+    }}
+    if intake_error is not None:
+        yield {"event": "decision", "data": intake_error}
+        return
+    if intake != INTAKE_MODE_DETERMINISTIC:
+        logger.info(f"Multi-line orders use deterministic intake; ignoring intake mode '{intake}'")
+
+    stage_start = time.perf_counter()
+    decision = plan_cart(cart_payload)
+    observe_stage("split_optimizer", value=time.perf_counter() - stage_start)
+
+    # Hold every line's stock; if a concurrent order took some of it, plan once more on what is left
+    if reserve and "plan" in decision:
+        stage_start = time.perf_counter()
+        reserved = reserve_plan(decision)
+        if reserved is None:
+            decision = plan_cart(cart_payload)
+            reserved = reserve_plan(decision) if "plan" in decision else decision
+        observe_stage("reserve", value=time.perf_counter() - stage_start)
+        decision = reserved or {"error": "No stock available for the product at any location."}
+
+    if deferred and "plan" in decision:
+        planned = decision
+        decision = defer_explanation(planned, lambda: explain_plan(planned, cart_payload, run_config, MetricsHooks(metrics)))
+    elif mode == ROUTING_MODE_AGENT and "plan" in decision:
+        stage_start = time.perf_counter()
+        planned = decision
         try:
-            parsed = result.final_output
-            # If the agent returned a string, try to parse as JSON
-            if isinstance(parsed, str):
-                parsed = json.loads(parsed)
-            if not isinstance(parsed, dict):
-                return {"error": "Agent did not return a valid dict."}
-            return parsed
-        except Exception as e:
-            logger.error(f"Failed to parse agent output: {e}")
-            return {"error": f"Failed to parse agent output: {e}"}
+            decision = await get_agent_run_guard().run(
+                lambda attempt_config: explain_plan(planned, cart_payload, attempt_config, hooks), run_config or RunConfig(), deadline_seconds
+            )
+        except AgentUnavailable as e:
+            # The plan (and its reservations) stands without the agent's wording
+            logger.error(f"Explainer agent unavailable ({e.reason}), keeping the template explanation: {e}")
+        observe_stage("agent_workflow", value=time.perf_counter() - stage_start)
+    yield {"event": "decision", "data": decision}
+
+async def main(raw_order=None, business_priority=None, mode=ROUTING_MODE_AGENT, reserve=True, use_cache=True, intake=INTAKE_MODE_DETERMINISTIC, run_config=None, hooks=None, explanations=EXPLANATIONS_INLINE, deadline_seconds=None, hedge=False, profile=None):
+    if profile is not None:
+        # Debug capture (see profiling.py); the decision comes back with a "profile" handle
+        if profile not in PROFILERS:
+            decision = {"error": f"Unknown profiler '{profile}'. Expected one of {list(PROFILERS)}."}
+            get_routing_metrics().record_decision(decision, mode)
+            return decision
+        request = {"raw_order": raw_order, "business_priority": business_priority, "mode": mode, "intake": intake, "explanations": explanations}
+        return await profile_request(
+            lambda profile_hooks: main(raw_order, business_priority, mode=mode, reserve=reserve, use_cache=use_cache, intake=intake, run_config=run_config, hooks=profile_hooks, explanations=explanations, deadline_seconds=deadline_seconds, hedge=hedge),
+            profile, request=request, hooks=hooks,
+        )
+    decision = None
+    async for event in route_order_events(raw_order, business_priority, mode=mode, reserve=reserve, use_cache=use_cache, intake=intake, run_config=run_config, hooks=hooks, explanations=explanations, deadline_seconds=deadline_seconds, hedge=hedge):
+        if event["event"] == "decision":
+            decision = event["data"]
+    return decision
+
+# --- Example Test Scenarios ---
+# Also replayed offline by benchmark.py.
+TEST_SCENARIOS = [
+    {"name": "SC01: Gold Tier Speed (Valid)", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust123"}, "priority": "PRIORITIZE_GOLD_TIER_SPEED"},
+    {"name": "SC02: Minimize Cost (Valid)", "raw_order": {"product_id": "product_D", "quantity": 2, "customer_id": "cust456"}, "priority": "MINIMIZE_COST"},
+    {"name": "SC03: Minimize CO2 (Valid)", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust789"}, "priority": "MINIMIZE_CO2"},
+    {"name": "SC04: Balanced (Valid)", "raw_order": {"product_id": "product_B", "quantity": 1, "customer_id": "cust101"}, "priority": "BALANCED_COST_TIME"},
+    {"name": "SC05: Intake - Invalid Customer ID", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust_INVALID"}, "priority": "MINIMIZE_COST"},
+    {"name": "SC06: Routing - No Stock (High Qty)", "raw_order": {"product_id": "product_C", "quantity": 100, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
+    {"name": "SC07: Intake - Invalid Quantity", "raw_order": {"product_id": "product_A", "quantity": -1, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
+    {"name": "SC08: Intake - Missing Raw Order Key (product_id)", "raw_order": {"quantity": 1, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
+    {"name": "SC09: Routing - No Shipping Options", "raw_order": {"product_id": "product_C", "quantity": 1, "customer_id": "cust789"}, "priority": "MINIMIZE_COST"}, # cust789 is ZONE_1
+]
 
 if __name__ == "__main__":
     # asyncio.run(main())
 
-    # Example Test Scenarios
-    test_scenarios = [
-        {"name": "SC01: Gold Tier Speed (Valid)", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust123"}, "priority": "PRIORITIZE_GOLD_TIER_SPEED"},
-        {"name": "SC02: Minimize Cost (Valid)", "raw_order": {"product_id": "product_D", "quantity": 2, "customer_id": "cust456"}, "priority": "MINIMIZE_COST"},
-        {"name": "SC03: Minimize CO2 (Valid)", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust789"}, "priority": "MINIMIZE_CO2"},
-        {"name": "SC04: Balanced (Valid)", "raw_order": {"product_id": "product_B", "quantity": 1, "customer_id": "cust101"}, "priority": "BALANCED_COST_TIME"},
-        {"name": "SC05: Intake - Invalid Customer ID", "raw_order": {"product_id": "product_A", "quantity": 1, "customer_id": "cust_INVALID"}, "priority": "MINIMIZE_COST"},
-        {"name": "SC06: Routing - No Stock (High Qty)", "raw_order": {"product_id": "product_C", "quantity": 100, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
-        {"name": "SC07: Intake - Invalid Quantity", "raw_order": {"product_id": "product_A", "quantity": -1, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
-        {"name": "SC08: Intake - Missing Raw Order Key (product_id)", "raw_order": {"quantity": 1, "customer_id": "cust123"}, "priority": "MINIMIZE_COST"},
-        {"name": "SC09: Routing - No Shipping Options", "raw_order": {"product_id": "product_C", "quantity": 1, "customer_id": "cust789"}, "priority": "MINIMIZE_COST"}, # cust789 is ZONE_1
-    ]
+    test_scenarios = TEST_SCENARIOS
+
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the order routing test scenarios.")
+    parser.add_argument("--mode", choices=ROUTING_MODES, default=ROUTING_MODE_AGENT, help="Routing mode to use for every scenario.")
+    parser.add_argument("--intake", choices=INTAKE_MODES, default=INTAKE_MODE_DETERMINISTIC, help="Intake mode to use for every scenario.")
+    parser.add_argument("--explanations", choices=EXPLANATION_MODES, default=EXPLANATIONS_INLINE, help="Explain decisions inline or in the background.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Run the scenarios concurrently with this many in flight (1 = sequential).")
+    parser.add_argument("--profile", choices=PROFILERS, help="Profile each scenario and save the profiles (see profiling.py).")
+    args = parser.parse_args()
+
+    async def run_all_tests_concurrently():
+        from agentic_order_routing.batch_routing import route_orders
+        batch = await route_orders(
+            [{"raw_order": sc["raw_order"], "business_priority": sc["priority"], "mode": args.mode, "intake": args.intake, "explanations": args.explanations} for sc in test_scenarios],
+            max_concurrency=args.concurrency,
+            route_fn=main,
+        )
+        for scenario_data, entry in zip(test_scenarios, batch["results"]):
+            print(f"\n<<<<<<<<<< {scenario_data['name']} ({entry['status']}, {entry['latency_ms']} ms) >>>>>>>>>>")
+            print(json.dumps(entry["result"], indent=2))
+        print(f"\nBatch stats: {json.dumps(batch['stats'], indent=2)}")
+        await print_explanations([entry["result"] for entry in batch["results"]])
 
     async def run_all_tests():
+        results = []
         for i, scenario_data in enumerate(test_scenarios):
             print(f"\n\n<<<<<<<<<< RUNNING SCENARIO {i+1}: {scenario_data['name']} >>>>>>>>>>")
-            await main(scenario_data["raw_order"], scenario_data["priority"])
+            result = await main(scenario_data["raw_order"], scenario_data["priority"], mode=args.mode, intake=args.intake, explanations=args.explanations, profile=args.profile)
+            if args.mode == ROUTING_MODE_DETERMINISTIC or args.explanations == EXPLANATIONS_DEFERRED:
+                print(json.dumps(result, indent=2))
+            elif isinstance(result, dict) and "profile" in result:
+                print(f"Profile: {json.dumps(result['profile'])}")
+            results.append(result)
             print("<<<<<<<<<< SCENARIO COMPLETE >>>>>>>>>>\n")
+        await print_explanations(results)
+
+    async def print_explanations(results):
+        # Deferred explanations arrive after the decisions; wait for them before the loop closes
+        queue = get_explanation_queue()
+        await queue.drain()
+        for result in results:
+            if isinstance(result, dict) and "decision_id" in result:
+                print(f"Explanation {result['decision_id']}: {json.dumps(queue.get(result['decision_id']), indent=2)}")
 
-    asyncio.run(run_all_tests())    
+    # Profiles are captured one request at a time, so --profile runs the scenarios sequentially
+    asyncio.run(run_all_tests_concurrently() if args.concurrency > 1 and not args.profile else run_all_tests())    
 
@@ -0,0 +1,365 @@
+# Prometheus-style metrics for the Agentic AI Order Routing POC.
+# A small dependency-free registry of counters, gauges and fixed-bucket histograms,
+# rendered in the Prometheus text exposition format by the /metrics endpoint. Recording
+# is a dict lookup, a bisect and a few additions under a per-metric lock, so it is cheap
+# enough for the hot path and safe from the worker threads that run sync tools.
+#
+# Model turns, tool calls and handoffs are timed through MetricsHooks (Agents SDK run
+# hooks); pipeline stages, decisions and error categories are recorded by main.py and
+# HTTP request latency and in-flight requests by api_server.py; tool output sizes by
+# tool_output.py; stock updates by stock_updates.py; deferred explanations by explanations.py;
+# agent run fallbacks, hedges and the circuit breaker by resilience.py and main.py;
+# admission queue waits and rejections by admission.py; JSONL stream results by order_stream.py;
+# captured request profiles by profiling.py.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from agents import RunHooks
+
+# Upper bounds in seconds; spans sub-millisecond in-process stages up to slow LLM runs.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A metric family: one value (or histogram) per combination of label values."""
+
+    type_name = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> value
+
+    def _check(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. errors by category."""
+
+    type_name = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight."""
+
+    type_name = "gauge"
+
+    def inc(self, *labels, amount=1):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram of observed values (seconds for latencies)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        self._check(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """Observes the wall time of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def snapshot(self, *labels):
+        """Returns {"count", "sum"} for one label combination."""
+        with self._lock:
+            entry = self._values.get(labels)
+            return {"count": entry[2], "sum": entry[1]} if entry else {"count": 0, "sum": 0.0}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted((labels, (list(entry[0]), entry[1], entry[2])) for labels, entry in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_number(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families in registration order and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- Error categories ---
+# Matched against the error messages the intake stage, the engine and the agents produce.
+ERROR_CATEGORIES = (
+    ("intake_invalid", ("Validation failed", "not found in CRM", "Invalid customer_id", "zip_code is missing", "Invalid input JSON")),
+    ("no_stock", ("No stock available",)),
+    ("no_shipping_options", ("No shipping options available",)),
+    ("invalid_zone", ("valid customer shipping zone",)),
+    ("no_route", ("Unable to determine a suitable",)),
+    ("timeout", ("timed out",)),
+    ("agent_unavailable", ("routing agent is unavailable",)),
+    ("agent_output", ("parse agent output", "No recommendation produced", "did not return a valid dict")),
+    ("bad_request", ("Unknown routing mode", "Unknown intake mode", "Unknown explanation mode", "Unknown profiler", "Unknown business_priority")),
+)
+
+
+# Decision "mode" label values: the routing modes of main.ROUTING_MODES (main imports this
+# module, so they are listed here). The mode comes from request input; any other value is
+# counted as "other" so requests cannot create new series.
+DECISION_MODES = ("agent", "deterministic")
+OTHER_LABEL = "other"
+
+
+def classify_error(message):
+    """Maps an error message to one of the ERROR_CATEGORIES names, or "other"."""
+    message = str(message)
+    for category, fragments in ERROR_CATEGORIES:
+        if any(fragment in message for fragment in fragments):
+            return category
+    return OTHER_LABEL
+
+
+class RoutingMetrics:
+    """The metric families exported by the order routing service."""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        register = self.registry.register
+        self.request_duration = register(Histogram(
+            "order_routing_request_duration_seconds", "End-to-end latency of routing API requests.", ("endpoint",)))
+        self.requests_in_flight = register(Gauge(
+            "order_routing_requests_in_flight", "Routing API requests currently being handled.", ("endpoint",)))
+        self.stage_duration = register(Histogram(
+            "order_routing_stage_duration_seconds", "Latency of each routing pipeline stage.", ("stage",)))
+        self.agent_turn_duration = register(Histogram(
+            "order_routing_agent_turn_duration_seconds", "Latency of a single model turn, per agent.", ("agent",)))
+        self.tool_duration = register(Histogram(
+            "order_routing_tool_duration_seconds", "Latency of agent tool calls, per tool.", ("tool",)))
+        self.tool_output_tokens = register(Counter(
+            "order_routing_tool_output_tokens_total",
+            "Estimated tokens handed to the model by routing tools, per tool and output mode.", ("tool", "mode")))
+        self.tool_output_saved_tokens = register(Counter(
+            "order_routing_tool_output_saved_tokens_total",
+            "Estimated tokens saved against the verbose tool output, per tool.", ("tool",)))
+        self.handoff_duration = register(Histogram(
+            "order_routing_handoff_duration_seconds",
+            "Time from the model turn that requested a handoff until the receiving agent starts.", ("from_agent", "to_agent")))
+        self.decisions = register(Counter(
+            "order_routing_decisions_total", "Routing decisions by mode and outcome (routed, cache_hit, fallback, error).", ("mode", "outcome")))
+        self.errors = register(Counter(
+            "order_routing_errors_total", "Routing errors by category.", ("category",)))
+        self.stock_changes = register(Counter(
+            "order_routing_stock_changes_total",
+            "Stock update events by outcome (applied, invalid, refused by the inventory).", ("outcome",)))
+        self.explanations = register(Counter(
+            "order_routing_explanations_total",
+            "Deferred explanations by outcome (ready, failed, dropped when the queue is full).", ("outcome",)))
+        self.agent_fallbacks = register(Counter(
+            "order_routing_agent_fallbacks_total",
+            "Decisions that fell back to the rule-based choice, by reason (circuit_open, deadline, model_error).", ("reason",)))
+        self.agent_hedges = register(Counter(
+            "order_routing_agent_hedges_total",
+            "Hedged agent runs by outcome (started, primary_won, hedge_won).", ("outcome",)))
+        self.agent_circuit_open = register(Gauge(
+            "order_routing_agent_circuit_open", "1 while the model circuit breaker is open or probing, else 0."))
+        self.admission_wait = register(Histogram(
+            "order_routing_admission_wait_seconds", "Time requests spent queued for admission, per request class.", ("request_class",)))
+        self.admissions = register(Counter(
+            "order_routing_admissions_total", "Admission decisions per request class (admitted, rejected).", ("request_class", "outcome")))
+        self.admission_queue_depth = register(Gauge(
+            "order_routing_admission_queue_depth", "Requests waiting for admission, per request class.", ("request_class",)))
+        self.stream_orders = register(Counter(
+            "order_routing_stream_orders_total", "Orders routed by the JSONL stream processor, per result status.", ("status",)))
+        self.profiles = register(Counter(
+            "order_routing_profiles_total", "Per-request profiles captured, per profiler.", ("profiler",)))
+
+    def record_decision(self, decision, mode):
+        """Counts a final routing decision and, for errors, its category."""
+        if mode not in DECISION_MODES:
+            mode = OTHER_LABEL
+        if not isinstance(decision, dict) or "error" in decision:
+            self.decisions.inc(mode, "error")
+            self.errors.inc(classify_error(decision.get("error") if isinstance(decision, dict) else "no decision"))
+        else:
+            self.decisions.inc(mode, "cache_hit" if decision.get("cache_hit") else "fallback" if decision.get("fallback") else "routed")
+
+    @contextmanager
+    def track_request(self, endpoint):
+        """Times a request and counts it as in flight until the block exits."""
+        self.requests_in_flight.inc(endpoint)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.request_duration.observe(endpoint, value=time.perf_counter() - start)
+            self.requests_in_flight.dec(endpoint)
+
+    def render(self):
+        return self.registry.render()
+
+
+class MetricsHooks(RunHooks):
+    """
+    Run hooks that record model turns, tool calls and handoffs of one agent run.
+
+    Create one instance per run. Other hooks can be passed as `delegate`; every callback
+    is forwarded to them after it has been recorded.
+    """
+
+    def __init__(self, metrics, delegate=None):
+        self.metrics = metrics
+        self.delegate = delegate
+        self._turn_started = None
+        self._turn_ended = None
+        self._pending_handoff = None
+        self._tool_started = {}
+
+    async def on_agent_start(self, context, agent):
+        if self._pending_handoff is not None:
+            from_agent, requested_at = self._pending_handoff
+            self._pending_handoff = None
+            self.metrics.handoff_duration.observe(from_agent, agent.name, value=time.perf_counter() - requested_at)
+        if self.delegate is not None:
+            await self.delegate.on_agent_start(context, agent)
+
+    async def on_agent_end(self, context, agent, output):
+        if self.delegate is not None:
+            await self.delegate.on_agent_end(context, agent, output)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._turn_started = time.perf_counter()
+        if self.delegate is not None:
+            await self.delegate.on_llm_start(context, agent, system_prompt, input_items)
+
+    async def on_llm_end(self, context, agent, response):
+        self._turn_ended = time.perf_counter()
+        if self._turn_started is not None:
+            self.metrics.agent_turn_duration.observe(agent.name, value=self._turn_ended - self._turn_started)
+            self._turn_started = None
+        if self.delegate is not None:
+            await self.delegate.on_llm_end(context, agent, response)
+
+    async def on_tool_start(self, context, agent, tool):
+        # Parallel tool calls in one turn each get their own tool context
+        self._tool_started[id(context)] = time.perf_counter()
+        if self.delegate is not None:
+            await self.delegate.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        started = self._tool_started.pop(id(context), None)
+        if started is not None:
+            self.metrics.tool_duration.observe(tool.name, value=time.perf_counter() - started)
+        if self.delegate is not None:
+            await self.delegate.on_tool_end(context, agent, tool, result)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        # Measured from the end of the turn that requested the handoff
+        self._pending_handoff = (from_agent.name, self._turn_ended or time.perf_counter())
+        if self.delegate is not None:
+            await self.delegate.on_handoff(context, from_agent, to_agent)
+
+
+_metrics = None
+
+def get_routing_metrics():
+    """Returns the process-wide routing metrics."""
+    global _metrics
+    if _metrics is None:
+        _metrics = RoutingMetrics()
+    return _metrics
+
+
+if __name__ == '__main__':
+    metrics = get_routing_metrics()
+    with metrics.track_request("/optimize-route"):
+        metrics.stage_duration.observe("intake", value=0.0004)
+        metrics.record_decision({"error": "No stock available for the product at any location."}, "agent")
+    print(metrics.render())
@@ -93,6 +93,17 @@ SHIPPING_OPTIONS_DB = {
 
 # 4. Mock ZIP Code to Shipping Zone Mapping
 # Simplifies determining a customer's region for shipping calculations.
+# ZIP_ZONE_RANGES maps inclusive numeric ZIP ranges (by national ZIP region) to zones;
+# ZIP_TO_ZONE_DB holds exact ZIPs, which take precedence over the ranges.
+# ZIPs outside every range resolve to "UNKNOWN_ZONE" (see zip_index.py).
+ZIP_ZONE_RANGES = [
+    (501, 29999, "ZONE_1"),    # New England, New York, Mid-Atlantic, Carolinas
+    (30000, 39999, "ZONE_3"),  # Southeast
+    (40000, 69999, "ZONE_1"),  # Midwest and Great Lakes
+    (70000, 79999, "ZONE_3"),  # South Central
+    (80000, 99950, "ZONE_2"),  # Mountain and West Coast
+]
+
 ZIP_TO_ZONE_DB = {
     "10001": "ZONE_1", # NYC (East Coast)
     "02101": "ZONE_1", # Boston (East Coast)
@@ -101,7 +112,6 @@ ZIP_TO_ZONE_DB = {
     "60606": "ZONE_1", # Chicago (Central, but often grouped with East for national models)
     "75201": "ZONE_3", # Dallas (South)
     "30303": "ZONE_3", # Atlanta (South)
-    "UNKNOWN_ZIP_DEFAULT": "ZONE_1" # A default if a ZIP isn't specifically mapped
 }
 
 # 5. Mock Product Weight Database
@@ -135,6 +145,10 @@ if __name__ == '__main__':
     for zip_code, zone in ZIP_TO_ZONE_DB.items():
         print(f"{zip_code} -> {zone}")
 
+    print("\n--- ZIP_ZONE_RANGES ---")
+    for start, end, zone in ZIP_ZONE_RANGES:
+        print(f"{start:05d}-{end:05d} -> {zone}")
+
     print("\n--- PRODUCT_WEIGHT_DB ---")
     for product, weight in PRODUCT_WEIGHT_DB.items():
         print(f"{product}: {weight} kg")
@@ -0,0 +1,34 @@
+# Pydantic models shared by the intake stage, the agents and the API.
+
+from typing import List
+
+from pydantic import BaseModel
+
+# --- Pydantic model for handoff payload ---
+class ProcessedOrderModel(BaseModel):
+    product_id: str
+    quantity: int
+    customer_id: str
+    customer_name: str
+    customer_zip_code: str
+    customer_tier: str
+
+class OrderRoutingPayloadModel(BaseModel):
+    processed_order: ProcessedOrderModel
+    business_priority: str
+
+# --- Multi-line orders (carts) ---
+class OrderLineModel(BaseModel):
+    product_id: str
+    quantity: int
+
+class ProcessedCartModel(BaseModel):
+    lines: List[OrderLineModel]
+    customer_id: str
+    customer_name: str
+    customer_zip_code: str
+    customer_tier: str
+
+class CartRoutingPayloadModel(BaseModel):
+    processed_cart: ProcessedCartModel
+    business_priority: str
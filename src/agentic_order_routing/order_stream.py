@@ -0,0 +1,360 @@
+# JSONL order-stream processing for the Agentic AI Order Routing POC.
+# Routes orders read from a JSONL file (a queue export) or from stdin (a local stand-in
+# for a queue consumer, e.g. `consumer | python -m ...order_stream -`) and writes one
+# JSONL result per order. The pipeline is three async generator stages: read lines ->
+# route them through main() with bounded concurrency -> write results. Only a bounded
+# window of lines is ever held in memory, so memory stays flat however large the input.
+#
+# Results are written as they finish, not in input order; each carries its input "line"
+# number. A checkpoint file (written atomically every ORDER_STREAM_CHECKPOINT_EVERY
+# results or ORDER_STREAM_CHECKPOINT_SECONDS) records the input offset below which every
+# order is done, plus the few orders past it that are done too. Rerunning the same
+# command after an interruption resumes from there: results written after the last
+# checkpoint are read back from the output file, so no order that already has a result
+# is routed again.
+#
+# Orders that may start an agent run wait for an admission slot (see admission.py), as
+# API requests do; when the admission queue is full an order waits the suggested
+# Retry-After and asks again, since a stream has no client to hand a 429 to.
+#
+#   python -m agentic_order_routing.order_stream orders.jsonl results.jsonl --concurrency 64
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from contextlib import aclosing
+
+from agentic_order_routing.batch_routing import BATCH_ORDER_TIMEOUT_SECONDS, _percentile, route_single_order
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+ORDER_STREAM_CONCURRENCY = 32
+# Dispatched lines that may be in flight or finished ahead of the oldest unfinished one
+ORDER_STREAM_WINDOW_FACTOR = 8
+ORDER_STREAM_CHECKPOINT_EVERY = 1000
+ORDER_STREAM_CHECKPOINT_SECONDS = 5.0
+# Recent latencies kept for the p50/p95 in the run stats
+ORDER_STREAM_LATENCY_SAMPLES = 10000
+
+STREAM_STATUSES = ("ok", "error", "timeout", "invalid")
+# Per-line fields that override the run's defaults
+LINE_OPTIONS = ("business_priority", "mode", "intake", "deadline_seconds", "hedge")
+
+
+def parse_order_line(text, defaults):
+    """
+    Turns one JSONL line into an order for route_single_order.
+
+    A line is either {"raw_order": {...}, ...} or the flat /optimize-route request shape
+    ({"product_id", "quantity"} or {"lines"}, plus "customer_id"). "business_priority",
+    "mode", "intake", "deadline_seconds" and "hedge" override `defaults`; an "order_id"
+    is copied to the result.
+
+    Raises:
+        ValueError: The line is not a JSON object.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+    if "raw_order" in data:
+        raw_order = data["raw_order"]
+    elif "lines" in data:
+        raw_order = {"lines": data["lines"], "customer_id": data.get("customer_id")}
+    else:
+        raw_order = {"product_id": data.get("product_id"), "quantity": data.get("quantity"), "customer_id": data.get("customer_id")}
+    order = dict(defaults)
+    order.update({name: data[name] for name in LINE_OPTIONS if data.get(name) is not None})
+    order["raw_order"] = raw_order
+    order["order_id"] = data.get("order_id")
+    return order
+
+
+# --- Checkpoints ---
+def load_checkpoint(path):
+    """Returns the checkpoint dict at `path`, or None if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    """Replaces the checkpoint atomically, so an interruption leaves the old or the new one."""
+    partial = f"{path}.{os.getpid()}.partial"
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+
+
+def _recover_output(output, output_bytes, done, counts):
+    # Reads back the results written after the checkpoint and drops a torn last line
+    output.seek(output_bytes)
+    good_end = output_bytes
+    for raw in output:
+        if not raw.endswith(b"\n"):
+            break
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            break
+        done.add(record["line"])
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+        good_end += len(raw)
+    output.truncate(good_end)
+    output.seek(good_end)
+    return good_end
+
+
+# --- Pipeline stages ---
+async def read_order_lines(stream, cursor, skip=(), blocking=False):
+    """
+    Yields (line_no, end_offset, raw_line) for each non-blank line from cursor["line"] on.
+
+    Args:
+        stream: A binary file positioned at cursor["offset"].
+        cursor: {"line", "offset"}, advanced as lines are read.
+        skip: Line numbers that already have a result.
+        blocking: Read in a worker thread (pipes), so a slow producer does not stall
+            the orders in flight.
+    """
+    while True:
+        raw = await asyncio.to_thread(stream.readline) if blocking else stream.readline()
+        if not raw:
+            return
+        line_no = cursor["line"]
+        cursor["line"] += 1
+        cursor["offset"] += len(raw)
+        if raw.strip() and line_no not in skip:
+            yield line_no, cursor["offset"], raw
+
+
+async def _route_line(line_no, raw, defaults, route_fn, order_timeout, scheduler):
+    try:
+        order = parse_order_line(raw, defaults)
+    except ValueError as e:
+        return {"line": line_no, "order_id": None, "status": "invalid", "latency_ms": 0.0,
+                "result": {"error": f"Invalid order line: {e}"}}
+    start = time.perf_counter()
+    while True:
+        result, status, _ = await route_single_order(order, route_fn, order_timeout, log_prefix="ORDER_STREAM", scheduler=scheduler)
+        if status != "rejected":
+            break
+        await asyncio.sleep(result["retry_after"])
+    latency_ms = (time.perf_counter() - start) * 1000
+    return {"line": line_no, "order_id": order["order_id"], "status": status, "latency_ms": round(latency_ms, 3), "result": result}
+
+
+async def route_order_lines(lines, defaults, route_fn, concurrency=ORDER_STREAM_CONCURRENCY, order_timeout=BATCH_ORDER_TIMEOUT_SECONDS,
+                            scheduler=None):
+    """
+    Routes lines from `lines` with at most `concurrency` in flight and yields
+    (record, watermark) as each finishes. `watermark` is (next_line, offset) once every
+    line before next_line is finished, or None when it did not move. Agent-path orders
+    wait on `scheduler` for admission when one is given.
+
+    Reading pauses while the oldest unfinished line is ORDER_STREAM_WINDOW_FACTOR x
+    concurrency lines behind, so a stuck order cannot let finished ones pile up.
+    """
+    window = max(1, concurrency) * ORDER_STREAM_WINDOW_FACTOR
+    dispatched = deque()  # [line_no, end_offset, finished], oldest first
+    running = {}  # task -> its dispatched entry
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) < concurrency and len(dispatched) < window:
+                try:
+                    line_no, end_offset, raw = await anext(lines)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                entry = [line_no, end_offset, False]
+                dispatched.append(entry)
+                running[asyncio.ensure_future(_route_line(line_no, raw, defaults, route_fn, order_timeout, scheduler))] = entry
+            if not running:
+                return
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                running.pop(task)[2] = True
+                watermark = None
+                while dispatched and dispatched[0][2]:
+                    line_no, end_offset, _ = dispatched.popleft()
+                    watermark = (line_no + 1, end_offset)
+                yield task.result(), watermark
+    finally:
+        for task in running:
+            task.cancel()
+
+
+async def process_order_stream(input_path, output_path, checkpoint_path=None, defaults=None, route_fn=None,
+                               concurrency=ORDER_STREAM_CONCURRENCY, order_timeout=BATCH_ORDER_TIMEOUT_SECONDS,
+                               checkpoint_every=ORDER_STREAM_CHECKPOINT_EVERY, checkpoint_seconds=ORDER_STREAM_CHECKPOINT_SECONDS,
+                               restart=False, scheduler=None):
+    """
+    Routes every order in a JSONL input and appends the results to a JSONL output.
+
+    Args:
+        input_path: JSONL file of orders (see parse_order_line), or "-" for stdin.
+        output_path: JSONL file of results: {"line", "order_id", "status", "latency_ms", "result"}.
+        checkpoint_path: Checkpoint file; defaults to output_path + ".checkpoint". Not used
+            for stdin, which cannot be resumed.
+        defaults: Default "business_priority", "mode", "intake", ... for every line.
+        route_fn: The coroutine used to route one order; defaults to main.main.
+        concurrency: Orders routed at the same time.
+        order_timeout: Seconds a single order may take.
+        checkpoint_every: Results between checkpoints.
+        checkpoint_seconds: Longest time between checkpoints.
+        restart: Ignore an existing checkpoint and overwrite the output.
+        scheduler: AdmissionScheduler that agent-path orders wait on for a slot; None
+            routes them without admission.
+
+    Returns:
+        The run stats. "orders" counts the whole input so far, resumed runs included.
+
+    Raises:
+        ValueError: The checkpoint belongs to another input file.
+    """
+    if route_fn is None:
+        from agentic_order_routing.main import main as route_fn
+    from_stdin = input_path == "-"
+    if checkpoint_path is None and not from_stdin:
+        checkpoint_path = f"{output_path}.checkpoint"
+    metrics = get_routing_metrics()
+    start = time.perf_counter()
+
+    checkpoint = None if restart or from_stdin else load_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint["input"] != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint['input']}; rerun with restart (--restart) to start over.")
+    counts = dict(checkpoint["counts"]) if checkpoint else {status: 0 for status in STREAM_STATUSES}
+    cursor = {"line": checkpoint["next_line"], "offset": checkpoint["input_offset"]} if checkpoint else {"line": 0, "offset": 0}
+    done = set(checkpoint["done_above"]) if checkpoint else set()
+    resumed = sum(counts.values())
+    if checkpoint is not None and checkpoint.get("complete"):
+        logger.info(f"ORDER_STREAM: {input_path} was already fully processed into {output_path}")
+        return _stream_stats(counts, resumed, 0, deque(), time.perf_counter() - start, concurrency, complete=True)
+
+    source = sys.stdin.buffer if from_stdin else open(input_path, "rb")
+    output = open(output_path, "r+b" if checkpoint is not None else "w+b")
+    try:
+        if checkpoint is not None:
+            _recover_output(output, checkpoint["output_bytes"], done, counts)
+            resumed = sum(counts.values())
+            source.seek(cursor["offset"])
+            logger.info(f"ORDER_STREAM: resuming {input_path} at line {cursor['line']} with {resumed} orders already routed")
+        watermark = (cursor["line"], cursor["offset"])
+
+        def save(complete=False):
+            if checkpoint_path is None:
+                return
+            output.flush()
+            os.fsync(output.fileno())
+            next_line, offset = (cursor["line"], cursor["offset"]) if complete else watermark
+            # Only finished lines past the watermark need remembering
+            done.difference_update([line_no for line_no in done if line_no < next_line])
+            write_checkpoint(checkpoint_path, {
+                "input": os.path.abspath(input_path),
+                "input_offset": offset,
+                "next_line": next_line,
+                "done_above": sorted(done),
+                "output_bytes": output.tell(),
+                "counts": counts,
+                "complete": complete,
+            })
+
+        latencies = deque(maxlen=ORDER_STREAM_LATENCY_SAMPLES)
+        routed = 0
+        since_checkpoint, last_checkpoint = 0, time.monotonic()
+        lines = read_order_lines(source, cursor, skip=frozenset(done), blocking=from_stdin)
+        async with aclosing(lines), aclosing(route_order_lines(lines, defaults or {}, route_fn, concurrency, order_timeout, scheduler)) as results:
+            try:
+                async for record, moved in results:
+                    output.write(json.dumps(record, default=str).encode() + b"\n")
+                    # Flushed per result: a crash loses at most the orders still in flight
+                    output.flush()
+                    counts[record["status"]] += 1
+                    metrics.stream_orders.inc(record["status"])
+                    latencies.append(record["latency_ms"])
+                    done.add(record["line"])
+                    routed += 1
+                    if moved is not None:
+                        watermark = moved
+                    since_checkpoint += 1
+                    if since_checkpoint >= checkpoint_every or time.monotonic() - last_checkpoint >= checkpoint_seconds:
+                        save()
+                        since_checkpoint, last_checkpoint = 0, time.monotonic()
+                        logger.info(f"ORDER_STREAM: checkpoint at line {watermark[0]}, {sum(counts.values())} orders routed")
+            except BaseException:
+                # Interrupted (e.g. Ctrl-C): keep what finished so the rerun resumes after it
+                save()
+                raise
+        save(complete=True)
+    finally:
+        output.close()
+        if not from_stdin:
+            source.close()
+
+    stats = _stream_stats(counts, resumed, routed, latencies, time.perf_counter() - start, concurrency, complete=True)
+    logger.info(f"ORDER_STREAM: routed {routed} orders from {input_path} in {stats['wall_time_ms']} ms")
+    return stats
+
+
+def _stream_stats(counts, resumed, routed, latencies, elapsed, concurrency, complete):
+    ordered = sorted(latencies)
+    return {
+        "orders": sum(counts.values()),
+        "resumed": resumed,
+        "routed": routed,
+        **{status: counts.get(status, 0) for status in STREAM_STATUSES},
+        "complete": complete,
+        "concurrency": concurrency,
+        "wall_time_ms": round(elapsed * 1000, 3),
+        "orders_per_second": round(routed / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": round(_percentile(ordered, 50), 3),
+            "p95": round(_percentile(ordered, 95), 3),
+            "max": round(ordered[-1], 3) if ordered else 0.0,
+        },
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import functools
+
+    from agentic_order_routing.admission import get_admission_scheduler
+    from agentic_order_routing.main import INTAKE_MODE_DETERMINISTIC, INTAKE_MODES, ROUTING_MODE_DETERMINISTIC, ROUTING_MODES, main
+
+    parser = argparse.ArgumentParser(description="Route a JSONL stream of orders and write JSONL results, resumably.")
+    parser.add_argument("input", help="JSONL file of orders, or - to read from stdin.")
+    parser.add_argument("output", help="JSONL file for the results.")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.checkpoint).")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over.")
+    parser.add_argument("--concurrency", type=int, default=ORDER_STREAM_CONCURRENCY, help="Orders routed at once.")
+    parser.add_argument("--order-timeout", type=float, default=BATCH_ORDER_TIMEOUT_SECONDS, help="Seconds one order may take.")
+    parser.add_argument("--checkpoint-every", type=int, default=ORDER_STREAM_CHECKPOINT_EVERY, help="Results between checkpoints.")
+    parser.add_argument("--priority", default="BALANCED_COST_TIME", help="Business priority for lines that set none.")
+    parser.add_argument("--mode", choices=ROUTING_MODES, default=ROUTING_MODE_DETERMINISTIC, help="Routing mode for lines that set none.")
+    parser.add_argument("--intake", choices=INTAKE_MODES, default=INTAKE_MODE_DETERMINISTIC, help="Intake mode for lines that set none.")
+    parser.add_argument("--no-reserve", action="store_true", help="Route without reserving inventory.")
+    parser.add_argument("--log-level", default="ERROR")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level)
+
+    defaults = {"business_priority": args.priority, "mode": args.mode, "intake": args.intake}
+    try:
+        stats = asyncio.run(process_order_stream(
+            args.input, args.output, checkpoint_path=args.checkpoint, defaults=defaults,
+            route_fn=functools.partial(main, reserve=not args.no_reserve),
+            concurrency=args.concurrency, order_timeout=args.order_timeout,
+            checkpoint_every=args.checkpoint_every, restart=args.restart, scheduler=get_admission_scheduler(),
+        ))
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(stats, indent=2))
@@ -0,0 +1,456 @@
+# Opt-in per-request profiling for the Agentic AI Order Routing POC.
+# main(profile=...) (and the "profile" field of /optimize-route) runs one order under a
+# profiler and saves what it found to PROFILE_DIR/<profile_id>/:
+#
+#   stacks.folded  collapsed stacks, for flamegraph.pl, speedscope or inferno
+#   profile.pstats the raw cProfile data (deterministic profiler only), for pstats/snakeviz
+#   summary.json   wall and CPU time per phase: model turns, tool calls, Pydantic
+#                  validation, JSON (de)serialization, logging, routing, agent runtime
+#
+# "deterministic" runs cProfile on the event loop thread with a thread CPU timer, so the
+# phase split is exact CPU time with call counts. "sampling" samples the stacks of every
+# thread (including the tool worker threads) each SAMPLING_INTERVAL_SECONDS, with wall
+# and per-thread CPU time per phase. In both, model turns and tool calls are also timed
+# end to end by run hooks, since awaited time never shows up on a stack. A profile covers
+# everything that ran in the process meanwhile, so profiled requests run one at a time.
+# When no profiler is asked for nothing here runs.
+#
+#   python -m agentic_order_routing.profiling --profiler sampling
+
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, defaultdict
+
+from agents import RunHooks
+
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+PROFILE_DIR = os.environ.get("ORDER_ROUTING_PROFILE_DIR", "profiles")
+# Oldest profiles beyond this are deleted when a new one is saved
+PROFILE_MAX_KEPT = 100
+
+PROFILER_DETERMINISTIC = "deterministic"
+PROFILER_SAMPLING = "sampling"
+PROFILERS = (PROFILER_DETERMINISTIC, PROFILER_SAMPLING)
+
+SAMPLING_INTERVAL_SECONDS = 0.001
+# Deepest call path written to stacks.folded for the deterministic profiler
+FOLDED_MAX_DEPTH = 128
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+
+# --- Phases ---
+# A stack belongs to the phase of its innermost frame that matches, checked in this
+# order per frame: JSON encoding inside a tool counts as JSON, the rest of the tool as
+# tool calls. Patterns match the frame's module path (or a C function's name).
+PHASE_RULES = (
+    ("validation", ("pydantic/", "pydantic_core")),
+    ("json", ("json/", "_json")),
+    ("logging", ("logging/",)),
+    ("model_turns", ("scripted_model.py", "openai/", "agents/models/", "httpx/", "httpcore/")),
+    ("tool_calls", ("agentic_order_routing/tools/", "data_store.py", "inventory_service.py", "agents/tool.py")),
+    ("routing", ("routing_engine.py", "split_shipment.py", "shipping_index.py", "zip_index.py", "decision_cache.py")),
+    ("agent_runtime", ("agents/",)),
+)
+PHASES = tuple(phase for phase, _ in PHASE_RULES) + ("other",)
+# Innermost frames of a thread that is waiting rather than working (sampling only)
+IDLE_LEAVES = ("selectors.py", "threading.py", "queue.py", "concurrent/futures/thread.py")
+
+
+def classify_stack(stack):
+    """Returns the phase of a stack of frame labels, outermost first."""
+    for label in reversed(stack):
+        for phase, patterns in PHASE_RULES:
+            if any(pattern in label for pattern in patterns):
+                return phase
+    return "other"
+
+
+_module_paths = {}
+
+def _module_path(filename):
+    # "agents/run.py" rather than the absolute site-packages path
+    path = _module_paths.get(filename)
+    if path is None:
+        path = os.path.basename(filename)
+        for entry in sorted((os.path.abspath(p) for p in sys.path if p), key=len, reverse=True):
+            if filename.startswith(entry + os.sep):
+                path = os.path.relpath(filename, entry)
+                break
+        _module_paths[filename] = path
+    return path
+
+
+def frame_label(filename, lineno, name):
+    """The flamegraph label of a function: "name (module/path.py:line)", or a C function's name."""
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({_module_path(filename)}:{lineno})".replace(";", ",")
+
+
+# --- Run hooks ---
+class PhaseHooks(RunHooks):
+    """Times model turns and tool calls end to end, awaited time included."""
+
+    def __init__(self, delegate=None):
+        self.delegate = delegate
+        self.model_turns = 0
+        self.model_seconds = 0.0
+        self.tool_seconds = Counter()
+        self.tool_calls = Counter()
+        self._turn_started = {}
+        self._tool_started = {}
+
+    async def on_agent_start(self, context, agent):
+        if self.delegate is not None:
+            await self.delegate.on_agent_start(context, agent)
+
+    async def on_agent_end(self, context, agent, output):
+        if self.delegate is not None:
+            await self.delegate.on_agent_end(context, agent, output)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._turn_started[id(context)] = time.perf_counter()
+        if self.delegate is not None:
+            await self.delegate.on_llm_start(context, agent, system_prompt, input_items)
+
+    async def on_llm_end(self, context, agent, response):
+        started = self._turn_started.pop(id(context), None)
+        if started is not None:
+            self.model_turns += 1
+            self.model_seconds += time.perf_counter() - started
+        if self.delegate is not None:
+            await self.delegate.on_llm_end(context, agent, response)
+
+    async def on_tool_start(self, context, agent, tool):
+        self._tool_started[id(context)] = time.perf_counter()
+        if self.delegate is not None:
+            await self.delegate.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(self, context, agent, tool, result):
+        started = self._tool_started.pop(id(context), None)
+        if started is not None:
+            self.tool_calls[tool.name] += 1
+            self.tool_seconds[tool.name] += time.perf_counter() - started
+        if self.delegate is not None:
+            await self.delegate.on_tool_end(context, agent, tool, result)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        if self.delegate is not None:
+            await self.delegate.on_handoff(context, from_agent, to_agent)
+
+    def summary(self):
+        return {
+            "model_turns": {"count": self.model_turns, "wall_ms": round(self.model_seconds * 1000, 3)},
+            "tool_calls": {
+                "count": sum(self.tool_calls.values()),
+                "wall_ms": round(sum(self.tool_seconds.values()) * 1000, 3),
+                "by_tool": {name: {"count": self.tool_calls[name], "wall_ms": round(seconds * 1000, 3)}
+                            for name, seconds in self.tool_seconds.most_common()},
+            },
+        }
+
+
+# --- Profilers ---
+def _thread_cpu_seconds(ident):
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+class StackSampler(threading.Thread):
+    """Samples every other thread's stack each `interval` seconds until stop() is called."""
+
+    def __init__(self, interval=SAMPLING_INTERVAL_SECONDS):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.wall = Counter()  # stack -> seconds
+        self.cpu = Counter()  # stack -> thread CPU seconds
+        self.samples = 0
+        self.idle_seconds = 0.0
+        self._stopped = threading.Event()
+        self._labels = {}  # code object -> label
+
+    def start(self):
+        # The sampler needs the GIL to look at other threads; by default a busy thread
+        # only gives it up every 5 ms
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        super().start()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def run(self):
+        own = threading.get_ident()
+        cpu_seen = {}
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                cpu = _thread_cpu_seconds(ident)
+                cpu_delta = cpu - cpu_seen[ident] if cpu is not None and ident in cpu_seen else 0.0
+                cpu_seen[ident] = cpu
+                if any(pattern in stack[-1] for pattern in IDLE_LEAVES):
+                    self.idle_seconds += elapsed
+                    continue
+                stack = tuple(stack)
+                self.wall[stack] += elapsed
+                self.cpu[stack] += cpu_delta
+                self.samples += 1
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = frame_label(code.co_filename, code.co_firstlineno, code.co_name)
+        return label
+
+
+def folded_from_pstats(stats, max_depth=FOLDED_MAX_DEPTH):
+    """
+    Rebuilds collapsed stacks from cProfile data.
+
+    cProfile keeps caller -> callee totals, not whole stacks, so a function's time is split
+    over its call paths in proportion to the time each caller spent in it (as flameprof
+    does). Recursion and coroutine resumption make those splits inexact, so each
+    function's paths are then rescaled to add up to its measured own time.
+
+    Args:
+        stats: A pstats.Stats.
+
+    Returns:
+        A Counter of {stack tuple: seconds}.
+    """
+    entries = stats.stats
+    children = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    paths = defaultdict(Counter)  # func -> {stack: seconds}
+
+    def visit(func, stack, on_path, share):
+        _, _, own_time, total_time, _ = entries[func]
+        stack = stack + (frame_label(*func),)
+        if own_time * share > 0:
+            paths[func][stack] += own_time * share
+        if len(stack) >= max_depth:
+            return
+        for child, edge_time in children.get(func, ()):
+            child_total = entries[child][3]
+            # Skip recursion and negligible paths (under a microsecond)
+            if child in on_path or child_total <= 0 or edge_time * share < 1e-6:
+                continue
+            visit(child, stack, on_path | {child}, share * edge_time / child_total)
+
+    for func, entry in entries.items():
+        if not entry[4]:
+            visit(func, (), frozenset((func,)), 1.0)
+    folded = Counter()
+    for func, (_, _, own_time, _, _) in entries.items():
+        if own_time <= 0:
+            continue
+        attributed = sum(paths[func].values())
+        if attributed <= 0:
+            # Only reachable through a cycle: keep its time as a stack of its own
+            folded[(frame_label(*func),)] += own_time
+            continue
+        for stack, seconds in paths[func].items():
+            folded[stack] += seconds * own_time / attributed
+    return folded
+
+
+# --- Capture ---
+class ProfileCapture:
+    """
+    One profiled request: start(), await the request, stop(), then save().
+
+    Args:
+        profiler: "deterministic" or "sampling".
+        profile_dir: Directory the profile directories are written to.
+    """
+
+    def __init__(self, profiler, profile_dir=None, hooks=None):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}'. Expected one of {list(PROFILERS)}.")
+        self.profiler = profiler
+        self.profile_dir = profile_dir or PROFILE_DIR
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.hooks = PhaseHooks(delegate=hooks)
+        self._profile = None
+        self._sampler = None
+        self._wall = self._cpu = 0.0
+
+    def start(self):
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        if self.profiler == PROFILER_DETERMINISTIC:
+            self._profile = cProfile.Profile(time.thread_time)
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler()
+            self._sampler.start()
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+        else:
+            self._sampler.stop()
+        self._wall, self._cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+
+    def save(self, request=None, status=None):
+        """
+        Writes the profile files.
+
+        Returns:
+            The handle: {"profile_id", "profiler", "profile_dir"}.
+        """
+        path = os.path.abspath(os.path.join(self.profile_dir, self.profile_id))
+        os.makedirs(path, exist_ok=True)
+        files = {"folded": "stacks.folded"}
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(path, "profile.pstats"))
+            files["pstats"] = "profile.pstats"
+            cpu = folded_from_pstats(pstats.Stats(self._profile))
+            wall, samples, idle = None, None, None
+        else:
+            wall, cpu = self._sampler.wall, self._sampler.cpu
+            samples, idle = self._sampler.samples, self._sampler.idle_seconds
+        # Sampled wall time is the more direct view of where a slow request spent its time
+        weights = wall if wall is not None else cpu
+        with open(os.path.join(path, "stacks.folded"), "w", encoding="utf-8") as f:
+            for stack, seconds in weights.most_common():
+                f.write(f"{';'.join(stack)} {max(1, round(seconds * 1e6))}\n")
+
+        phases = {phase: {"wall_ms": None if wall is None else 0.0, "cpu_ms": 0.0} for phase in PHASES}
+        for stack, seconds in cpu.items():
+            phases[classify_stack(stack)]["cpu_ms"] += seconds * 1000
+        for stack, seconds in (wall or {}).items():
+            phases[classify_stack(stack)]["wall_ms"] += seconds * 1000
+        for entry in phases.values():
+            for key, value in entry.items():
+                if value is not None:
+                    entry[key] = round(value, 3)
+        summary = {
+            "profile_id": self.profile_id,
+            "profiler": self.profiler,
+            "request": request,
+            "status": status,
+            "wall_ms": round(self._wall * 1000, 3),
+            "cpu_ms": round(self._cpu * 1000, 3),
+            "phases": phases,
+            "awaited": self.hooks.summary(),
+            "samples": samples,
+            "idle_ms": None if idle is None else round(idle * 1000, 3),
+            "files": files,
+        }
+        with open(os.path.join(path, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, default=str)
+        _prune(self.profile_dir)
+        get_routing_metrics().profiles.inc(self.profiler)
+        logger.info(f"PROFILING: saved the {self.profiler} profile of {self.profile_id} to {path}")
+        return {"profile_id": self.profile_id, "profiler": self.profiler, "profile_dir": path}
+
+
+def _prune(profile_dir):
+    names = sorted(name for name in os.listdir(profile_dir) if PROFILE_ID_PATTERN.match(name))
+    for name in names[:max(0, len(names) - PROFILE_MAX_KEPT)]:
+        shutil.rmtree(os.path.join(profile_dir, name), ignore_errors=True)
+
+
+def load_profile_summary(profile_id, profile_dir=None):
+    """Returns the summary.json of a saved profile, or None if there is no such profile."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(profile_dir or PROFILE_DIR, profile_id, "summary.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# One profiled request at a time per event loop; profilers see the whole process
+_profile_locks = weakref.WeakKeyDictionary()
+
+async def profile_request(route, profiler, request=None, hooks=None, profile_dir=None):
+    """
+    Runs one request under a profiler.
+
+    Args:
+        route: A coroutine function taking the run hooks and returning the decision.
+        profiler: "deterministic" or "sampling".
+        request: Description of the request, stored in summary.json.
+        hooks: Run hooks to keep receiving the callbacks.
+        profile_dir: Overrides PROFILE_DIR.
+
+    Returns:
+        The decision with a "profile" handle (see ProfileCapture.save).
+
+    Raises:
+        ValueError: Unknown profiler.
+    """
+    capture = ProfileCapture(profiler, profile_dir, hooks)
+    loop = asyncio.get_running_loop()
+    lock = _profile_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        capture.start()
+        try:
+            decision = await route(capture.hooks)
+        finally:
+            capture.stop()
+    if not isinstance(decision, dict):
+        status = "no_decision"
+    else:
+        status = "error" if "error" in decision else "fallback" if decision.get("fallback") else "ok"
+    handle = await asyncio.to_thread(capture.save, request, status)
+    return {**decision, "profile": handle} if isinstance(decision, dict) else decision
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from agentic_order_routing.main import ROUTING_MODE_AGENT, ROUTING_MODES, TEST_SCENARIOS, main
+    from agentic_order_routing.scripted_model import scripted_run_config
+
+    parser = argparse.ArgumentParser(description="Profile one scenario and print its phase breakdown.")
+    parser.add_argument("--profiler", choices=PROFILERS, default=PROFILER_DETERMINISTIC)
+    parser.add_argument("--mode", choices=ROUTING_MODES, default=ROUTING_MODE_AGENT)
+    parser.add_argument("--scenario", type=int, default=1, help="Scenario number (SC01 = 1).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model turn.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    scenario = TEST_SCENARIOS[args.scenario - 1]
+    decision = asyncio.run(main(scenario["raw_order"], scenario["priority"], mode=args.mode, use_cache=False,
+                                run_config=scripted_run_config(latency_seconds=args.latency), profile=args.profiler))
+    summary = load_profile_summary(decision["profile"]["profile_id"])
+    print(f"{scenario['name']}: {summary['status']}, {summary['wall_ms']} ms wall, {summary['cpu_ms']} ms CPU "
+          f"({args.profiler}) -> {decision['profile']['profile_dir']}")
+    for phase, entry in summary["phases"].items():
+        print(f"  {phase:14s} wall {entry['wall_ms'] if entry['wall_ms'] is not None else '-':>10} ms   cpu {entry['cpu_ms']:>10} ms")
+    for name, entry in summary["awaited"].items():
+        print(f"  awaited {name:11s} {entry['count']:3d} x, {entry['wall_ms']} ms wall")
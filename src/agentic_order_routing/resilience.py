@@ -0,0 +1,363 @@
+# Latency bounds for the LLM workflow of the Agentic AI Order Routing POC.
+# AgentRunGuard wraps every agent run with:
+#   - a deadline for the whole run and a timeout for each model turn;
+#   - an optional hedged second attempt, started once the first has run longer than a
+#     percentile of recent run latencies (the agent tools only read, so racing two runs
+#     is safe; the loser is cancelled);
+#   - a circuit breaker that opens after CIRCUIT_FAILURE_THRESHOLD consecutive failed
+#     runs, so a failing model is not called again until CIRCUIT_RESET_SECONDS have
+#     passed and one probe run has succeeded.
+# When the breaker is open, the deadline passes or the model fails, the guard raises
+# AgentUnavailable and main.py falls back to a rule-based choice over the same data the
+# tools serve, flagged as a fallback. Tail latency of an order is then bounded by the
+# deadline instead of by the slowest model call.
+
+import asyncio
+import dataclasses
+import logging
+import threading
+import time
+from collections import deque
+
+from agents import ModelProvider
+from agents.models.interface import Model
+
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+# Longest an order may wait for the LLM workflow, hedged attempts included
+AGENT_RUN_DEADLINE_SECONDS = 30.0
+# Longest a single model turn may take
+AGENT_TURN_TIMEOUT_SECONDS = 15.0
+# A hedged attempt starts once the first has run longer than this percentile of recent runs
+AGENT_HEDGE_PERCENTILE = 95
+# Successful runs needed before hedging starts; until then there is no latency to compare with
+AGENT_HEDGE_MIN_SAMPLES = 20
+AGENT_HEDGE_WINDOW = 200
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30.0
+
+# Reasons a decision fell back to the rule-based choice
+FALLBACK_CIRCUIT_OPEN = "circuit_open"
+FALLBACK_DEADLINE = "deadline"
+FALLBACK_MODEL_ERROR = "model_error"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+_END_OF_STREAM = object()
+
+
+class AgentUnavailable(Exception):
+    """The LLM workflow did not produce a result; `reason` is one of the FALLBACK_* values."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+# --- Per-turn timeout ---
+class TurnTimeoutModel(Model):
+    """Model wrapper that fails a turn taking longer than `timeout_seconds` with TimeoutError."""
+
+    def __init__(self, model, timeout_seconds):
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+
+    async def get_response(self, *args, **kwargs):
+        return await asyncio.wait_for(self.model.get_response(*args, **kwargs), self.timeout_seconds)
+
+    async def stream_response(self, *args, **kwargs):
+        # A streamed turn is bounded as a whole; events that arrive in time are forwarded
+        deadline = time.monotonic() + self.timeout_seconds
+        stream = self.model.stream_response(*args, **kwargs)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            await stream.aclose()
+
+    async def close(self):
+        await self.model.close()
+
+    def get_retry_advice(self, request):
+        return self.model.get_retry_advice(request)
+
+    async def _cleanup_on_run_end(self, owner):
+        await self.model._cleanup_on_run_end(owner)
+
+
+class TurnTimeoutModelProvider(ModelProvider):
+    """Resolves models through `provider` and bounds each of their turns."""
+
+    def __init__(self, provider, timeout_seconds):
+        self.provider = provider
+        self.timeout_seconds = timeout_seconds
+
+    def get_model(self, model_name):
+        return TurnTimeoutModel(self.provider.get_model(model_name), self.timeout_seconds)
+
+    async def aclose(self):
+        await self.provider.aclose()
+
+
+def with_turn_timeout(run_config, timeout_seconds):
+    """Returns a copy of `run_config` whose model turns fail after `timeout_seconds`."""
+    if isinstance(run_config.model_provider, TurnTimeoutModelProvider):
+        return run_config
+    return dataclasses.replace(run_config, model_provider=TurnTimeoutModelProvider(run_config.model_provider, timeout_seconds))
+
+
+# --- Circuit breaker ---
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. Once `reset_seconds` have passed,
+    one probe is let through (half open); its success closes the breaker, its failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.trips = 0
+
+    def allow(self):
+        """Returns whether a run may call the model now."""
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and self._clock() - self.opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+            if self.state == CIRCUIT_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CIRCUIT_CLOSED:
+                logger.info("CIRCUIT: probe run succeeded, closing the circuit")
+            self.state = CIRCUIT_CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != CIRCUIT_OPEN:
+                    logger.warning(f"CIRCUIT: opening after {self.consecutive_failures} consecutive failed agent run(s)")
+                    self.trips += 1
+                self.state = CIRCUIT_OPEN
+                self.opened_at = self._clock()
+            self._probing = False
+
+    def record_abandoned(self):
+        """A run was cancelled before it could succeed or fail, e.g. the client went away."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures, "trips": self.trips}
+
+
+# --- Hedging ---
+class LatencyWindow:
+    """The latencies of the last `size` successful runs, for the hedge delay."""
+
+    def __init__(self, size=AGENT_HEDGE_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=AGENT_HEDGE_MIN_SAMPLES):
+        """Returns the `pct` percentile in seconds, or None with fewer than `min_samples` samples."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class AgentRunGuard:
+    """
+    Bounds agent runs with a deadline, per-turn timeouts, optional hedging and a circuit
+    breaker.
+
+    Args:
+        deadline_seconds: Default deadline for a whole run, hedged attempts included.
+        turn_timeout_seconds: Timeout for each model turn.
+        hedge_percentile: Percentile of recent run latencies after which a hedged run starts.
+        breaker: The CircuitBreaker shared by all runs.
+    """
+
+    def __init__(self, deadline_seconds=AGENT_RUN_DEADLINE_SECONDS, turn_timeout_seconds=AGENT_TURN_TIMEOUT_SECONDS,
+                 hedge_percentile=AGENT_HEDGE_PERCENTILE, breaker=None):
+        self.deadline_seconds = deadline_seconds
+        self.turn_timeout_seconds = turn_timeout_seconds
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyWindow()
+        self.metrics = get_routing_metrics()
+
+    def _admit(self):
+        if not self.breaker.allow():
+            raise AgentUnavailable(FALLBACK_CIRCUIT_OPEN, "The model circuit breaker is open.")
+
+    def _failed(self, error, deadline):
+        self.breaker.record_failure()
+        self._report_circuit()
+        if isinstance(error, asyncio.TimeoutError):
+            return AgentUnavailable(FALLBACK_DEADLINE, f"The agent run exceeded its {deadline:g} s deadline or a model turn timed out.")
+        return AgentUnavailable(FALLBACK_MODEL_ERROR, f"The agent run failed: {error!r}")
+
+    def _succeeded(self, elapsed):
+        self.breaker.record_success()
+        self.latencies.observe(elapsed)
+        self._report_circuit()
+
+    def _report_circuit(self):
+        self.metrics.agent_circuit_open.set(value=0 if self.breaker.state == CIRCUIT_CLOSED else 1)
+
+    async def run(self, attempt, run_config, deadline_seconds=None, hedge=False):
+        """
+        Runs `attempt(run_config)` within the deadline.
+
+        Args:
+            attempt: Coroutine function taking the (turn-bounded) RunConfig and returning the
+                run's result. With hedging it may be called twice concurrently, so it must
+                not share per-run state between calls.
+            run_config: The RunConfig for the run.
+            deadline_seconds: Overrides the default deadline for this run.
+            hedge: Start a second attempt when the first runs past the hedge percentile.
+
+        Returns:
+            The result of the first attempt to finish.
+
+        Raises:
+            AgentUnavailable: The breaker is open, the deadline passed or the run failed.
+        """
+        self._admit()
+        deadline = deadline_seconds or self.deadline_seconds
+        run_config = with_turn_timeout(run_config, self.turn_timeout_seconds)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._race(attempt, run_config, hedge), deadline)
+        except asyncio.CancelledError:
+            self.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            logger.error(f"AGENT_GUARD: agent run failed after {time.perf_counter() - start:.3f} s: {e!r}")
+            raise self._failed(e, deadline) from e
+        self._succeeded(time.perf_counter() - start)
+        return result
+
+    async def _race(self, attempt, run_config, hedge):
+        primary = asyncio.ensure_future(attempt(run_config))
+        hedge_delay = self.latencies.percentile(self.hedge_percentile) if hedge else None
+        if hedge_delay is None:
+            return await primary
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                logger.info(f"AGENT_GUARD: run passed p{self.hedge_percentile} ({hedge_delay:.3f} s), starting a hedged attempt")
+                self.metrics.agent_hedges.inc("started")
+                tasks[asyncio.ensure_future(attempt(run_config))] = "hedge"
+            # The first attempt to succeed wins; an attempt that fails leaves the race to the other
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            self.metrics.agent_hedges.inc(f"{tasks[task]}_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, attempt, run_config, deadline_seconds=None):
+        """
+        Forwards the events of the async generator `attempt(run_config)` until it ends or
+        the deadline passes. Streamed runs are not hedged: their events are already on
+        their way to the client.
+
+        Raises:
+            AgentUnavailable: As run().
+        """
+        self._admit()
+        deadline = deadline_seconds or self.deadline_seconds
+        run_config = with_turn_timeout(run_config, self.turn_timeout_seconds)
+        start = time.perf_counter()
+        # The run is driven by its own task (the SDK's trace context must be entered and
+        # left in one task) and hands its events over a queue, which is read against the deadline
+        events = asyncio.Queue()
+
+        async def produce():
+            try:
+                async for event in attempt(run_config):
+                    events.put_nowait((event, None))
+                events.put_nowait((_END_OF_STREAM, None))
+            except Exception as e:
+                events.put_nowait((_END_OF_STREAM, e))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                remaining = deadline - (time.perf_counter() - start)
+                event, error = await asyncio.wait_for(events.get(), max(0.0, remaining))
+                if error is not None:
+                    raise error
+                if event is _END_OF_STREAM:
+                    break
+                yield event
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            logger.error(f"AGENT_GUARD: streamed agent run failed after {time.perf_counter() - start:.3f} s: {e!r}")
+            raise self._failed(e, deadline) from e
+        finally:
+            producer.cancel()
+        self._succeeded(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "turn_timeout_seconds": self.turn_timeout_seconds,
+            "hedge_after_seconds": self.latencies.percentile(self.hedge_percentile),
+            "circuit": self.breaker.stats(),
+        }
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_agent_run_guard():
+    """Returns the process-wide agent run guard."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = AgentRunGuard()
+        return _guard
@@ -0,0 +1,251 @@
+# Offline stand-in for the LLM behind the Agentic AI Order Routing POC.
+# ScriptedRoutingModel implements the Agents SDK Model interface and plays the agents
+# by their instructions: the OrderIntakeAgent validates the order, calls
+# get_customer_details_tool and hands off; the OrderRoutingDecisionAgent calls
+# get_route_candidates once and answers with the route JSON; the
+# ShipmentPlanExplainerAgent and RouteExplainerAgent explain the plan or route they are given. Each turn is derived from
+# the conversation so far, so one model instance can serve any number of concurrent runs
+# and the real Runner, tools, handoff and output parsing are exercised without network.
+
+import asyncio
+import json
+import logging
+
+import numpy as np
+from agents import ModelProvider, RunConfig
+from agents.models.interface import Model
+from agents.testing import ScriptedModel, assistant_message, function_call
+
+from agentic_order_routing.intake import validate_raw_order
+from agentic_order_routing.routing_engine import BUSINESS_PRIORITIES, RouteScoringEngine
+from agentic_order_routing.split_shipment import describe_plan
+from agentic_order_routing.tool_output import expand_route_candidates
+
+logger = logging.getLogger("agent_workflow")
+
+INTAKE_TOOL = "get_customer_details_tool"
+ROUTE_CANDIDATES_TOOL = "get_route_candidates"
+
+
+def _field(item, name):
+    # Input items are plain dicts, but accept SDK objects as well
+    if isinstance(item, dict):
+        return item.get(name)
+    return getattr(item, name, None)
+
+
+def _first_user_message(items):
+    for item in items:
+        if _field(item, "role") == "user":
+            content = _field(item, "content")
+            if isinstance(content, list):
+                content = "".join(_field(part, "text") or "" for part in content)
+            return content
+    return None
+
+
+def _tool_result(items, tool_name):
+    """Returns (called, output) for the most recent call to `tool_name` in the conversation."""
+    call_id = None
+    for item in items:
+        if _field(item, "type") == "function_call" and _field(item, "name") == tool_name:
+            call_id = _field(item, "call_id")
+    if call_id is None:
+        return False, None
+    for item in items:
+        if _field(item, "type") == "function_call_output" and _field(item, "call_id") == call_id:
+            return True, _field(item, "output")
+    return True, None
+
+
+def _load_json(text):
+    try:
+        return json.loads(text) if isinstance(text, str) else text
+    except (TypeError, ValueError):
+        return None
+
+
+def _error(message):
+    return [assistant_message(json.dumps({"error": message}))]
+
+
+class ScriptedRoutingModel(Model):
+    """
+    Deterministic Model that answers each turn the way the agent instructions prescribe.
+
+    Args:
+        latency_seconds: Simulated model latency added to every turn, e.g. to study
+            throughput under concurrency when model calls dominate.
+    """
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+
+    # --- Model interface ---
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, conversation_id=None, prompt=None):
+        turn = await self._turn(input, tools, handoffs)
+        return await turn.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+            previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, conversation_id=None, prompt=None):
+        turn = await self._turn(input, tools, handoffs)
+        async for event in turn.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+            previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt,
+        ):
+            yield event
+
+    async def _turn(self, input, tools, handoffs):
+        # A one-step ScriptedModel builds the SDK response (and stream events) for this turn
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        items = [{"role": "user", "content": input}] if isinstance(input, str) else list(input)
+        tool_names = {tool.name for tool in tools}
+        if handoffs and INTAKE_TOOL in tool_names:
+            output = self._intake_turn(items, handoffs[0].tool_name)
+        elif ROUTE_CANDIDATES_TOOL in tool_names:
+            output = self._routing_turn(items)
+        elif not tools and not handoffs:
+            output = self._explainer_turn(items)
+        else:
+            output = _error("Scripted model has no script for this agent.")
+        return ScriptedModel([output])
+
+    # --- OrderIntakeAgent ---
+    def _intake_turn(self, items, handoff_tool_name):
+        request = _load_json(_first_user_message(items))
+        if not isinstance(request, dict):
+            return _error("Invalid input JSON format.")
+        raw_order = request.get("raw_order")
+        reason = validate_raw_order(raw_order)
+        if reason is not None:
+            return _error(f"Validation failed: {reason}")
+
+        called, output = _tool_result(items, INTAKE_TOOL)
+        if not called:
+            return [function_call(INTAKE_TOOL, {"customer_id": raw_order["customer_id"]}, call_id=f"call_{len(items)}")]
+        customer = _load_json(output)
+        if not isinstance(customer, dict) or "error" in customer:
+            return [assistant_message(output if isinstance(customer, dict) else json.dumps({"error": "Customer lookup failed."}))]
+
+        payload = {
+            "processed_order": {
+                "product_id": raw_order["product_id"],
+                "quantity": raw_order["quantity"],
+                "customer_id": customer["customer_id"],
+                "customer_name": customer["name"],
+                "customer_zip_code": customer["zip_code"],
+                "customer_tier": customer["tier"],
+            },
+            "business_priority": request.get("business_priority"),
+        }
+        return [function_call(handoff_tool_name, payload, call_id=f"call_{len(items)}")]
+
+    # --- OrderRoutingDecisionAgent ---
+    def _routing_turn(self, items):
+        payload = self._routing_payload(items)
+        if not isinstance(payload, dict) or not isinstance(payload.get("processed_order"), dict):
+            return _error("Invalid input JSON format.")
+        order = payload["processed_order"]
+
+        called, output = _tool_result(items, ROUTE_CANDIDATES_TOOL)
+        if not called:
+            arguments = {
+                "product_id": order.get("product_id"),
+                "quantity": order.get("quantity"),
+                "zip_code": order.get("customer_zip_code"),
+            }
+            return [function_call(ROUTE_CANDIDATES_TOOL, arguments, call_id=f"call_{len(items)}")]
+
+        result = expand_route_candidates(_load_json(output))
+        if isinstance(result, dict) and result.get("error"):
+            # e.g. the tool ran past its time limit
+            return _error(result["error"])
+        if not isinstance(result, dict) or not result.get("zone") or result["zone"] == "UNKNOWN_ZONE":
+            return _error("Failed to determine a valid customer shipping zone.")
+        if not result.get("candidates"):
+            return _error("No stock available for the product at any location.")
+        routes = [
+            {
+                "fulfillment_location": candidate["fulfillment_location"],
+                "carrier": option["carrier"],
+                "cost": option["cost"],
+                "delivery_days": option["days"],
+                "co2_kg": option["co2_kg"],
+            }
+            for candidate in result["candidates"]
+            for option in candidate["shipping_options"]
+        ]
+        if not routes:
+            return _error("No shipping options available from stocked locations to the customer's zone.")
+
+        # Rank with the engine's weights; unknown priorities are treated as balanced
+        priority = payload.get("business_priority")
+        row = BUSINESS_PRIORITIES.index(priority if priority in BUSINESS_PRIORITIES else "BALANCED_COST_TIME")
+        metrics = np.array([[r["cost"] for r in routes], [r["delivery_days"] for r in routes], [r["co2_kg"] for r in routes]], dtype=float)
+        scores = RouteScoringEngine.score(metrics, order.get("customer_tier"))[row]
+        ranked = [routes[i] for i in np.argsort(scores, kind="stable")]
+        best = ranked[0]
+        answer = {
+            "recommendation": best,
+            "reasoning": f"Selected {best['fulfillment_location']} via {best['carrier']} under {priority} "
+                         f"(scripted model, {len(ranked)} option(s) considered).",
+            "alternatives_considered": ranked[1:],
+        }
+        return [assistant_message(json.dumps(answer))]
+
+    # --- ShipmentPlanExplainerAgent and RouteExplainerAgent ---
+    def _explainer_turn(self, items):
+        request = _load_json(_first_user_message(items))
+        if isinstance(request, dict) and isinstance(request.get("plan"), dict):
+            reasoning = describe_plan(request["plan"], request.get("business_priority"))
+        elif isinstance(request, dict) and isinstance(request.get("recommendation"), dict):
+            reasoning = self._describe_route(request)
+        else:
+            return _error("Invalid input JSON format.")
+        return [assistant_message(json.dumps({"reasoning": f"{reasoning} (scripted model)"}))]
+
+    @staticmethod
+    def _describe_route(request):
+        best, alternatives = request["recommendation"], request.get("alternatives_considered") or []
+        reasoning = (f"{best.get('fulfillment_location')} via {best.get('carrier')} best fits {request.get('business_priority')}: "
+                     f"cost {best.get('cost')}, {best.get('delivery_days')} day(s), {best.get('co2_kg')} kg CO2.")
+        if alternatives:
+            runner_up = alternatives[0]
+            reasoning += (f" The runner-up, {runner_up.get('fulfillment_location')} via {runner_up.get('carrier')}, costs "
+                          f"{runner_up.get('cost')} over {runner_up.get('delivery_days')} day(s) with {runner_up.get('co2_kg')} kg CO2.")
+        return reasoning
+
+    @staticmethod
+    def _routing_payload(items):
+        # After a handoff the payload is the transfer call's arguments; otherwise the user message
+        for item in reversed(items):
+            if _field(item, "type") == "function_call" and (_field(item, "name") or "").startswith("transfer_to_"):
+                return _load_json(_field(item, "arguments"))
+        return _load_json(_first_user_message(items))
+
+
+class ScriptedModelProvider(ModelProvider):
+    """Resolves every model name to one shared ScriptedRoutingModel."""
+
+    def __init__(self, latency_seconds=0.0):
+        self._model = ScriptedRoutingModel(latency_seconds)
+
+    def get_model(self, model_name):
+        return self._model
+
+
+def scripted_run_config(latency_seconds=0.0):
+    """Returns a RunConfig that runs the agents on the scripted model, with tracing off."""
+    return RunConfig(model_provider=ScriptedModelProvider(latency_seconds), tracing_disabled=True)
+
+
+if __name__ == '__main__':
+    from agentic_order_routing.main import main, INTAKE_MODE_AGENT
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+    order = {"product_id": "product_A", "quantity": 1, "customer_id": "cust123"}
+    result = asyncio.run(main(order, "PRIORITIZE_GOLD_TIER_SPEED", intake=INTAKE_MODE_AGENT, reserve=False, use_cache=False, run_config=scripted_run_config()))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,827 @@
+# Shared-memory inventory and shipping snapshot for the Agentic AI Order Routing POC.
+# A single uvicorn process keeps stock, reservations and lanes in module-level objects, so
+# running several workers would give each its own diverging copy of the inventory. This
+# module lays the stock and shipping data out as one memory-mapped columnar file (under
+# /dev/shm where available) that every worker maps and reads as NumPy views, without
+# copying or deserializing:
+#
+#   products           sorted product IDs (fixed-width bytes), found with a binary search
+#   stock_*            one row per (product, location) pair, grouped by product: location,
+#                      on-hand units and reserved units, plus a location-major order
+#   product_version    per-product stock version, stamped from the availability version when
+#                      the stock changes or reserved units return; counters hold the global
+#                      version and the availability version
+#   lane_*             shipping options grouped by (product, zone), sorted by location then
+#                      carrier: location, carrier and a (3 x n) cost/days/co2_kg matrix
+#   res_*              a fixed table of reservation slots (token, stock pair, quantity, expiry),
+#                      with each pair's live slots linked in creation order (res_prev/res_next
+#                      from the pair's newest slot in pair_newest)
+#
+# Reads take no lock. Every change to stock or reservations holds a process-wide lock
+# (a thread lock plus flock() on a side file), so reservations are atomic across all
+# workers and the last units of a product can only be reserved once. Reservation IDs
+# encode their slot, so any worker can commit or release a reservation made by another.
+# A stock change that leaves fewer units on hand than are reserved cancels the newest
+# reservations of that pair, as in InventoryService, walking the pair's list from its tail; a cancelled slot keeps its token with
+# the CANCELLED_EXPIRY marker until it is reused, so every worker can report the cancellation.
+# Expiry times use time.monotonic(), which is system-wide on Linux.
+#
+# The set of (product, location) pairs and the shipping lanes are fixed when the
+# snapshot is built; stock changes for pairs that are not in it need a rebuild.
+#
+#   python api_server.py --workers 4
+
+import fcntl
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+from agentic_order_routing.data_store import DATA_STORE_ENV, PAGE_MAX_ENTRIES, SHARED_SNAPSHOT_ENV, DelegatingDataStore, _number, open_data_store, page_limit
+from agentic_order_routing.inventory_service import CANCELLED_BY_STOCK_UPDATE, RESERVATION_TTL_SECONDS, Reservation
+
+logger = logging.getLogger("agent_workflow")
+
+MAGIC = b"ORSNAP02"
+# Reservations that can be live at once across all workers.
+RESERVATION_SLOTS = 65_536
+# res_expires of a free slot whose reservation was cancelled by a stock update
+CANCELLED_EXPIRY = -1.0
+_ALIGNMENT = 64
+_PAGE = 4096
+
+# Slots of the shared `counters` array
+VERSION, AVAILABILITY_VERSION, SLOT_CURSOR = 0, 1, 2
+
+
+def default_snapshot_path():
+    """A per-server file in shared memory (/dev/shm), or the temp directory where that is missing."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"order-routing-{os.getpid()}.snapshot")
+
+
+# --- Building ---
+def _align(offset, alignment=_ALIGNMENT):
+    return -(-offset // alignment) * alignment
+
+
+def _offsets(keys, count):
+    # CSR offsets: rows [offsets[k], offsets[k + 1]) hold key k, for sorted keys
+    return np.searchsorted(keys, np.arange(count + 1), side="left").astype(np.int64)
+
+
+def _column(values, dtype):
+    # Zero-copy NumPy view of an array.array column
+    return np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+
+
+def build_snapshot(store, path, reservation_slots=RESERVATION_SLOTS):
+    """
+    Writes the stock and shipping options of a data store as a snapshot file.
+
+    The file is written next to `path` and renamed into place, so workers never map a
+    partial file.
+
+    Args:
+        store: The DataStore to read (one full pass over its stock and shipping options).
+        path: The snapshot file to create, e.g. default_snapshot_path().
+        reservation_slots: Capacity of the shared reservation table.
+
+    Returns:
+        The snapshot header (array layout and dimension lists).
+    """
+    start = time.perf_counter()
+    locations, zones, carriers = store.locations(), store.zones(), store.carriers()
+    location_index = {loc: i for i, loc in enumerate(locations)}
+    zone_index = {zone: i for i, zone in enumerate(zones)}
+    carrier_index = {carrier: i for i, carrier in enumerate(carriers)}
+    product_code = {}  # product_id -> code in first-seen order, remapped to sorted rank below
+
+    stock_product, stock_location, stock_units = array("i"), array("i"), array("i")
+    for location_id, product_id, units in store.iter_stock():
+        stock_product.append(product_code.setdefault(product_id, len(product_code)))
+        stock_location.append(location_index[location_id])
+        stock_units.append(units)
+    lane_product, lane_zone, lane_location, lane_carrier = array("i"), array("i"), array("i"), array("i")
+    lane_cost, lane_days, lane_co2 = array("d"), array("d"), array("d")
+    for location_id, zone, product_id, carrier, cost, days, co2_kg in store.iter_shipping_options():
+        lane_product.append(product_code.setdefault(product_id, len(product_code)))
+        lane_zone.append(zone_index[zone])
+        lane_location.append(location_index[location_id])
+        lane_carrier.append(carrier_index[carrier])
+        lane_cost.append(cost)
+        lane_days.append(days)
+        lane_co2.append(co2_kg)
+
+    products = sorted(product_code)
+    rank = np.empty(len(products), dtype=np.int32)
+    for i, product_id in enumerate(products):
+        rank[product_code[product_id]] = i
+    width = max((len(product_id.encode()) for product_id in products), default=1)
+
+    # Stock pairs grouped by product, then location
+    s_product = rank[_column(stock_product, np.int32)]
+    s_location = _column(stock_location, np.int32)
+    order = np.lexsort((s_location, s_product))
+    s_product, s_location, s_units = s_product[order], s_location[order], _column(stock_units, np.int32)[order]
+    by_location = np.lexsort((s_product, s_location))
+
+    # Lanes grouped by (product, zone), then location and carrier
+    l_key = rank[_column(lane_product, np.int32)].astype(np.int64) * len(zones) + _column(lane_zone, np.int32)
+    l_location, l_carrier = _column(lane_location, np.int32), _column(lane_carrier, np.int32)
+    order = np.lexsort((l_carrier, l_location, l_key))
+    l_metrics = np.stack([_column(lane_cost, np.float64), _column(lane_days, np.float64), _column(lane_co2, np.float64)])[:, order]
+
+    arrays = {
+        "products": np.array([p.encode() for p in products], dtype=f"S{width}"),
+        "stock_offsets": _offsets(s_product, len(products)),
+        "stock_product": s_product,
+        "stock_location": s_location,
+        "on_hand": s_units,
+        "reserved": np.zeros(len(s_units), dtype=np.int32),
+        "location_order": by_location.astype(np.int64),
+        "location_offsets": _offsets(s_location[by_location], len(locations)),
+        "product_version": np.zeros(len(products), dtype=np.int64),
+        "counters": np.zeros(8, dtype=np.int64),
+        "next_expiry": np.full(1, math.inf),
+        "lane_offsets": _offsets(l_key[order], len(products) * len(zones)),
+        "lane_location": l_location[order],
+        "lane_carrier": l_carrier[order].astype(np.int16),
+        "lane_metrics": l_metrics,
+        "res_token": np.zeros(reservation_slots, dtype=np.uint64),
+        "res_pair": np.zeros(reservation_slots, dtype=np.int64),
+        "res_quantity": np.zeros(reservation_slots, dtype=np.int32),
+        "res_expires": np.zeros(reservation_slots, dtype=np.float64),
+        # Live slots of each pair as a doubly linked list, newest last; -1 ends a list
+        "pair_newest": np.full(len(s_units), -1, dtype=np.int32),
+        "res_prev": np.full(reservation_slots, -1, dtype=np.int32),
+        "res_next": np.full(reservation_slots, -1, dtype=np.int32),
+    }
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        offset += values.nbytes
+    header = {"locations": locations, "zones": zones, "carriers": carriers, "arrays": layout}
+    encoded = json.dumps(header).encode()
+    data_offset = _align(16 + len(encoded), _PAGE)
+
+    partial = f"{path}.{os.getpid()}.partial"
+    with open(partial, "wb") as f:
+        f.write(struct.pack("<8sQ", MAGIC, len(encoded)))
+        f.write(encoded)
+        for name, values in arrays.items():
+            f.seek(data_offset + layout[name]["offset"])
+            f.write(np.ascontiguousarray(values).data)
+        f.truncate(data_offset + offset)
+    os.replace(partial, path)
+    logger.info(
+        f"SHARED_SNAPSHOT: wrote {path} ({(data_offset + offset) / 2**20:.1f} MiB: {len(products)} products, "
+        f"{len(s_units)} stock pairs, {l_metrics.shape[1]} shipping options) in {time.perf_counter() - start:.2f} s"
+    )
+    return header
+
+
+def publish_snapshot(path=None, store=None):
+    """
+    Builds a snapshot for a multi-worker server and sets ORDER_ROUTING_SHARED_SNAPSHOT,
+    so worker processes started afterwards map it.
+
+    Args:
+        path: The snapshot file; defaults to default_snapshot_path().
+        store: The store to snapshot; defaults to the one ORDER_ROUTING_DATA_STORE selects.
+
+    Returns:
+        The snapshot path.
+    """
+    path = path or default_snapshot_path()
+    build_snapshot(store if store is not None else open_data_store(os.getenv(DATA_STORE_ENV)), path)
+    os.environ[SHARED_SNAPSHOT_ENV] = path
+    return path
+
+
+# --- Attaching ---
+class SharedSnapshot:
+    """
+    A snapshot file mapped into this process. Every array is a NumPy view of the shared
+    mapping, so writes by one process are seen by all others.
+
+    Args:
+        path: A file written by build_snapshot().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "r+b") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0)
+        magic, length = struct.unpack_from("<8sQ", self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an order-routing snapshot")
+        header = json.loads(self._mmap[16:16 + length])
+        data_offset = _align(16 + length, _PAGE)
+        self.locations = header["locations"]
+        self.zones = header["zones"]
+        self.carriers = header["carriers"]
+        self.location_index = {loc: i for i, loc in enumerate(self.locations)}
+        self.zone_index = {zone: i for i, zone in enumerate(self.zones)}
+        self.names = tuple(header["arrays"])
+        for name, spec in header["arrays"].items():
+            shape = tuple(spec["shape"])
+            count = math.prod(shape)
+            values = (np.frombuffer(self._mmap, dtype=spec["dtype"], count=count, offset=data_offset + spec["offset"])
+                      if count else np.empty(0, dtype=spec["dtype"]))
+            setattr(self, name, values.reshape(shape))
+        self._thread_lock = threading.Lock()
+        self._lock_fd = None
+        self._lock_pid = None
+
+    # --- Cross-process lock ---
+    @contextmanager
+    def locked(self):
+        """Holds the snapshot's write lock, shared by every thread of every process that maps it."""
+        with self._thread_lock:
+            if self._lock_pid != os.getpid():
+                # flock() locks belong to the open file, so a forked child needs its own
+                self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # --- Lookups ---
+    def product_row(self, product_id):
+        """Returns a product's row, or None if it is not in the snapshot."""
+        key = product_id.encode()
+        products = self.products
+        if len(key) > products.itemsize or not len(products):
+            return None
+        i = int(np.searchsorted(products, key))
+        return i if i < len(products) and products[i] == key else None
+
+    def product_id(self, row):
+        return self.products[row].decode()
+
+    def stock_slice(self, row):
+        """Returns the [start, end) stock pairs of a product row."""
+        return int(self.stock_offsets[row]), int(self.stock_offsets[row + 1])
+
+    def stock_pair(self, product_id, location_id):
+        """Returns the stock pair of a product at a location, or None if the location does not stock it."""
+        row = self.product_row(product_id)
+        l = self.location_index.get(location_id)
+        if row is None or l is None:
+            return None
+        start, end = self.stock_slice(row)
+        hit = np.flatnonzero(self.stock_location[start:end] == l)
+        return start + int(hit[0]) if hit.size else None
+
+    def lane_slice(self, row, z):
+        k = row * len(self.zones) + z
+        return int(self.lane_offsets[k]), int(self.lane_offsets[k + 1])
+
+    def nbytes(self):
+        return len(self._mmap)
+
+    def close(self):
+        for name in self.names:
+            delattr(self, name)
+        if self._lock_fd is not None and self._lock_pid == os.getpid():
+            os.close(self._lock_fd)
+        self._mmap.close()
+
+
+def remove_snapshot(path):
+    """Deletes a snapshot file and its lock file."""
+    for name in (path, path + ".lock"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+# --- Data store view ---
+class SharedSnapshotDataStore(DelegatingDataStore):
+    """
+    Serves stock and shipping lanes from a SharedSnapshot and every other call (CRM, ZIP
+    zones, weights, the other /contextual-data sections) from the wrapped store. Stock is
+    the snapshot's on-hand units; set_stock() only writes through to the wrapped store,
+    since SharedInventoryService changes the snapshot itself.
+    """
+
+    SERVED = frozenset(("stock_for_product", "stocked_products", "count_stocked_products", "shipping_options",
+                        "shipping_options_for_product", "product_lane_arrays", "locations", "zones", "carriers"))
+
+    def __init__(self, store, snapshot):
+        super().__init__(store)
+        self.in_memory = False  # Lanes are looked up in the snapshot, not indexed per process
+        self.snapshot = snapshot
+
+    def stock_for_product(self, product_id):
+        snap = self.snapshot
+        row = snap.product_row(product_id)
+        if row is None:
+            return {}
+        start, end = snap.stock_slice(row)
+        units = snap.on_hand[start:end]
+        held = units > 0
+        return dict(zip((snap.locations[l] for l in snap.stock_location[start:end][held].tolist()), units[held].tolist()))
+
+    def iter_stock(self):
+        snap = self.snapshot
+        pairs = snap.location_order[snap.on_hand[snap.location_order] > 0]
+        for location, product, units in zip(snap.stock_location[pairs].tolist(), snap.stock_product[pairs].tolist(), snap.on_hand[pairs].tolist()):
+            yield snap.locations[location], snap.product_id(product), units
+
+    def _stocked_rows(self):
+        snap = self.snapshot
+        return np.unique(snap.stock_product[snap.on_hand > 0])
+
+    def stocked_products(self, limit=None):
+        rows = self._stocked_rows()
+        return [self.snapshot.product_id(row) for row in (rows if limit is None else rows[:limit]).tolist()]
+
+    def count_stocked_products(self):
+        return int(self._stocked_rows().size)
+
+    def _lane_rows(self, product_id):
+        # Yields (zone index, start, end) for each zone with lanes for the product
+        snap = self.snapshot
+        row = snap.product_row(product_id)
+        if row is None:
+            return
+        for z in range(len(snap.zones)):
+            start, end = snap.lane_slice(row, z)
+            if end > start:
+                yield z, start, end
+
+    def shipping_options(self, location_id, zone, product_id):
+        snap = self.snapshot
+        row, z, l = snap.product_row(product_id), snap.zone_index.get(zone), snap.location_index.get(location_id)
+        if row is None or z is None or l is None:
+            return []
+        start, end = snap.lane_slice(row, z)
+        hits = start + np.flatnonzero(snap.lane_location[start:end] == l)
+        return [
+            (snap.carriers[carrier], _number(cost), int(days), _number(co2_kg))
+            for carrier, (cost, days, co2_kg) in zip(snap.lane_carrier[hits].tolist(), snap.lane_metrics[:, hits].T.tolist())
+        ]
+
+    def shipping_options_for_product(self, product_id):
+        snap = self.snapshot
+        options = []
+        for z, start, end in self._lane_rows(product_id):
+            zone = snap.zones[z]
+            options.extend(
+                (snap.locations[loc], zone, snap.carriers[carrier], _number(cost), int(days), _number(co2_kg))
+                for loc, carrier, (cost, days, co2_kg) in zip(
+                    snap.lane_location[start:end].tolist(), snap.lane_carrier[start:end].tolist(), snap.lane_metrics[:, start:end].T.tolist())
+            )
+        return options
+
+    def product_lane_arrays(self, product_id):
+        snap = self.snapshot
+        return {
+            z: (snap.lane_location[start:end], snap.lane_carrier[start:end], snap.lane_metrics[:, start:end])
+            for z, start, end in self._lane_rows(product_id)
+        }
+
+    def locations(self):
+        return list(self.snapshot.locations)
+
+    def zones(self):
+        return list(self.snapshot.zones)
+
+    def carriers(self):
+        return list(self.snapshot.carriers)
+
+    def _inventory_at(self, l):
+        snap = self.snapshot
+        pairs = snap.location_order[snap.location_offsets[l]:snap.location_offsets[l + 1]]
+        pairs = pairs[snap.on_hand[pairs] > 0]
+        return {snap.product_id(product): units for product, units in zip(snap.stock_product[pairs].tolist(), snap.on_hand[pairs].tolist())}
+
+    def count(self, section):
+        if section == "inventory":
+            return len(self.snapshot.locations)
+        return self.store.count(section)
+
+    def page(self, section, offset=0, limit=PAGE_MAX_ENTRIES, prefix=None):
+        if section != "inventory":
+            return self.store.page(section, offset, limit, prefix)
+        keys = [loc for loc in self.snapshot.locations if not prefix or loc.startswith(prefix)]
+        selected = keys[offset:offset + page_limit(limit)]
+        return len(keys), {loc: self._inventory_at(self.snapshot.location_index[loc]) for loc in selected}
+
+    def iter_section(self, section):
+        if section != "inventory":
+            return self.store.iter_section(section)
+        return ((loc, self._inventory_at(self.snapshot.location_index[loc])) for loc in self.snapshot.locations)
+
+    async def call_async(self, method, *args):
+        # Snapshot reads never wait on I/O, so they run inline
+        if method in self.SERVED:
+            return getattr(self, method)(*args)
+        return await self.store.call_async(method, *args)
+
+
+# --- Inventory service ---
+class SharedInventoryService:
+    """
+    InventoryService over a SharedSnapshot, with the same interface: every worker that
+    maps the snapshot sees the same on-hand stock, reservations and versions.
+
+    Reservations live in the snapshot's slot table (`shared`). Reads take no lock and may
+    miss a change made at the same moment; reserve() re-checks availability under the
+    lock, so a stale read can only be rejected, never oversold. Commits also write the
+    new on-hand units through to `store`.
+    """
+
+    def __init__(self, snapshot, store, reservation_ttl=RESERVATION_TTL_SECONDS, clock=time.monotonic):
+        self.shared = snapshot
+        self.store = store
+        self.reservation_ttl = reservation_ttl
+        self._clock = clock
+
+    @property
+    def version(self):
+        return int(self.shared.counters[VERSION])
+
+    @property
+    def availability_version(self):
+        return int(self.shared.counters[AVAILABILITY_VERSION])
+
+    # --- Reads ---
+    def locations(self):
+        return list(self.shared.locations)
+
+    def product_version(self, product_id):
+        """
+        Returns the version of a product's stock; it increases whenever the on-hand stock
+        changes or reserved units are returned, but not when units are reserved.
+        """
+        self._expire_due()
+        row = self.shared.product_row(product_id)
+        return 0 if row is None else int(self.shared.product_version[row])
+
+    def available_by_location(self, product_id):
+        """Returns {location_id: available units} for every location stocking the product."""
+        self._expire_due()
+        snap = self.shared
+        row = snap.product_row(product_id)
+        if row is None:
+            return {}
+        start, end = snap.stock_slice(row)
+        on_hand = snap.on_hand[start:end].copy()
+        available = np.maximum(on_hand - snap.reserved[start:end], 0)
+        held = on_hand > 0
+        return dict(zip((snap.locations[l] for l in snap.stock_location[start:end][held].tolist()), available[held].tolist()))
+
+    def find_available(self, product_id, quantity):
+        """Returns {location_id: available units} for locations that can cover `quantity`."""
+        return {loc: units for loc, units in self.available_by_location(product_id).items() if units >= quantity}
+
+    async def find_available_async(self, product_id, quantity):
+        # Shared-memory reads never block
+        return self.find_available(product_id, quantity)
+
+    def snapshot(self):
+        """Returns the available stock of every location as {location_id: {product_id: units}}."""
+        self._expire_due()
+        snap = self.shared
+        result = {location_id: {} for location_id in snap.locations}
+        pairs = snap.location_order[snap.on_hand[snap.location_order] > 0]
+        available = np.maximum(snap.on_hand[pairs] - snap.reserved[pairs], 0)
+        for location, product, units in zip(snap.stock_location[pairs].tolist(), snap.stock_product[pairs].tolist(), available.tolist()):
+            result[snap.locations[location]][snap.product_id(product)] = units
+        return result
+
+    def available_at(self, location_id, on_hand):
+        """Returns {product_id: available units} for one location's {product_id: on-hand units}."""
+        self._expire_due()
+        available = {}
+        for product_id, units in on_hand.items():
+            pair = self.shared.stock_pair(product_id, location_id)
+            available[product_id] = max(0, units - (int(self.shared.reserved[pair]) if pair is not None else 0))
+        return available
+
+    # --- Reservations ---
+    def reserve(self, product_id, location_id, quantity, ttl=None):
+        """
+        Atomically holds `quantity` units at a location, across all workers.
+
+        Returns:
+            The Reservation, or None if the location no longer has enough available stock.
+        """
+        if quantity <= 0:
+            return None
+        pair = self.shared.stock_pair(product_id, location_id)
+        with self.shared.locked():
+            now = self._clock()
+            self._expire_locked(now)
+            available = self._available_locked(pair)
+            if available < quantity:
+                logger.info(f"INVENTORY: reserve rejected for {quantity} x {product_id} at {location_id} (available={available})")
+                return None
+            reservation = self._hold_locked(pair, product_id, location_id, quantity, now + (self.reservation_ttl if ttl is None else ttl))
+            if reservation is not None:
+                self.shared.counters[AVAILABILITY_VERSION] += 1
+        if reservation is not None:
+            logger.info(f"INVENTORY: reserved {quantity} x {product_id} at {location_id} ({reservation.reservation_id})")
+        return reservation
+
+    def reserve_first(self, product_id, location_ids, quantity, ttl=None):
+        """Reserves at the first location in `location_ids` that can still cover the order."""
+        for location_id in location_ids:
+            reservation = self.reserve(product_id, location_id, quantity, ttl)
+            if reservation is not None:
+                return reservation
+        return None
+
+    def reserve_many(self, requests, ttl=None):
+        """
+        Holds stock for many (product_id, location_id, quantity) requests under one lock.
+        Requests are applied in order, each independently.
+
+        Returns:
+            A list with the Reservation for each request, or None where the location no
+            longer had enough available stock.
+        """
+        requests = [(product_id, location_id, quantity, self.shared.stock_pair(product_id, location_id))
+                    for product_id, location_id, quantity in requests]
+        results = []
+        with self.shared.locked():
+            now = self._clock()
+            self._expire_locked(now)
+            expires_at = now + (self.reservation_ttl if ttl is None else ttl)
+            for product_id, location_id, quantity, pair in requests:
+                if quantity <= 0 or self._available_locked(pair) < quantity:
+                    results.append(None)
+                    continue
+                results.append(self._hold_locked(pair, product_id, location_id, quantity, expires_at))
+            if any(reservation is not None for reservation in results):
+                self.shared.counters[AVAILABILITY_VERSION] += 1
+        rejected = sum(1 for reservation in results if reservation is None)
+        logger.info(f"INVENTORY: bulk reserved {len(results) - rejected} of {len(results)} request(s)")
+        return results
+
+    def commit(self, reservation_id):
+        """Converts a live reservation into a permanent stock decrement. Returns False if unknown or expired."""
+        snap = self.shared
+        with snap.locked():
+            self._expire_locked()
+            slot = self._live_slot(reservation_id)
+            if slot is None:
+                return False
+            pair = int(snap.res_pair[slot])
+            reservation = self._pop_reservation_locked(reservation_id)
+            remaining = max(0, int(snap.on_hand[pair]) - reservation.quantity)
+            snap.on_hand[pair] = remaining
+            snap.counters[VERSION] += 1
+            snap.counters[AVAILABILITY_VERSION] += 1
+            snap.product_version[snap.stock_product[pair]] = snap.counters[AVAILABILITY_VERSION]
+            self.store.set_stock(reservation.product_id, reservation.location_id, remaining)
+        logger.info(f"INVENTORY: committed reservation {reservation_id}")
+        return True
+
+    def release(self, reservation_id):
+        """Returns a live reservation's units to available stock. Returns False if unknown or expired."""
+        with self.shared.locked():
+            released = self._pop_reservation_locked(reservation_id) is not None
+        if released:
+            logger.info(f"INVENTORY: released reservation {reservation_id}")
+        return released
+
+    def cancellation_reason(self, reservation_id):
+        """Returns why a reservation was cancelled by the inventory, or None if it was not (or its slot was reused)."""
+        if not isinstance(reservation_id, str) or len(reservation_id) != 24:
+            return None
+        try:
+            token, slot = int(reservation_id[:16], 16), int(reservation_id[16:], 16)
+        except ValueError:
+            return None
+        snap = self.shared
+        if (slot < len(snap.res_quantity) and snap.res_quantity[slot] == 0 and int(snap.res_token[slot]) == token
+                and snap.res_expires[slot] == CANCELLED_EXPIRY):
+            return CANCELLED_BY_STOCK_UPDATE
+        return None
+
+    def apply_stock_changes(self, changes):
+        """
+        Applies a batch of on-hand stock changes under one hold of the snapshot lock, as
+        InventoryService.apply_stock_changes does, cancelling reservations that no longer
+        fit. Only pairs in the snapshot can change; stocking a product at a new location
+        needs a new snapshot.
+
+        Returns:
+            A list with None for each applied change, or the reason it was rejected.
+        """
+        snap = self.shared
+        pairs = [snap.stock_pair(product_id, location_id) for product_id, location_id, _, _ in changes]
+        results = [None] * len(changes)
+        written = {}  # pair -> (product_id, location_id, new on-hand units)
+        with snap.locked():
+            for i, ((product_id, location_id, delta, units), pair) in enumerate(zip(changes, pairs)):
+                if pair is None:
+                    results[i] = f"{product_id} at {location_id} is not in the shared snapshot."
+                    continue
+                units = max(0, int(snap.on_hand[pair]) + delta if delta is not None else units)
+                snap.on_hand[pair] = units
+                written[pair] = (product_id, location_id, units)
+                if snap.reserved[pair] > units:
+                    self._cancel_excess_locked(pair, units)
+            if written:
+                snap.counters[VERSION] += 1
+                snap.counters[AVAILABILITY_VERSION] += 1
+                snap.product_version[snap.stock_product[list(written)]] = snap.counters[AVAILABILITY_VERSION]
+                # Written under the lock, so the store sees every worker's writes in order
+                self.store.set_stock_many(list(written.values()))
+        return results
+
+    def get_reservation(self, reservation_id):
+        self._expire_due()
+        slot = self._live_slot(reservation_id)
+        return None if slot is None else self._reservation(slot, reservation_id)
+
+    # --- Internals ---
+    def _available_locked(self, pair):
+        if pair is None:
+            return 0
+        return int(self.shared.on_hand[pair]) - int(self.shared.reserved[pair])
+
+    def _cancel_excess_locked(self, pair, on_hand_units):
+        # Cancels the newest reservations of the pair, from the tail of its list, until the rest fit
+        snap = self.shared
+        slot = int(snap.pair_newest[pair])
+        while slot >= 0 and snap.reserved[pair] > on_hand_units:
+            older = int(snap.res_prev[slot])
+            self._unlink_locked(slot)
+            quantity = int(snap.res_quantity[slot])
+            snap.reserved[pair] -= quantity
+            snap.res_quantity[slot] = 0
+            snap.res_expires[slot] = CANCELLED_EXPIRY
+            snap.counters[AVAILABILITY_VERSION] += 1
+            snap.product_version[snap.stock_product[pair]] = snap.counters[AVAILABILITY_VERSION]
+            logger.warning(f"INVENTORY: cancelled reservation {int(snap.res_token[slot]):016x}{slot:08x} for {quantity} unit(s): "
+                           f"only {on_hand_units} unit(s) left on hand")
+            slot = older
+
+    def _hold_locked(self, pair, product_id, location_id, quantity, expires_at):
+        snap = self.shared
+        slot = self._free_slot_locked()
+        if slot is None:
+            logger.warning(f"INVENTORY: reservation table full ({len(snap.res_quantity)} slots), rejecting {quantity} x {product_id}")
+            return None
+        token = int.from_bytes(os.urandom(8), "little") | 1
+        snap.res_token[slot] = token
+        snap.res_pair[slot] = pair
+        snap.res_expires[slot] = expires_at
+        snap.res_quantity[slot] = quantity
+        snap.reserved[pair] += quantity
+        newest = snap.pair_newest[pair]
+        snap.res_prev[slot], snap.res_next[slot] = newest, -1
+        if newest >= 0:
+            snap.res_next[newest] = slot
+        snap.pair_newest[pair] = slot
+        snap.next_expiry[0] = min(snap.next_expiry[0], expires_at)
+        return Reservation(f"{token:016x}{slot:08x}", product_id, location_id, quantity, expires_at)
+
+    def _free_slot_locked(self):
+        snap = self.shared
+        cursor = int(snap.counters[SLOT_CURSOR]) % len(snap.res_quantity)
+        if snap.res_quantity[cursor] == 0:
+            snap.counters[SLOT_CURSOR] = cursor + 1
+            return cursor
+        for start in (cursor, 0):
+            free = np.flatnonzero(snap.res_quantity[start:] == 0)
+            if free.size:
+                slot = start + int(free[0])
+                snap.counters[SLOT_CURSOR] = slot + 1
+                return slot
+        return None
+
+    def _unlink_locked(self, slot):
+        # Takes a live slot out of its pair's list
+        snap = self.shared
+        prev, following = int(snap.res_prev[slot]), int(snap.res_next[slot])
+        if prev >= 0:
+            snap.res_next[prev] = following
+        if following >= 0:
+            snap.res_prev[following] = prev
+        else:
+            snap.pair_newest[snap.res_pair[slot]] = prev
+        snap.res_prev[slot] = snap.res_next[slot] = -1
+
+    def _live_slot(self, reservation_id):
+        # IDs are the slot's 64-bit token followed by the slot number, both in hex
+        if not isinstance(reservation_id, str) or len(reservation_id) != 24:
+            return None
+        try:
+            token, slot = int(reservation_id[:16], 16), int(reservation_id[16:], 16)
+        except ValueError:
+            return None
+        snap = self.shared
+        if slot >= len(snap.res_quantity) or snap.res_quantity[slot] <= 0 or int(snap.res_token[slot]) != token:
+            return None
+        return slot
+
+    def _reservation(self, slot, reservation_id):
+        snap = self.shared
+        pair = int(snap.res_pair[slot])
+        return Reservation(
+            reservation_id, snap.product_id(snap.stock_product[pair]), snap.locations[snap.stock_location[pair]],
+            int(snap.res_quantity[slot]), float(snap.res_expires[slot]),
+        )
+
+    def _pop_reservation_locked(self, reservation_id):
+        slot = self._live_slot(reservation_id)
+        if slot is None:
+            return None
+        snap = self.shared
+        reservation = self._reservation(slot, reservation_id)
+        self._unlink_locked(slot)
+        snap.reserved[snap.res_pair[slot]] -= snap.res_quantity[slot]
+        snap.res_quantity[slot] = 0
+        snap.res_token[slot] = 0
+        snap.counters[AVAILABILITY_VERSION] += 1
+        # The units are available again, so decisions made without them are stale
+        snap.product_version[snap.stock_product[snap.res_pair[slot]]] = snap.counters[AVAILABILITY_VERSION]
+        return reservation
+
+    def _expire_due(self):
+        # Lock-free check of the earliest expiry, so reads only lock when something expired
+        if self._clock() >= self.shared.next_expiry[0]:
+            with self.shared.locked():
+                self._expire_locked()
+
+    def _expire_locked(self, now=None):
+        snap = self.shared
+        now = self._clock() if now is None else now
+        if now < snap.next_expiry[0]:
+            return
+        live = snap.res_quantity > 0
+        expired = np.flatnonzero(live & (snap.res_expires <= now))
+        if expired.size:
+            for slot in expired.tolist():
+                self._unlink_locked(slot)
+            np.subtract.at(snap.reserved, snap.res_pair[expired], snap.res_quantity[expired])
+            snap.res_quantity[expired] = 0
+            snap.res_token[expired] = 0
+            snap.counters[AVAILABILITY_VERSION] += 1
+            snap.product_version[snap.stock_product[snap.res_pair[expired]]] = snap.counters[AVAILABILITY_VERSION]
+            logger.info(f"INVENTORY: {expired.size} reservation(s) expired")
+        remaining = snap.res_expires[snap.res_quantity > 0]
+        snap.next_expiry[0] = remaining.min() if remaining.size else math.inf
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def get_shared_snapshot():
+    """Returns the snapshot named by ORDER_ROUTING_SHARED_SNAPSHOT, mapped on first use, or None if it is unset."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None and os.getenv(SHARED_SNAPSHOT_ENV):
+            _snapshot = SharedSnapshot(os.environ[SHARED_SNAPSHOT_ENV])
+            logger.info(f"SHARED_SNAPSHOT: mapped {_snapshot.path} ({_snapshot.nbytes() / 2**20:.1f} MiB) in process {os.getpid()}")
+        return _snapshot
+
+
+if __name__ == '__main__':
+    import multiprocessing
+
+    from agentic_order_routing.data_store import mock_data_store
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+
+    def _reserve_all(path, product_id, location_id, attempts, results):
+        service = SharedInventoryService(SharedSnapshot(path), mock_data_store())
+        results.put(sum(service.reserve(product_id, location_id, 1) is not None for _ in range(attempts)))
+
+    path = default_snapshot_path()
+    build_snapshot(mock_data_store(), path)
+    try:
+        service = SharedInventoryService(SharedSnapshot(path), mock_data_store())
+        on_hand = service.available_by_location("product_A")["STORE_CENTRAL"]
+        # Four processes race for the same units; together they must get exactly on_hand of them
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_reserve_all, args=(path, "product_A", "STORE_CENTRAL", on_hand, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        reserved = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        print(f"product_A at STORE_CENTRAL: {on_hand} on hand, {reserved} reserved by 4 processes, "
+              f"{service.available_by_location('product_A')['STORE_CENTRAL']} left")
+    finally:
+        remove_snapshot(path)
@@ -0,0 +1,121 @@
+# Indexed view of the shipping options for the Agentic AI Order Routing POC.
+# The raw store is a nested dict of tuple lists that has to be scanned and filtered on
+# product_id for every lookup. This module pre-builds a (warehouse, zone, product) index
+# of compact slotted records so each lane is answered with a single dict lookup. For
+# stores that are not held in memory (see data_store.py) lanes are instead read on
+# demand and kept in a bounded LRU cache.
+
+import threading
+from collections import OrderedDict
+
+from agentic_order_routing.data_store import get_data_store
+
+# Lanes cached for stores that are not held in memory.
+LANE_CACHE_SIZE = 100_000
+
+
+class ShippingOption:
+    """A single carrier offer on one (warehouse, zone, product) lane."""
+
+    __slots__ = ("carrier", "cost", "days", "co2_kg")
+
+    def __init__(self, carrier, cost, days, co2_kg):
+        self.carrier = carrier
+        self.cost = cost
+        self.days = days
+        self.co2_kg = co2_kg
+
+    def to_dict(self):
+        return {"carrier": self.carrier, "cost": self.cost, "days": self.days, "co2_kg": self.co2_kg}
+
+    def __repr__(self):
+        return f"ShippingOption({self.carrier!r}, {self.cost!r}, {self.days!r}, {self.co2_kg!r})"
+
+
+class ShippingOptionIndex:
+    """
+    Maps (warehouse_id, zone, product_id) to an immutable tuple of ShippingOption records.
+    Lanes that do not exist resolve to an empty tuple. `version` identifies the shipping
+    data the index was built from and increases on every rebuild.
+
+    In-memory stores are indexed in full up front; other stores are queried per lane,
+    with at most `cache_size` lanes (including empty ones) kept.
+    """
+
+    _EMPTY = ()
+
+    def __init__(self, store, version=0, cache_size=LANE_CACHE_SIZE):
+        self.store = store
+        self.version = version
+        self.cache_size = cache_size
+        self._prebuilt = store.in_memory
+        self._lock = threading.Lock()
+        if self._prebuilt:
+            lanes = {}
+            for warehouse_id, zone, product_id, carrier, cost, days, co2_kg in store.iter_shipping_options():
+                lanes.setdefault((warehouse_id, zone, product_id), []).append(
+                    ShippingOption(carrier, cost, days, co2_kg)
+                )
+            self._lanes = {key: tuple(options) for key, options in lanes.items()}
+        else:
+            self._lanes = OrderedDict()
+        self._zones = frozenset(store.zones())
+
+    def get(self, warehouse_id, zone, product_id):
+        key = (warehouse_id, zone, product_id)
+        if self._prebuilt:
+            return self._lanes.get(key, self._EMPTY)
+        lane = self._cached(key)
+        if lane is None:
+            lane = self._remember(key, self.store.shipping_options(warehouse_id, zone, product_id))
+        return lane
+
+    async def get_async(self, warehouse_id, zone, product_id):
+        """Async get: a lane that is not cached is read with store.call_async, so many lanes can be fetched at once."""
+        key = (warehouse_id, zone, product_id)
+        if self._prebuilt:
+            return self._lanes.get(key, self._EMPTY)
+        lane = self._cached(key)
+        if lane is None:
+            lane = self._remember(key, await self.store.call_async("shipping_options", warehouse_id, zone, product_id))
+        return lane
+
+    def _cached(self, key):
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is not None:
+                self._lanes.move_to_end(key)
+            return lane
+
+    def _remember(self, key, options):
+        lane = tuple(ShippingOption(*option) for option in options)
+        with self._lock:
+            self._lanes[key] = lane
+            while len(self._lanes) > self.cache_size:
+                self._lanes.popitem(last=False)
+        return lane
+
+    def zones(self):
+        """Returns the set of zones served by at least one lane."""
+        return self._zones
+
+    def __len__(self):
+        """Number of lanes indexed (or currently cached, for stores that are not in memory)."""
+        return len(self._lanes)
+
+
+_index = None
+
+def get_shipping_index(rebuild=False):
+    """Returns the shared index over the data store's shipping options, building it on first use."""
+    global _index
+    if _index is None or rebuild:
+        _index = ShippingOptionIndex(get_data_store(), version=0 if _index is None else _index.version + 1)
+    return _index
+
+
+if __name__ == '__main__':
+    index = get_shipping_index()
+    print(f"{len(index)} lanes indexed")
+    print(index.get("WH_EAST", "ZONE_1", "product_A"))
+    print(index.get("WH_EAST", "ZONE_1", "product_C"))
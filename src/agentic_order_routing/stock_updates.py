@@ -0,0 +1,275 @@
+# Streaming stock-update ingestion for the Agentic AI Order Routing POC.
+# The warehouse management system reports stock deltas: receipts, picks, adjustments and
+# cycle counts. This module validates them and feeds them to the inventory service in
+# batches. StockUpdateIngestor queues the events of every caller and has one consumer
+# thread drain the queue. Whatever arrives within a few milliseconds (up to
+# STOCK_BATCH_SIZE events) becomes one apply_stock_changes() call. Each batch takes the
+# inventory lock once, updates the cached stock of the touched products in place, and
+# bumps the monotonically increasing inventory version once. Nothing is rebuilt, so
+# routing keeps reading fresh stock while thousands of updates per second arrive.
+# Cached decisions for the touched products are dropped through their product versions.
+#
+# Events are JSON objects:
+#   {"type": "receipt", "product_id": "product_A", "location_id": "WH_EAST", "delta": 25}
+#   {"type": "pick", "product_id": "product_A", "location_id": "WH_EAST", "delta": -2}
+#   {"type": "count", "product_id": "product_A", "location_id": "WH_EAST", "on_hand": 31}
+#
+#   python -m agentic_order_routing.stock_updates --updates 50000
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.metrics import get_routing_metrics
+
+logger = logging.getLogger("agent_workflow")
+
+# Receipts add stock and picks remove it (`delta`); adjustments may do either; counts set
+# the on-hand units (`on_hand`). Events without a type are adjustments or counts.
+STOCK_CHANGE_TYPES = ("receipt", "pick", "adjustment", "count")
+# Most events applied under one hold of the inventory lock.
+STOCK_BATCH_SIZE = 2000
+# How long the consumer waits for more events before applying a partial batch.
+STOCK_BATCH_WAIT_MS = 2.0
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_stock_change(event):
+    """
+    Validates a stock event and returns it as (product_id, location_id, delta, on_hand)
+    with exactly one of delta and on_hand set.
+
+    Raises:
+        ValueError: If the event is malformed; the message says why.
+    """
+    if not isinstance(event, dict):
+        raise ValueError("Stock event must be a JSON object.")
+    product_id, location_id = event.get("product_id"), event.get("location_id")
+    if not isinstance(product_id, str) or not product_id or not isinstance(location_id, str) or not location_id:
+        raise ValueError("Stock event needs product_id and location_id strings.")
+    change_type = event.get("type")
+    if change_type is not None and change_type not in STOCK_CHANGE_TYPES:
+        raise ValueError(f"Unknown stock event type '{change_type}'. Expected one of {list(STOCK_CHANGE_TYPES)}.")
+    delta, on_hand = event.get("delta"), event.get("on_hand")
+    if (delta is None) == (on_hand is None):
+        raise ValueError("Stock event needs exactly one of delta and on_hand.")
+    if on_hand is not None:
+        if not _is_int(on_hand) or on_hand < 0 or change_type not in (None, "count"):
+            raise ValueError("on_hand must be a non-negative integer, on count events only.")
+        return product_id, location_id, None, on_hand
+    if not _is_int(delta) or change_type == "count":
+        raise ValueError("delta must be an integer, on receipt, pick or adjustment events.")
+    if (change_type == "receipt" and delta <= 0) or (change_type == "pick" and delta >= 0):
+        raise ValueError(f"A {change_type} must {'add' if change_type == 'receipt' else 'remove'} stock.")
+    return product_id, location_id, delta, None
+
+
+class StockUpdateIngestor:
+    """
+    Batches stock events from any number of callers into apply_stock_changes() calls on
+    one consumer thread.
+
+    Args:
+        inventory: The inventory service (InventoryService or SharedInventoryService).
+        batch_size: Most events per apply.
+        batch_wait_ms: How long to wait for more events before applying a partial batch.
+    """
+
+    def __init__(self, inventory, batch_size=STOCK_BATCH_SIZE, batch_wait_ms=STOCK_BATCH_WAIT_MS):
+        self.inventory = inventory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.metrics = get_routing_metrics()
+        self._queue = queue.SimpleQueue()  # (changes, Future)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.received = 0
+        self.applied = 0
+        self.rejected = 0
+        self.batches = 0
+
+    # --- Submitting ---
+    def submit(self, events):
+        """
+        Validates `events` and queues the valid ones.
+
+        Returns:
+            A Future that resolves to the result dict once they are applied: received,
+            applied, rejected ([{"index", "error"}] for invalid or refused events) and
+            data_version (the inventory version after the batch).
+        """
+        changes, indexes, rejected = [], [], []
+        for i, event in enumerate(events):
+            try:
+                changes.append(parse_stock_change(event))
+                indexes.append(i)
+            except ValueError as e:
+                rejected.append({"index": i, "error": str(e)})
+        with self._lock:
+            self.received += len(events)
+            self.rejected += len(rejected)
+        if rejected:
+            self.metrics.stock_changes.inc("invalid", amount=len(rejected))
+        future = Future()
+        if not changes:
+            future.set_result(self._result(len(events), 0, rejected))
+            return future
+        outer = Future()
+        self._ensure_consumer()
+        self._queue.put((changes, future))
+
+        def finish(done):
+            if done.exception() is not None:
+                outer.set_exception(done.exception())
+                return
+            refused = [{"index": indexes[j], "error": error} for j, error in enumerate(done.result()) if error is not None]
+            outer.set_result(self._result(len(events), len(changes) - len(refused), sorted(rejected + refused, key=lambda r: r["index"])))
+
+        future.add_done_callback(finish)
+        return outer
+
+    async def submit_async(self, events):
+        """Awaitable submit(): waits for the events to be applied without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(events))
+
+    def apply(self, events):
+        """Submits `events` and waits until they are applied."""
+        return self.submit(events).result()
+
+    def _result(self, received, applied, rejected):
+        return {"received": received, "applied": applied, "rejected": rejected, "data_version": self.inventory.version}
+
+    # --- Consumer ---
+    def _ensure_consumer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._consume, name="stock-updates", daemon=True)
+                self._thread.start()
+
+    def _consume(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.batch_wait
+            # Coalesce whatever else arrives shortly after, up to one batch
+            while size < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self._apply(pending)
+
+    def _apply(self, pending):
+        changes = [change for item, _ in pending for change in item]
+        start = time.perf_counter()
+        try:
+            # A large submission is applied in several batches, so readers never wait for long
+            results = []
+            for i in range(0, len(changes), self.batch_size):
+                results.extend(self.inventory.apply_stock_changes(changes[i:i + self.batch_size]))
+        except Exception as e:
+            logger.error(f"STOCK_UPDATES: failed to apply {len(changes)} change(s): {e}", exc_info=True)
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        refused = sum(1 for error in results if error is not None)
+        with self._lock:
+            self.applied += len(changes) - refused
+            self.rejected += refused
+            self.batches += 1
+        self.metrics.stage_duration.observe("stock_update_batch", value=elapsed)
+        self.metrics.stock_changes.inc("applied", amount=len(changes) - refused)
+        if refused:
+            self.metrics.stock_changes.inc("refused", amount=refused)
+        logger.debug(f"STOCK_UPDATES: applied {len(changes) - refused} of {len(changes)} change(s) in {elapsed * 1000:.2f} ms")
+        offset = 0
+        for item, future in pending:
+            future.set_result(results[offset:offset + len(item)])
+            offset += len(item)
+
+    def stats(self):
+        with self._lock:
+            return {"received": self.received, "applied": self.applied, "rejected": self.rejected,
+                    "batches": self.batches, "data_version": self.inventory.version}
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+def get_stock_ingestor():
+    """Returns the process-wide ingestor over the inventory service."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = StockUpdateIngestor(get_inventory_service())
+        return _ingestor
+
+
+if __name__ == '__main__':
+    import argparse
+    import random
+
+    from agentic_order_routing.benchmark import summarize
+    from agentic_order_routing.routing_engine import get_routing_engine
+
+    parser = argparse.ArgumentParser(description="Stream random stock deltas into the inventory while routing reads it.")
+    parser.add_argument("--updates", type=int, default=50_000, help="Stock events to ingest.")
+    parser.add_argument("--senders", type=int, default=8, help="Threads submitting events.")
+    parser.add_argument("--chunk", type=int, default=50, help="Events per submit call.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+
+    inventory, engine = get_inventory_service(), get_routing_engine()
+    ingestor = get_stock_ingestor()
+    rng = random.Random(7)
+    pairs = [(product_id, location_id) for location_id, product_id, _ in inventory.store.iter_stock()]
+    events = [
+        {"type": "receipt", "product_id": p, "location_id": l, "delta": rng.randint(1, 5)} if rng.random() < 0.5
+        else {"type": "pick", "product_id": p, "location_id": l, "delta": -rng.randint(1, 5)}
+        for p, l in (rng.choice(pairs) for _ in range(args.updates))
+    ]
+    chunks = [events[i:i + args.chunk] for i in range(0, len(events), args.chunk)]
+
+    # Routing reads run alongside the ingestion; their latency shows whether updates stall them
+    read_ms, stop = [], threading.Event()
+    products = sorted({p for p, _ in pairs})
+    zone = engine.zones[0]
+
+    def reader():
+        while not stop.is_set():
+            t = time.perf_counter()
+            engine.recommend(rng.choice(products), 1, zone, "gold", "MINIMIZE_COST")
+            read_ms.append((time.perf_counter() - t) * 1000)
+
+    def sender(part):
+        for chunk in part:
+            ingestor.apply(chunk)
+
+    version = inventory.version
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    start = time.perf_counter()
+    senders = [threading.Thread(target=sender, args=(chunks[i::args.senders],)) for i in range(args.senders)]
+    for thread in senders:
+        thread.start()
+    for thread in senders:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+    stats = ingestor.stats()
+    print(f"{stats['applied']} updates in {elapsed:.2f} s ({stats['applied'] / elapsed:,.0f}/s) in {stats['batches']} batches, "
+          f"data version {version} -> {stats['data_version']}")
+    print(f"routing reads during ingestion: {summarize(read_ms)}")
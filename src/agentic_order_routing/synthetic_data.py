@@ -0,0 +1,202 @@
+# Seeded synthetic dataset generator for the Agentic AI Order Routing POC.
+# mock_data.py has a handful of customers, locations, products and ZIPs, which says
+# nothing about how lookups, /contextual-data or memory behave at production scale.
+# This module writes reproducible datasets of any size as SQLite catalogs (see
+# data_store.py), which are compact on disk, indexed, and usable directly by the API
+# through ORDER_ROUTING_DATA_STORE.
+#
+# The data is shaped like a real network. ZIPs fall into contiguous, distance-based zone
+# bands. Locations sit at points across the country. Customer ZIPs and product demand
+# are skewed. Shipping options are a dense (stocking location x zone x carrier) matrix
+# per SKU, priced from distance and product weight. The mock data is always included,
+# so SC01-SC09 keep working on a generated catalog.
+#
+#   python -m agentic_order_routing.synthetic_data catalog.db --scale medium
+
+import logging
+import math
+import random
+import time
+
+from agentic_order_routing.data_store import SQLiteDataStore, mock_data_store
+
+logger = logging.getLogger("agent_workflow")
+
+# Dataset sizes. Shipping rows = skus x locations_per_sku x zones x carriers.
+SCALES = {
+    "small": {"customers": 10_000, "locations": 50, "skus": 2_000, "zips": 5_000, "zones": 8, "locations_per_sku": 5},
+    "medium": {"customers": 100_000, "locations": 200, "skus": 20_000, "zips": 20_000, "zones": 8, "locations_per_sku": 8},
+    "large": {"customers": 1_000_000, "locations": 500, "skus": 100_000, "zips": 40_000, "zones": 8, "locations_per_sku": 8},
+}
+
+# (carrier, fixed cost, cost per kg per unit distance, speed factor, kg CO2 per kg per unit distance)
+CARRIERS = (
+    ("Ground_Std", 4.0, 3.0, 1.0, 0.12),
+    ("Air_Exp", 9.0, 7.5, 0.3, 0.45),
+)
+TIERS = (("gold", 0.1), ("silver", 0.3), ("bronze", 0.6))
+
+
+def customer_id(i):
+    return f"CUST_{i:07d}"
+
+
+def sku_id(i):
+    return f"SKU_{i:06d}"
+
+
+def location_id(i):
+    # One in five locations is a store, the rest are warehouses
+    return f"STORE_{i:04d}" if i % 5 == 4 else f"WH_{i:04d}"
+
+
+def zone_name(z):
+    return f"ZONE_{z + 1}"
+
+
+class SyntheticDataset:
+    """
+    Reproducible row generators for one dataset; the same spec and seed always give the
+    same rows. Args match the SCALES entries.
+    """
+
+    def __init__(self, customers, locations, skus, zips, zones=8, locations_per_sku=8, seed=7):
+        self.spec = {
+            "customers": customers, "locations": locations, "skus": skus, "zips": zips,
+            "zones": zones, "locations_per_sku": min(locations_per_sku, locations), "seed": seed,
+        }
+        self.seed = seed
+        rng = random.Random(seed)
+        self.mock = mock_data_store()
+        # ZIPs spread over the 5-digit space; zones are contiguous bands of ZIP space
+        # (a stand-in for distance from the center of the network)
+        taken = set(self.mock.zip_to_zone_db)
+        self.zip_codes = sorted(z for z in (f"{n:05d}" for n in rng.sample(range(1_000, 100_000), zips + len(taken))) if z not in taken)[:zips]
+        self.zone_count = zones
+        # Location positions and zone centers on [0, 1)
+        self.location_ids = [location_id(i) for i in range(locations)]
+        self.location_pos = [rng.random() for _ in range(locations)]
+        self.zone_center = [(z + 0.5) / zones for z in range(zones)]
+        self.weights = [round(min(40.0, rng.lognormvariate(0.5, 0.9)), 2) for _ in range(skus)]
+
+    def zone_of(self, zip_code):
+        return zone_name(min(self.zone_count - 1, int(zip_code) * self.zone_count // 100_000))
+
+    # --- Row generators (shapes as in SQLiteDataStore.build) ---
+    def customer_rows(self):
+        rng = random.Random(self.seed + 1)
+        yield from ((cid, c.get("name", "N/A"), c.get("zip_code"), c.get("tier")) for cid, c in self.mock.crm_db.items())
+        # Skewed population: a few ZIPs hold many customers
+        cum_weights = list(_cumulative(1.0 / (rank + 10) for rank in range(len(self.zip_codes))))
+        zips = self.zip_codes[:]
+        rng.shuffle(zips)
+        tiers, tier_weights = zip(*TIERS)
+        for i in range(self.spec["customers"]):
+            yield customer_id(i), f"Customer {i}", rng.choices(zips, cum_weights=cum_weights)[0], rng.choices(tiers, tier_weights)[0]
+
+    def zip_rows(self):
+        yield from self.mock.zip_to_zone_db.items()
+        yield from ((zip_code, self.zone_of(zip_code)) for zip_code in self.zip_codes)
+
+    def zip_range_rows(self):
+        # One range per zone band; the exact ZIPs above all agree with them except the mock ones
+        # (band z holds the ZIPs n with n * bands // 100_000 == z, as in zone_of)
+        bands = self.zone_count
+        starts = [-(-z * 100_000 // bands) for z in range(bands + 1)]
+        for z in range(bands):
+            yield starts[z], starts[z + 1] - 1, zone_name(z)
+
+    def _stocking_locations(self, s):
+        # Seeded per SKU, so inventory_rows and shipping_rows agree without sharing state
+        rng = random.Random(self.seed * 1_000_003 + s)
+        return rng.sample(range(self.spec["locations"]), self.spec["locations_per_sku"])
+
+    def inventory_rows(self):
+        rng = random.Random(self.seed + 2)
+        yield from ((product_id, location_id, units) for location_id, product_id, units in self.mock.iter_stock())
+        for s in range(self.spec["skus"]):
+            # Popular SKUs are stocked deeper
+            depth = 400 / (1 + s * 50 / self.spec["skus"])
+            for l in self._stocking_locations(s):
+                units = int(rng.expovariate(1 / depth))
+                if units > 0:
+                    yield sku_id(s), self.location_ids[l], units
+
+    def shipping_rows(self):
+        yield from self.mock.iter_shipping_options()
+        zones = range(self.zone_count)
+        for s in range(self.spec["skus"]):
+            product_id, weight = sku_id(s), self.weights[s]
+            for l in self._stocking_locations(s):
+                pos = self.location_pos[l]
+                for z in zones:
+                    distance = abs(pos - self.zone_center[z]) + 0.05
+                    for carrier, fixed, per_kg, speed, co2_per_kg in CARRIERS:
+                        yield (self.location_ids[l], zone_name(z), product_id, carrier,
+                               round(fixed + per_kg * distance * math.sqrt(weight), 2),
+                               max(1, round(1 + 6 * distance * speed)),
+                               round(co2_per_kg * distance * weight, 3))
+
+    def weight_rows(self):
+        yield from self.mock.product_weight_db.items()
+        yield from ((sku_id(s), weight) for s, weight in enumerate(self.weights))
+
+    def write(self, path):
+        """Writes the dataset as an SQLite catalog at `path` and returns a store over it."""
+        start = time.perf_counter()
+        store = SQLiteDataStore.build(
+            path,
+            customers=self.customer_rows(),
+            zip_zones=self.zip_rows(),
+            inventory=self.inventory_rows(),
+            shipping_options=self.shipping_rows(),
+            product_weights=self.weight_rows(),
+            zip_zone_ranges=self.zip_range_rows(),
+            info={**self.spec, "generator": "synthetic_data"},
+        )
+        logger.info(f"SYNTHETIC_DATA: wrote {path} in {time.perf_counter() - start:.1f} s ({self.spec})")
+        return store
+
+
+def _cumulative(values):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+def generate_dataset(path, scale="small", seed=7, **overrides):
+    """
+    Writes a catalog for one of SCALES (with any field overridden) and returns its store.
+
+    Args:
+        path: The SQLite file to create. Rows are added to it if it already exists.
+        scale: A SCALES key.
+        seed: Seed for every random choice.
+    """
+    return SyntheticDataset(**{**SCALES[scale], **overrides}, seed=seed).write(path)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic routing catalog (SQLite).")
+    parser.add_argument("path", help="Catalog file to create.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=7)
+    for field in SCALES["small"]:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, help=f"Override the scale's {field}.")
+    parser.add_argument("--force", action="store_true", help="Replace an existing file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f"{args.path} exists; pass --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+    overrides = {field: getattr(args, field) for field in SCALES["small"] if getattr(args, field) is not None}
+    store = generate_dataset(args.path, args.scale, args.seed, **overrides)
+    print(f"{args.path}: {os.path.getsize(args.path) / 2**20:.1f} MiB, {store.info()}")
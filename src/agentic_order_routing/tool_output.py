@@ -0,0 +1,293 @@
+# Pruned, compact tool outputs for the Agentic AI Order Routing POC.
+# get_route_candidates and get_shipping_options return every shipping option as a
+# verbose JSON object per option. Every one of those tokens is read by the routing
+# agent, including options that another option beats on cost, days and co2_kg at once.
+# This module shrinks those outputs before they reach the model, in one of three modes:
+#   "verbose"  the original JSON, every option (default).
+#   "pruned"   the same JSON shape without the strictly dominated options. When the
+#              order's priority is known, the remaining options are ranked best first
+#              and cut to the best PRUNED_OPTION_LIMIT.
+#   "compact"  pruned, then written as columns ({"carrier": [...], "cost": [...]})
+#              with no whitespace, so keys are not repeated once per option.
+# Pruning never changes the recommendation. The best option under any priority is never
+# dominated. The option with the highest value on each metric is always kept as well,
+# so the min-max normalization in RouteScoringEngine.score, and the ranking of the kept
+# options, is the same as on the full list.
+#
+# Every call is measured against the verbose encoding. The per-call savings are
+# collected in the run context, and main.py reports them per request.
+
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from agentic_order_routing.metrics import get_routing_metrics
+from agentic_order_routing.routing_engine import BUSINESS_PRIORITIES, RouteScoringEngine
+
+logger = logging.getLogger("agent_workflow")
+
+TOOL_OUTPUT_ENV = "ORDER_ROUTING_TOOL_OUTPUT"
+OUTPUT_VERBOSE = "verbose"
+OUTPUT_PRUNED = "pruned"
+OUTPUT_COMPACT = "compact"
+TOOL_OUTPUT_MODES = (OUTPUT_VERBOSE, OUTPUT_PRUNED, OUTPUT_COMPACT)
+
+# Options kept per call once they can be ranked for the order's priority and tier.
+PRUNED_OPTION_LIMIT = 5
+
+OPTION_FIELDS = ("carrier", "cost", "days", "co2_kg")
+COMPACT_SEPARATORS = (",", ":")
+
+
+# --- Token estimate ---
+# Words, runs of up to three digits and single punctuation marks, which is close to
+# what BPE tokenizers produce for JSON. Only used to compare encodings.
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(text):
+    """Returns an approximate model token count for `text`."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+# --- Pruning ---
+def pareto_mask(metrics):
+    """
+    Returns a boolean mask of the options that no other option strictly dominates.
+
+    Args:
+        metrics: An (n x 3) array of cost, days and co2_kg per option.
+    """
+    if len(metrics) < 2:
+        return np.ones(len(metrics), dtype=bool)
+    # dominates[i, j]: option i is no worse than j on every metric and better on one
+    no_worse = (metrics[:, None, :] <= metrics[None, :, :]).all(axis=2)
+    better = (metrics[:, None, :] < metrics[None, :, :]).any(axis=2)
+    return ~(no_worse & better).any(axis=0)
+
+
+def select_options(metrics, business_priority=None, customer_tier=None, limit=PRUNED_OPTION_LIMIT):
+    """
+    Picks the options to show the routing agent.
+
+    Args:
+        metrics: An (n x 3) array of cost, days and co2_kg per option.
+        business_priority: The order's priority, if known; the options are then ranked
+            best first (as RouteScoringEngine would rank them) and cut to `limit`.
+        customer_tier: The customer's tier, for the gold-tier modifier.
+
+    Returns:
+        Indices of the kept options, in the order they should be listed.
+    """
+    n = len(metrics)
+    if n == 0:
+        return []
+    keep = pareto_mask(metrics)
+    # The per-metric maxima hold the normalization in place (see the header)
+    anchors = {int(np.argmax(metrics[:, k])) for k in range(metrics.shape[1])}
+    if business_priority in BUSINESS_PRIORITIES:
+        scores = RouteScoringEngine.score(metrics.T, customer_tier)[BUSINESS_PRIORITIES.index(business_priority)]
+        ranking = np.argsort(scores, kind="stable").tolist()
+        selected = set([i for i in ranking if keep[i]][:limit])
+    else:
+        ranking = range(n)
+        selected = set(np.flatnonzero(keep).tolist())
+    selected |= anchors
+    return [i for i in ranking if i in selected]
+
+
+def _metrics(options):
+    return np.array([[option["cost"], option["days"], option["co2_kg"]] for option in options], dtype=float).reshape(-1, 3)
+
+
+def _order_context(context):
+    # (business_priority, customer_tier) of the order being routed, when the run context has it
+    payload = context.get("routing_payload") if isinstance(context, dict) else None
+    order = getattr(payload, "processed_order", None)
+    if order is None:
+        return None, None
+    return getattr(payload, "business_priority", None), getattr(order, "customer_tier", None)
+
+
+# --- Encodings ---
+def encode_route_candidates(zone, candidates, mode, business_priority=None, customer_tier=None):
+    """
+    Encodes the get_route_candidates result.
+
+    Args:
+        zone: The customer's shipping zone.
+        candidates: (location_id, stock, [option dict, ...]) per stocked location.
+        mode: One of TOOL_OUTPUT_MODES.
+
+    Returns:
+        (text, pruned option count).
+    """
+    if mode == OUTPUT_VERBOSE:
+        return json.dumps({"zone": zone, "candidates": _verbose_candidates(candidates)}), 0
+    rows = [(location_id, option) for location_id, _, options in candidates for option in options]
+    order = select_options(_metrics([option for _, option in rows]), business_priority, customer_tier)
+    pruned = len(rows) - len(order)
+    if mode == OUTPUT_COMPACT:
+        kept = [rows[i] for i in order]
+        result = {"zone": zone, "stock": {location_id: stock for location_id, stock, _ in candidates}}
+        if kept:
+            result["options"] = {
+                "location": [location_id for location_id, _ in kept],
+                **{field: [option[field] for _, option in kept] for field in OPTION_FIELDS},
+            }
+        if pruned:
+            result["pruned"] = pruned
+        return json.dumps(result, separators=COMPACT_SEPARATORS), pruned
+    # Same shape as verbose; locations left without options are dropped unless none has any
+    kept = {}
+    for i in order:
+        location_id, option = rows[i]
+        kept.setdefault(location_id, []).append(option)
+    stock = {location_id: stock for location_id, stock, _ in candidates}
+    pruned_candidates = [(location_id, stock[location_id], options) for location_id, options in kept.items()] if rows else candidates
+    result = {"zone": zone, "candidates": _verbose_candidates(pruned_candidates)}
+    if pruned:
+        result["pruned_options"] = pruned
+    return json.dumps(result), pruned
+
+
+def _verbose_candidates(candidates):
+    return [
+        {"fulfillment_location": location_id, "stock": stock, "shipping_options": options}
+        for location_id, stock, options in candidates
+    ]
+
+
+def encode_shipping_options(options, mode, business_priority=None, customer_tier=None):
+    """Encodes the get_shipping_options result (a list of option dicts); returns (text, pruned option count)."""
+    if mode == OUTPUT_VERBOSE:
+        return json.dumps(options), 0
+    order = select_options(_metrics(options), business_priority, customer_tier)
+    kept = [options[i] for i in order]
+    if mode == OUTPUT_COMPACT:
+        result = {field: [option[field] for option in kept] for field in OPTION_FIELDS} if kept else {}
+        if len(kept) < len(options):
+            result["pruned"] = len(options) - len(kept)
+        return json.dumps(result, separators=COMPACT_SEPARATORS), len(options) - len(kept)
+    return json.dumps(kept), len(options) - len(kept)
+
+
+def encode_inventory(available, mode, business_priority=None, customer_tier=None):
+    """Encodes the get_inventory result ({location_id: units}); returns (text, 0). Only whitespace is dropped."""
+    return json.dumps(available, separators=COMPACT_SEPARATORS if mode == OUTPUT_COMPACT else None), 0
+
+
+def expand_route_candidates(result):
+    """
+    Returns a get_route_candidates result in the verbose shape ({"zone", "candidates"}),
+    whichever encoding it was written in, or `result` unchanged if it is not one.
+    """
+    if not isinstance(result, dict) or not isinstance(result.get("stock"), dict):
+        return result
+    columns = result.get("options") or {}
+    stock = result["stock"]
+    by_location = {location_id: [] for location_id in stock}
+    for i, location_id in enumerate(columns.get("location", [])):
+        by_location.setdefault(location_id, []).append({field: columns[field][i] for field in OPTION_FIELDS})
+    return {"zone": result.get("zone"), "candidates": _verbose_candidates(
+        [(location_id, stock.get(location_id), options) for location_id, options in by_location.items()])}
+
+
+# --- Mode and reporting ---
+_mode = None
+_mode_lock = threading.Lock()
+
+def get_tool_output_mode():
+    """Returns the process-wide tool output mode, read from ORDER_ROUTING_TOOL_OUTPUT on first use."""
+    global _mode
+    with _mode_lock:
+        if _mode is None:
+            _mode = os.getenv(TOOL_OUTPUT_ENV, OUTPUT_VERBOSE).strip().lower()
+            if _mode not in TOOL_OUTPUT_MODES:
+                logger.warning(f"TOOL_OUTPUT: unknown {TOOL_OUTPUT_ENV}='{_mode}', using '{OUTPUT_VERBOSE}'")
+                _mode = OUTPUT_VERBOSE
+        return _mode
+
+
+def set_tool_output_mode(mode):
+    """Switches the tool output mode for the whole process."""
+    global _mode
+    if mode not in TOOL_OUTPUT_MODES:
+        raise ValueError(f"Unknown tool output mode '{mode}'. Expected one of {list(TOOL_OUTPUT_MODES)}.")
+    with _mode_lock:
+        _mode = mode
+
+
+def render_tool_output(context, tool, encode, *args):
+    """
+    Encodes one tool result in the current mode and records its size against the
+    verbose encoding.
+
+    Args:
+        context: The run context (a dict, or None outside an agent run). Supplies the
+            order's priority and tier, and collects the per-call reports.
+        tool: The tool name, for metrics.
+        encode: encode_route_candidates, encode_shipping_options or encode_inventory.
+        *args: The result to encode, as encode() takes it.
+
+    Returns:
+        The text to hand to the model.
+    """
+    mode = get_tool_output_mode()
+    business_priority, customer_tier = _order_context(context)
+    text, pruned = encode(*args, mode, business_priority, customer_tier)
+    tokens = estimate_tokens(text)
+    verbose_tokens = tokens if mode == OUTPUT_VERBOSE else estimate_tokens(encode(*args, OUTPUT_VERBOSE)[0])
+    metrics = get_routing_metrics()
+    metrics.tool_output_tokens.inc(tool, mode, amount=tokens)
+    metrics.tool_output_saved_tokens.inc(tool, amount=max(0, verbose_tokens - tokens))
+    if isinstance(context, dict):
+        context.setdefault("tool_outputs", []).append(
+            {"tool": tool, "tokens": tokens, "verbose_tokens": verbose_tokens, "pruned_options": pruned})
+    return text
+
+
+def summarize_tool_outputs(reports):
+    """Totals the per-call reports of one run, or returns None if no tool output was recorded."""
+    if not reports:
+        return None
+    tokens = sum(report["tokens"] for report in reports)
+    verbose_tokens = sum(report["verbose_tokens"] for report in reports)
+    return {
+        "mode": get_tool_output_mode(),
+        "calls": len(reports),
+        "tokens": tokens,
+        "verbose_tokens": verbose_tokens,
+        "saved_tokens": verbose_tokens - tokens,
+        "pruned_options": sum(report["pruned_options"] for report in reports),
+    }
+
+
+if __name__ == '__main__':
+    import asyncio
+
+    from agentic_order_routing import tool_output  # the module the tools use, not this __main__ copy
+    from agentic_order_routing.main import INTAKE_MODE_DETERMINISTIC, ROUTING_MODE_AGENT, TEST_SCENARIOS, main
+    from agentic_order_routing.scripted_model import scripted_run_config
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    async def run_scenarios():
+        # Replays the scenarios on the scripted model in every mode and checks the recommendations agree
+        picks = {}
+        for mode in TOOL_OUTPUT_MODES:
+            tool_output.set_tool_output_mode(mode)
+            for scenario in TEST_SCENARIOS:
+                decision = await main(scenario["raw_order"], scenario["priority"], mode=ROUTING_MODE_AGENT, reserve=False, use_cache=False,
+                                      intake=INTAKE_MODE_DETERMINISTIC, run_config=scripted_run_config())
+                report = decision.get("tool_output") or {}
+                picks.setdefault(scenario["name"], []).append(decision.get("recommendation") or decision.get("error"))
+                print(f"{mode:<8} {scenario['name']:<52} tokens {report.get('tokens', '-'):>4} / verbose {report.get('verbose_tokens', '-'):>4}, "
+                      f"pruned {report.get('pruned_options', '-')}")
+        changed = [name for name, results in picks.items() if any(result != results[0] for result in results)]
+        print(f"\nRecommendations changed by pruning: {changed or 'none'}")
+
+    asyncio.run(run_scenarios())
@@ -3,55 +3,75 @@
 
 import json
 import logging
-from agentic_order_routing.mock_data import MOCK_CRM_DB # Importing the customer database
-from agents import function_tool
+from agentic_order_routing.data_store import get_data_store
+from agentic_order_routing.mock_data import MOCK_CRM_DB # Used by the tests below; lookups go through the data store
+from agentic_order_routing.tools.routing_tools import timed_tool
 
 logger = logging.getLogger("agent_workflow")
 
-@function_tool
-def get_customer_details_tool(customer_id: str) -> str:
+def lookup_customer_details(customer_id: str) -> dict:
     """
-    Fetches customer details from the MOCK_CRM_DB based on customer_id.
-    This tool is designed to be used by an AI agent (e.g., OrderIntakeAgent).
-
-    Args:
-        customer_id: The ID of the customer.
+    Plain (non-tool) CRM lookup shared by get_customer_details_tool and the
+    deterministic routing path in main.py.
 
     Returns:
-        A JSON string containing customer details (name, zip_code, tier) if found.
-        Returns a JSON string with an error message if the customer is not found
-        or if crucial data like zip_code is missing.
+        A dict with customer details (customer_id, name, zip_code, tier), or a dict
+        with a single "error" key carrying the same message the tool reports.
     """
-    logger.info(f"TOOL_CALL: get_customer_details_tool invoked with customer_id='{customer_id}'")
-
     if not customer_id or not isinstance(customer_id, str):
         error_msg = {"error": "Invalid customer_id format. Must be a non-empty string."}
         logger.warning(f"Validation error in get_customer_details_tool: {error_msg['error']}")
-        return json.dumps(error_msg)
+        return error_msg
 
-    customer_data = MOCK_CRM_DB.get(customer_id)
+    return _customer_details(customer_id, get_data_store().get_customer(customer_id))
+
+async def lookup_customer_details_async(customer_id: str) -> dict:
+    """Async form of lookup_customer_details; the CRM read is awaited (see DataStore.call_async)."""
+    if not customer_id or not isinstance(customer_id, str):
+        return lookup_customer_details(customer_id)
+    return _customer_details(customer_id, await get_data_store().call_async("get_customer", customer_id))
+
+def _customer_details(customer_id, customer_data):
     if not customer_data:
         error_msg = {"error": f"Customer ID '{customer_id}' not found in CRM."}
         logger.warning(f"CRM lookup error in get_customer_details_tool: {error_msg['error']}")
-        return json.dumps(error_msg)
+        return error_msg
 
     # Ensure essential data for routing is present
     zip_code = customer_data.get("zip_code")
     if not zip_code:
         error_msg = {"error": f"Customer ID '{customer_id}' found, but essential zip_code is missing from CRM data."}
         logger.warning(f"Data integrity error in get_customer_details_tool: {error_msg['error']}")
-        return json.dumps(error_msg)
+        return error_msg
 
     # Prepare successful data structure
-    customer_details_for_agent = {
+    return {
         "customer_id": customer_id,
         "name": customer_data.get("name", "N/A"),
         "zip_code": zip_code, # Already validated to exist
         "tier": customer_data.get("tier", "standard") # Default tier if not specified
     }
-    
+
+@timed_tool("get_customer_details_tool")
+async def get_customer_details_tool(customer_id: str) -> str:
+    """
+    Fetches customer details from the CRM data store based on customer_id.
+    This tool is designed to be used by an AI agent (e.g., OrderIntakeAgent).
+
+    Args:
+        customer_id: The ID of the customer.
+
+    Returns:
+        A JSON string containing customer details (name, zip_code, tier) if found.
+        Returns a JSON string with an error message if the customer is not found
+        or if crucial data like zip_code is missing.
+    """
+    logger.info(f"TOOL_CALL: get_customer_details_tool invoked with customer_id='{customer_id}'")
+
+    customer_details_for_agent = await lookup_customer_details_async(customer_id)
     result_json = json.dumps(customer_details_for_agent)
-    logger.info(f"TOOL_RESULT: get_customer_details_tool returning: {result_json}")
+    if "error" not in customer_details_for_agent:
+        logger.info(f"TOOL_RESULT: get_customer_details_tool returning: {result_json}")
     return result_json
 
 # --- Main block for testing the tool directly ---
@@ -1,38 +1,83 @@
 # This file defines the Python functions that act as "tools" for the OrderRoutingDecisionAgent.
 # These tools fetch data from the mock data stores, simulating API calls or queries
 # to specialized services or other agents' knowledge bases.
-
+#
+# The tools are coroutines: store reads are awaited (see DataStore.call_async), so tools
+# waiting on a database or rate service do not hold the event loop or a worker thread,
+# the calls the model makes in one turn run concurrently, and get_route_candidates
+# fetches the lanes of every stocked location at once. Each tool has a time limit; a
+# tool that overruns returns a JSON error to the model instead of stalling the run.
+
+import asyncio
 import json
 import logging
-from agentic_order_routing.mock_data import (
-    INVENTORY_DB,
-    SHIPPING_OPTIONS_DB,
-    ZIP_TO_ZONE_DB,
-    PRODUCT_WEIGHT_DB # Though not directly used in CO2 calc yet, it's available
-)
-from agents import function_tool
+from typing import Any
+from agentic_order_routing.inventory_service import get_inventory_service
+from agentic_order_routing.shipping_index import get_shipping_index
+from agentic_order_routing.tool_output import encode_inventory, encode_route_candidates, encode_shipping_options, render_tool_output
+from agentic_order_routing.zip_index import get_zip_index
+from agents import RunContextWrapper, function_tool
 
 logger = logging.getLogger("agent_workflow")
 
-@function_tool
-def get_customer_zone(zip_code: str) -> str:
+# --- Per-tool time limits (seconds) ---
+TOOL_TIMEOUT_SECONDS = {
+    "get_customer_details_tool": 5.0,
+    "get_customer_zone": 2.0,
+    "get_inventory": 5.0,
+    "get_shipping_options": 5.0,
+    "get_route_candidates": 10.0,
+}
+
+def tool_timeout_error(ctx, error) -> str:
+    """Output handed to the model when a tool runs past its limit, in the tools' error JSON shape."""
+    logger.warning(f"TOOL_LOG: {error.tool_name} timed out after {error.timeout_seconds:g} s")
+    return json.dumps({"error": f"Tool '{error.tool_name}' timed out after {error.timeout_seconds:g} seconds."})
+
+def timed_tool(name):
+    """function_tool with the tool's time limit from TOOL_TIMEOUT_SECONDS."""
+    return function_tool(timeout=TOOL_TIMEOUT_SECONDS[name], timeout_error_function=tool_timeout_error)
+
+def lookup_customer_zone(zip_code: str) -> str:
+    """
+    Plain (non-tool) ZIP-to-zone lookup shared by the get_customer_zone tool and
+    the deterministic routing path in main.py.
+    """
+    return get_zip_index().lookup(zip_code) or "UNKNOWN_ZONE"
+
+def lookup_customer_zones(zip_codes) -> dict:
+    """Bulk form of lookup_customer_zone: returns {zip_code: zone} for many ZIPs in one pass."""
+    return {zip_code: zone or "UNKNOWN_ZONE" for zip_code, zone in get_zip_index().lookup_many(zip_codes).items()}
+
+@timed_tool("get_customer_zone")
+async def get_customer_zone(zip_code: str) -> str:
     """
     Determines the shipping zone for a customer based on their zip code.
-    This simulates a call to a Customer Zone Service or a geo-mapping utility.
+    This simulates a call to a Customer Zone Service or a geo-mapping utility,
+    backed by a range index over ZIP codes (see zip_index.py).
 
     Args:
         zip_code: The customer's ZIP code.
 
     Returns:
-        The shipping zone string (e.g., "ZONE_1") or "UNKNOWN_ZONE" if not found.
+        The shipping zone string (e.g., "ZONE_1") or "UNKNOWN_ZONE" if the ZIP is malformed
+        or outside every mapped range.
     """
     logger.info(f"TOOL_LOG: get_customer_zone called with zip_code='{zip_code}'")
-    zone = ZIP_TO_ZONE_DB.get(zip_code, ZIP_TO_ZONE_DB.get("UNKNOWN_ZIP_DEFAULT", "UNKNOWN_ZONE"))
+    zone = lookup_customer_zone(zip_code)
     logger.info(f"TOOL_LOG: get_customer_zone returning zone='{zone}'")
     return zone
 
-@function_tool
-def get_inventory(product_id: str, quantity: int) -> str:
+def find_stocked_locations(product_id: str, quantity: int) -> dict:
+    """Plain (non-tool) lookup of {location_id: available} for locations that can cover `quantity` units."""
+    return get_inventory_service().find_available(product_id, quantity)
+
+async def find_stocked_locations_async(product_id: str, quantity: int) -> dict:
+    """Async form of find_stocked_locations, for the tools."""
+    return await get_inventory_service().find_available_async(product_id, quantity)
+
+@timed_tool("get_inventory")
+async def get_inventory(ctx: RunContextWrapper[Any], product_id: str, quantity: int) -> str:
     """
     Checks stock levels for a given product_id and quantity across ALL fulfillment locations.
     This simulates querying an Inventory Agent's knowledge base or an inventory management system.
@@ -43,22 +88,18 @@ def get_inventory(product_id: str, quantity: int) -> str:
 
     Returns:
         A JSON string representing a dictionary of locations that have sufficient stock,
-        with location_id as key and available quantity as value.
+        with location_id as key and available quantity (on hand minus reserved) as value.
         Example: '{"WH_EAST": 10, "STORE_CENTRAL": 3}'
     """
     logger.info(f"TOOL_LOG: get_inventory called with product_id='{product_id}', quantity={quantity}")
-    available_locations = {}
-    for location_id, products_at_location in INVENTORY_DB.items():
-        stock_level = products_at_location.get(product_id, 0)
-        if stock_level >= quantity:
-            available_locations[location_id] = stock_level
+    available_locations = await find_stocked_locations_async(product_id, quantity)
     
-    result_json = json.dumps(available_locations)
+    result_json = render_tool_output(ctx.context, "get_inventory", encode_inventory, available_locations)
     logger.info(f"TOOL_LOG: get_inventory returning: {result_json}")
     return result_json
 
-@function_tool
-def get_shipping_options(warehouse_id: str, zone: str, product_id: str) -> str:
+@timed_tool("get_shipping_options")
+async def get_shipping_options(ctx: RunContextWrapper[Any], warehouse_id: str, zone: str, product_id: str) -> str:
     """
     Fetches available shipping methods, costs, ETAs, and CO2 impact
     from a specific warehouse to a given customer zone for a particular product_id.
@@ -73,30 +114,57 @@ def get_shipping_options(warehouse_id: str, zone: str, product_id: str) -> str:
         A JSON string representing a list of shipping option dictionaries.
         Each dictionary contains: "carrier", "cost", "days", "co2_kg".
         Example: '[{"carrier": "CarrierX_Std", "cost": 10, "days": 3, "co2_kg": 0.5}, ...]'
+        Depending on the tool output mode (see tool_output.py), dominated options are left
+        out, or the options are given as columns: '{"carrier": [...], "cost": [...], ...}'.
     """
     logger.info(f"TOOL_LOG: get_shipping_options called for warehouse_id='{warehouse_id}', zone='{zone}', product_id='{product_id}'")
     
-    # Get all options for the warehouse and zone
-    options_for_zone = SHIPPING_OPTIONS_DB.get(warehouse_id, {}).get(zone, [])
-    
-    # Filter options specifically for the given product_id
-    product_specific_options_tuples = [opt for opt in options_for_zone if opt[0] == product_id]
-    
-    # Reformat the tuples into dictionaries for clearer JSON output to the LLM
-    formatted_options = []
-    for opt_tuple in product_specific_options_tuples:
-        # opt_tuple is (product_id, carrier, cost, days, co2_kg)
-        formatted_options.append({
-            "carrier": opt_tuple[1],
-            "cost": opt_tuple[2],
-            "days": opt_tuple[3],
-            "co2_kg": opt_tuple[4]
-        })
+    # Single O(1) lookup on the (warehouse, zone, product) index
+    formatted_options = [opt.to_dict() for opt in await get_shipping_index().get_async(warehouse_id, zone, product_id)]
         
-    result_json = json.dumps(formatted_options)
+    result_json = render_tool_output(ctx.context, "get_shipping_options", encode_shipping_options, formatted_options)
     logger.info(f"TOOL_LOG: get_shipping_options returning for {warehouse_id} to {zone} for {product_id}: {result_json}")
     return result_json
 
+@timed_tool("get_route_candidates")
+async def get_route_candidates(ctx: RunContextWrapper[Any], product_id: str, quantity: int, zip_code: str) -> str:
+    """
+    Gathers everything needed to route an order in one call: the customer's shipping zone,
+    every location with sufficient stock, and every shipping option from each of those
+    locations to the zone. Replaces one get_customer_zone call, one get_inventory call and
+    one get_shipping_options call per stocked location.
+
+    Args:
+        product_id: The ID of the product being ordered.
+        quantity: The desired quantity of the product.
+        zip_code: The customer's ZIP code.
+
+    Returns:
+        A JSON string with the zone and a list of candidate locations, each with its stock
+        level and shipping options. Locations without any shipping option to the zone are
+        still listed, with an empty "shipping_options" list.
+        Example: '{"zone": "ZONE_1", "candidates": [{"fulfillment_location": "WH_EAST", "stock": 10,
+                  "shipping_options": [{"carrier": "CarrierX_Std", "cost": 10, "days": 3, "co2_kg": 0.5}]}]}'
+        Depending on the tool output mode (see tool_output.py), options that another option
+        beats on cost, days and CO2 are left out, or the result is given in columns:
+        '{"zone": "ZONE_1", "stock": {"WH_EAST": 10}, "options": {"location": ["WH_EAST"],
+          "carrier": ["CarrierX_Std"], "cost": [10], "days": [3], "co2_kg": [0.5]}}'
+    """
+    logger.info(f"TOOL_LOG: get_route_candidates called with product_id='{product_id}', quantity={quantity}, zip_code='{zip_code}'")
+    zone = lookup_customer_zone(zip_code)
+    index = get_shipping_index()
+    stocked = await find_stocked_locations_async(product_id, quantity)
+    # The lanes of all stocked locations are fetched concurrently
+    lanes = await asyncio.gather(*(index.get_async(location_id, zone, product_id) for location_id in stocked))
+    candidates = [
+        (location_id, stock_level, [opt.to_dict() for opt in lane])
+        for (location_id, stock_level), lane in zip(stocked.items(), lanes)
+    ]
+
+    result_json = render_tool_output(ctx.context, "get_route_candidates", encode_route_candidates, zone, candidates)
+    logger.info(f"TOOL_LOG: get_route_candidates returning: {result_json}")
+    return result_json
+
 # --- Main block for testing the tools directly ---
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
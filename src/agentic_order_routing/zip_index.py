@@ -0,0 +1,177 @@
+# Range-based ZIP-to-zone index for the Agentic AI Order Routing POC.
+# An exact-match dict needs an entry for each of the ~42k US ZIPs, and used to send
+# every ZIP it did not know to a default zone. Here the store's ZIP ranges and exact
+# ZIPs are merged into one sorted list of non-overlapping [first, last] ranges. The list
+# is held as three compact arrays (range starts, range ends, zone codes), so a lookup is
+# one bisect (O(log n)). Exact ZIPs override the range that contains them, and ZIPs
+# outside every range resolve to None instead of a guessed zone. lookup_many() answers
+# a whole batch with one vectorized search.
+
+import logging
+import threading
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+from agentic_order_routing.data_store import get_data_store
+
+logger = logging.getLogger("agent_workflow")
+
+ZIP_SPACE = 100_000  # 5-digit ZIP codes are 00000-99999
+
+
+def parse_zip(zip_code):
+    """
+    Returns a ZIP code as an integer, or None if it is not a 5-digit ZIP. ZIP+4 codes
+    ("12345-6789") use their first five digits.
+    """
+    if not isinstance(zip_code, str):
+        return None
+    zip5 = zip_code.strip()[:5]
+    if len(zip5) != 5 or not zip5.isdigit():
+        return None
+    return int(zip5)
+
+
+class ZipZoneIndex:
+    """
+    Sorted, non-overlapping ZIP ranges with a zone per range.
+
+    Args:
+        ranges: (first ZIP, last ZIP, zone) tuples with inclusive integer bounds; they
+            must not overlap.
+        exact: Optional {zip_code: zone}; these override the ranges. Entries that agree
+            with the range containing them, or that are not 5-digit ZIPs, are dropped.
+    """
+
+    def __init__(self, ranges, exact=None):
+        ranges = sorted((int(start), int(end), zone) for start, end, zone in ranges)
+        for (_, end, _), (start, _, _) in zip(ranges, ranges[1:]):
+            if start <= end:
+                raise ValueError(f"Overlapping ZIP ranges at {start:05d}")
+        self._build(ranges)
+        overrides = {}
+        for zip_code, zone in (exact or {}).items():
+            n = parse_zip(zip_code)
+            if n is not None and self.lookup_int(n) != zone:
+                overrides[n] = zone
+        if overrides:
+            self._build(self._overlay(ranges, overrides))
+
+    def _build(self, ranges):
+        # Merge touching ranges of the same zone, then pack into arrays
+        merged = []
+        for start, end, zone in ranges:
+            if merged and merged[-1][2] == zone and merged[-1][1] + 1 == start:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end, zone])
+        self.zones = tuple(sorted({zone for _, _, zone in merged}))
+        code = {zone: i for i, zone in enumerate(self.zones)}
+        self._starts = array("I", (start for start, _, _ in merged))
+        self._ends = array("I", (end for _, end, _ in merged))
+        self._codes = array("H", (code[zone] for _, _, zone in merged))
+        # Zero-copy views for lookup_many
+        self._np_starts = np.frombuffer(self._starts, dtype=np.uint32) if merged else np.empty(0, dtype=np.uint32)
+        self._np_ends = np.frombuffer(self._ends, dtype=np.uint32) if merged else np.empty(0, dtype=np.uint32)
+        self._np_codes = np.frombuffer(self._codes, dtype=np.uint16) if merged else np.empty(0, dtype=np.uint16)
+
+    @staticmethod
+    def _overlay(ranges, overrides):
+        # Splits the ranges around each exact ZIP and inserts it as a one-ZIP range
+        points = sorted(overrides)
+        result = []
+        i = 0
+        for start, end, zone in ranges:
+            # Exact ZIPs before this range (in a gap) become ranges of their own
+            while i < len(points) and points[i] < start:
+                result.append((points[i], points[i], overrides[points[i]]))
+                i += 1
+            cursor = start
+            while i < len(points) and points[i] <= end:
+                if points[i] > cursor:
+                    result.append((cursor, points[i] - 1, zone))
+                result.append((points[i], points[i], overrides[points[i]]))
+                cursor = points[i] + 1
+                i += 1
+            if cursor <= end:
+                result.append((cursor, end, zone))
+        result.extend((p, p, overrides[p]) for p in points[i:])
+        return result
+
+    # --- Lookups ---
+    def lookup_int(self, n):
+        i = bisect_right(self._starts, n) - 1
+        if i >= 0 and n <= self._ends[i]:
+            return self.zones[self._codes[i]]
+        return None
+
+    def lookup(self, zip_code):
+        """Returns the zone of a ZIP code, or None if it is malformed or outside every range."""
+        n = parse_zip(zip_code)
+        return None if n is None else self.lookup_int(n)
+
+    def lookup_many(self, zip_codes):
+        """
+        Returns {zip_code: zone or None} for many ZIP codes in one vectorized pass; repeated
+        ZIP codes are looked up once.
+        """
+        unique = list(dict.fromkeys(zip_codes))
+        parsed = [parse_zip(zip_code) for zip_code in unique]
+        valid = [i for i, n in enumerate(parsed) if n is not None]
+        result = dict.fromkeys(unique)
+        if not valid or not len(self._np_starts):
+            return result
+        values = np.fromiter((parsed[i] for i in valid), dtype=np.uint32, count=len(valid))
+        slots = np.searchsorted(self._np_starts, values, side="right") - 1
+        hit = (slots >= 0) & (values <= self._np_ends[np.maximum(slots, 0)])
+        codes = self._np_codes[np.maximum(slots, 0)]
+        for i, is_hit, code in zip(valid, hit.tolist(), codes.tolist()):
+            if is_hit:
+                result[unique[i]] = self.zones[code]
+        return result
+
+    # --- Introspection ---
+    def __len__(self):
+        return len(self._starts)
+
+    def nbytes(self):
+        """Bytes held by the range arrays."""
+        return sum(a.itemsize * len(a) for a in (self._starts, self._ends, self._codes))
+
+    def coverage(self):
+        """Number of 5-digit ZIP codes that resolve to a zone."""
+        return int((self._np_ends.astype(np.int64) - self._np_starts + 1).sum()) if len(self) else 0
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_zip_index(rebuild=False):
+    """Returns the shared index over the data store's ZIP ranges and exact ZIPs, building it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None or rebuild:
+            store = get_data_store()
+            _index = ZipZoneIndex(store.zip_zone_ranges(), dict(store.iter_section("zip_to_zone")))
+            logger.info(f"ZIP_INDEX: {len(_index)} ranges, {_index.nbytes()} bytes, {_index.coverage()} ZIPs covered")
+        return _index
+
+
+if __name__ == '__main__':
+    import time
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(name)s - %(message)s')
+    index = get_zip_index()
+    for zip_code in ("10001", "02101", "30303", "75201-1234", "99999", "ABCDE", "123"):
+        print(f"{zip_code!r} -> {index.lookup(zip_code)}")
+    zips = [f"{n:05d}" for n in range(0, ZIP_SPACE, 3)]
+    start = time.perf_counter()
+    for zip_code in zips:
+        index.lookup(zip_code)
+    single = (time.perf_counter() - start) / len(zips) * 1e6
+    start = time.perf_counter()
+    index.lookup_many(zips)
+    bulk = (time.perf_counter() - start) / len(zips) * 1e6
+    print(f"{len(zips)} lookups: {single:.2f} us each, {bulk:.2f} us each in bulk")